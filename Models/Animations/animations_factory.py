@@ -5,13 +5,17 @@ sys.dont_write_bytecode = True
 import importlib
 from config import ANIMATION
 
-def load_animation_model():
-    module_name = f"Models.Animations.Models.{ANIMATION}"
+def load_animation_model(animation_name=None):
+    """Loads the specified animation or uses the one from config."""
+    if animation_name is None:
+        animation_name = ANIMATION
+        
+    module_name = f"Models.Animations.Models.{animation_name}"
     try:
         module = importlib.import_module(module_name)
         return module.Animation()
     except ImportError:
-        raise ImportError(f"❌ Error: {ANIMATION}.py not found in Models/Animations/Models")
+        raise ImportError(f"❌ Error: {animation_name}.py not found in Models/Animations/Models")
     
 if __name__ == "__main__":
     animation = load_animation_model()
@@ -1,18 +1,29 @@
 import sys
 import os
+import subprocess
+import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.dont_write_bytecode = True
 from moviepy.editor import *
-from Models.config import SAVE_VIDEO_TO
+from Models.job_context import JobContext
 from Models.BGM.utils import ensure_bgm_directory
+from metrics import record_encode
+import tracing
+import cancellation
 
 
 class BGMGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         self.default_volume = 0.3  # Default BGM volume (30% of original)
-        self.default_video_path = SAVE_VIDEO_TO
+        self.default_video_path = self.job.video_path
         ensure_bgm_directory(self.default_video_path)
 
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+        self.default_video_path = self.job.video_path
+
     def add_background_music(self, video_path=None, bgm_path=None, output_path=None, 
                            bgm_volume=0.3, voiceover_volume=1.0):
         """Add background music to a video with the main audio (voiceover).
@@ -76,11 +87,16 @@ class BGMGenerator:
         final_video = video.set_audio(mixed_audio)
         
         # Write the final video with BGM added
-        final_video.write_videofile(output_path, 
-                                   temp_audiofile="temp-audio.m4a", 
-                                   remove_temp=True,
-                                   codec="libx264", 
-                                   audio_codec="aac")
+        os.makedirs(self.job.temp_dir, exist_ok=True)
+        started = time.perf_counter()
+        with tracing.span("moviepy.write_videofile", output="bgm", path=output_path):
+            final_video.write_videofile(output_path, 
+                                       temp_audiofile=os.path.join(self.job.temp_dir, "temp-audio.m4a"), 
+                                       remove_temp=True,
+                                       codec="libx264", 
+                                       audio_codec="aac",
+                                       logger=cancellation.frame_logger())
+        record_encode("bgm", time.perf_counter() - started, frames=int(final_video.duration * video.fps))
         
         print(f"✅ Video with background music saved as: {output_path}")
         
@@ -91,6 +107,94 @@ class BGMGenerator:
         
         return output_path
 
+    def mix_audio(self, voiceover_path, bgm_path=None, output_path=None,
+                  bgm_volume=0.3, voiceover_volume=1.0):
+        """Mix the voiceover with background music into a standalone audio track.
+        
+        This only needs the voiceover, so it can run while images and the
+        video are still being generated.
+        
+        Args:
+            voiceover_path (str): Path to the voiceover audio
+            bgm_path (str): Path to the background music file
+            output_path (str): Path for the mixed audio track
+            bgm_volume (float): Volume level for background music (0.0 to 1.0)
+            voiceover_volume (float): Volume level for voiceover (0.0 to 1.0)
+            
+        Returns:
+            str: Path to the mixed audio, or None if there is no BGM to mix
+        """
+        if bgm_path is None or not os.path.exists(bgm_path):
+            print("⚠️ No BGM file provided or BGM file not found. Skipping BGM mix.")
+            return None
+        
+        if output_path is None:
+            output_path = f"{os.path.splitext(voiceover_path)[0]}_with_bgm.m4a"
+        ensure_bgm_directory(output_path)
+        
+        print(f"🎚️ Mixing background music with voiceover: {os.path.basename(voiceover_path)}")
+        
+        voiceover = AudioFileClip(voiceover_path)
+        bgm = AudioFileClip(bgm_path).volumex(bgm_volume)
+        voiceover_audio = voiceover.volumex(voiceover_volume)
+        
+        duration = voiceover.duration
+        if bgm.duration < duration:
+            loops_needed = int(duration / bgm.duration) + 1
+            bgm_final = concatenate_audioclips([bgm] * loops_needed).subclip(0, duration)
+        elif bgm.duration > duration:
+            bgm_final = bgm.subclip(0, duration)
+        else:
+            bgm_final = bgm
+        
+        mixed_audio = CompositeAudioClip([voiceover_audio, bgm_final]).set_duration(duration)
+        started = time.perf_counter()
+        with tracing.span("moviepy.write_audiofile", output="bgm_mix", path=output_path):
+            mixed_audio.write_audiofile(output_path, fps=44100, codec="aac", logger=cancellation.frame_logger())
+        record_encode("bgm_mix", time.perf_counter() - started)
+        
+        voiceover.close()
+        bgm.close()
+        
+        print(f"✅ Mixed audio saved as: {output_path}")
+        return output_path
+
+    def attach_audio(self, video_path, audio_path, output_path=None):
+        """Replace the audio track of a video with a pre-mixed track.
+        
+        The video stream is copied, so this does not re-encode any frames.
+        
+        Args:
+            video_path (str): Path to the input video
+            audio_path (str): Path to the mixed audio track
+            output_path (str): Path for the output video
+            
+        Returns:
+            str: Path to the output video
+        """
+        if output_path is None:
+            name_parts = os.path.splitext(video_path)
+            output_path = f"{name_parts[0]}_with_bgm{name_parts[1]}"
+        
+        print(f"🎵 Attaching mixed audio to video: {os.path.basename(video_path)}")
+        
+        cmd = [
+            'ffmpeg', '-y', '-i', video_path, '-i', audio_path,
+            '-map', '0:v:0', '-map', '1:a:0',
+            '-c:v', 'copy', '-c:a', 'copy', '-shortest', output_path
+        ]
+        started = time.perf_counter()
+        with tracing.span("ffmpeg.attach_audio", path=output_path) as span:
+            result = cancellation.run_process(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            span.set(returncode=result.returncode)
+        record_encode("bgm_attach", time.perf_counter() - started)
+        if result.returncode != 0:
+            print(f"❌ ffmpeg failed to attach audio: {result.stderr.decode(errors='ignore')[-500:]}")
+            return None
+        
+        print(f"✅ Video with background music saved as: {output_path}")
+        return output_path
+
 
 if __name__ == "__main__":
     generator = BGMGenerator()
@@ -6,12 +6,12 @@ import importlib
 from config import BGM_MODEL
 
 
-def load_bgm_model():
+def load_bgm_model(job=None):
     module_name = f"Models.BGM.Models.{BGM_MODEL}"
     try:
         module = importlib.import_module(module_name)
         print(f"🎵 Loading BGM Model: {BGM_MODEL}")
-        return module.BGMGenerator()
+        return module.BGMGenerator(job=job)
     except ImportError:
         raise ImportError(f"❌ Error: {BGM_MODEL}.py not found in Models/BGM/Models")
 
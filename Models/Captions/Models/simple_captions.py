@@ -4,7 +4,7 @@ import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.dont_write_bytecode = True
 from moviepy.editor import *
-from Models.config import SAVE_TIMESTAMPS_TO, SAVE_VOICEOVER_TO
+from Models.job_context import JobContext
 from Models.Captions.caption_processor import process_video as process_with_captions
 from Models.Captions.utils import get_available_caption_styles, get_available_fonts
 from config import CAPTION_STYLE
@@ -14,23 +14,29 @@ from PIL import Image as PILImage
 
 
 class CaptionGenerator:
-    def __init__(self):
-        pass
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
 
-    def generate_word_timestamps(self, audio_path, output_json=SAVE_TIMESTAMPS_TO):
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+
+    def generate_word_timestamps(self, audio_path, output_json=None):
         """Generate basic timestamps based on the audio duration and script, with timing estimated from word count and adjusted to match audio length."""
         if not os.path.exists(audio_path):
             print(f"❌ Audio file not found: {audio_path}")
             return None
 
+        if output_json is None:
+            output_json = self.job.word_timestamps_path
+
         # Load audio to get duration
         audio_clip = AudioFileClip(audio_path)
         total_duration = audio_clip.duration
         audio_clip.close()
 
         # Load the formatted script (already split into lines)
-        from Models.config import SAVE_SCRIPT_TO
-        with open(SAVE_SCRIPT_TO, 'r', encoding='utf-8') as f:
+        with open(self.job.script_path, 'r', encoding='utf-8') as f:
             formatted_script = f.read()
         
         # Split by newlines to get the properly formatted segments
@@ -120,12 +126,15 @@ class CaptionGenerator:
         print(f"✅ Basic timestamps saved to {output_json} ({len(words_data)} segments)")
         return output_json
 
-    def process_video(self, video_path, style_name=None, output_path=None):
-        """Process video with captions using the centralized processor."""
+    def process_video(self, video_path, style_name=None, output_path=None, audio_path=None):
+        """Process video with captions using the centralized processor.
+
+        Pass the video's audio track (the voiceover) as audio_path to skip extracting it from the video.
+        """
         if style_name is None:
             style_name = CAPTION_STYLE
             
-        return process_with_captions(self, video_path, style_name, output_path)
+        return process_with_captions(self, video_path, style_name, output_path, audio_path)
 
     def get_available_styles(self):
         """Lists all available caption styles"""
@@ -3,33 +3,90 @@ import torch
 import json
 import os
 import sys
+import gc
+import threading
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.dont_write_bytecode = True
-from Models.config import SAVE_TIMESTAMPS_TO, SAVE_VOICEOVER_TO
+from Models.job_context import JobContext
+import tracing
+import cancellation
+import job_logging
+from memory_governor import GOVERNOR
+from resource_monitor import current_rss
 
 from Models.Captions.caption_processor import process_video as process_with_captions
 from Models.Captions.utils import get_available_caption_styles, get_available_fonts
-from config import CAPTION_STYLE, CAPTION_MODEL_TYPE
+from config import CAPTION_STYLE, CAPTION_MODEL_TYPE, MEMORY_MODEL_BYTES
+
+# Loaded (whisper model, align model, align metadata) by resident name, shared by the caption
+# generators of every pipeline in the process; the memory governor unloads them when it needs room
+_models = {}
+_models_lock = threading.Lock()
+
+def load_models(name, device, compute_type):
+    """Return the loaded models of a resident, loading them if they aren't.
+
+    Call it inside GOVERNOR.use(name), so the models can't be unloaded while they are used.
+    """
+    with _models_lock:
+        models = _models.get(name)
+        if models is None:
+            with GOVERNOR.reserve(GOVERNOR.resident_size(name, MEMORY_MODEL_BYTES), f"Loading {name}"):
+                rss = current_rss()
+                with tracing.span("whisperx.load_models", model=CAPTION_MODEL_TYPE, device=device):
+                    whisper_model = whisperx.load_model(CAPTION_MODEL_TYPE, device=device, compute_type=compute_type)
+                    align_model, metadata = whisperx.load_align_model(language_code="en", device=device)
+                models = _models[name] = (whisper_model, align_model, metadata)
+                size = current_rss() - rss if rss is not None else 0
+                GOVERNOR.track(name, size if size > 0 else MEMORY_MODEL_BYTES, lambda: unload_models(name))
+        return models
+
+def unload_models(name):
+    """Drop the loaded models of a resident."""
+    _models.pop(name, None)
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
 
 class CaptionGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.compute_type = "float32"
-        self.whisper_model = whisperx.load_model(CAPTION_MODEL_TYPE, device=self.device, compute_type=self.compute_type)
+        self.resident = f"whisperx.{CAPTION_MODEL_TYPE}.{self.device}"
+        with GOVERNOR.use(self.resident):
+            load_models(self.resident, self.device, self.compute_type)
         fonts_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Fonts')
         os.makedirs(fonts_dir, exist_ok=True)
 
-    def generate_word_timestamps(self, audio_path, output_json=SAVE_TIMESTAMPS_TO):
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+
+    def generate_word_timestamps(self, audio_path, output_json=None):
         """Generate word-level timestamps using WhisperX."""
         if not os.path.exists(audio_path):
             print(f"❌ Audio file not found: {audio_path}")
             return None
 
+        if output_json is None:
+            output_json = self.job.word_timestamps_path
+
         audio = whisperx.load_audio(audio_path)
-        transcription = self.whisper_model.transcribe(audio, batch_size=16)
+        with GOVERNOR.use(self.resident):
+            # Loaded again here if the memory governor unloaded them since the last job
+            whisper_model, model_a, metadata = load_models(self.resident, self.device, self.compute_type)
 
-        model_a, metadata = whisperx.load_align_model(language_code="en", device=self.device)
-        aligned_result = whisperx.align(transcription["segments"], model_a, metadata, audio, self.device)
+            # Transcription and alignment can't be interrupted, so a cancelled job stops between them
+            cancellation.check()
+            with tracing.span("whisperx.transcribe", model=CAPTION_MODEL_TYPE, device=self.device) as span:
+                transcription = whisper_model.transcribe(audio, batch_size=16)
+                span.set(segments=len(transcription["segments"]))
+
+            cancellation.check()
+            with tracing.span("whisperx.align", device=self.device):
+                aligned_result = whisperx.align(transcription["segments"], model_a, metadata, audio, self.device)
+            del whisper_model, model_a, metadata
         
         print(f"⏳ Processing aligned result to extract word timestamps...")
         
@@ -47,7 +104,7 @@ class CaptionGenerator:
             words_data = []
             for w in aligned_result["word_segments"]:
                 if "start" not in w or "end" not in w:
-                    print(f"⚠️ Missing start/end time for word: {w.get('word', 'unknown')}")
+                    job_logging.chatter(f"⚠️ Missing start/end time for word: {w.get('word', 'unknown')}")
                     continue
                     
                 words_data.append({
@@ -62,12 +119,15 @@ class CaptionGenerator:
         print(f"✅ Word timestamps saved to {output_json} ({len(words_data)} words)")
         return output_json
 
-    def process_video(self, video_path, style_name=None, output_path=None):
-        """Process video with captions using the centralized processor."""
+    def process_video(self, video_path, style_name=None, output_path=None, audio_path=None):
+        """Process video with captions using the centralized processor.
+
+        Pass the video's audio track (the voiceover) as audio_path to skip extracting it from the video.
+        """
         if style_name is None:
             style_name = CAPTION_STYLE
             
-        return process_with_captions(self, video_path, style_name, output_path)
+        return process_with_captions(self, video_path, style_name, output_path, audio_path)
 
     def get_available_styles(self):
         """Lists all available caption styles"""
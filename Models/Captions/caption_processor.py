@@ -1,5 +1,6 @@
 import os
 import json
+import time
 import numpy as np
 from moviepy.editor import VideoFileClip, CompositeVideoClip, ImageClip
 from Models.Captions.utils import load_caption_style, create_text_image
@@ -7,13 +8,14 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from config import CAPTION_STYLE
 from Models.config import SAVE_VOICEOVER_TO
+from metrics import record_encode
+import tracing
+import cancellation
 
 def generate_video_path(video_path, suffix="_captioned"):
-    """Generate an output path based on input video path."""
-    file_name = os.path.basename(video_path)
-    name_without_ext = os.path.splitext(file_name)[0]
-    extension = os.path.splitext(file_name)[1]
-    return f"Video/{name_without_ext}{suffix}{extension}"
+    """Generate an output path next to the input video."""
+    name_without_ext, extension = os.path.splitext(video_path)
+    return f"{name_without_ext}{suffix}{extension}"
 
 def extract_audio(video_path, audio_path=None):
     """Extract audio from video file."""
@@ -27,7 +29,8 @@ def extract_audio(video_path, audio_path=None):
         
     os.makedirs(os.path.dirname(audio_path), exist_ok=True)
     video = VideoFileClip(video_path)
-    video.audio.write_audiofile(audio_path, codec="pcm_s16le")
+    with tracing.span("moviepy.write_audiofile", output="captions_audio", path=audio_path):
+        video.audio.write_audiofile(audio_path, codec="pcm_s16le", logger=cancellation.frame_logger())
     return audio_path
 
 def add_animated_word_captions(video_path, timestamps_file, output_path=None, style_name=None):
@@ -99,7 +102,14 @@ def add_animated_word_captions(video_path, timestamps_file, output_path=None, st
             text_clips.append(text_clip)
 
     final_video = CompositeVideoClip([video] + text_clips)
-    final_video.write_videofile(output_path, fps=video.fps, codec="libx264", preset="ultrafast")
+    started = time.perf_counter()
+    with tracing.span("moviepy.write_videofile", output="captions", path=output_path, words=len(text_clips)):
+        final_video.write_videofile(output_path, fps=video.fps, codec="libx264", preset="ultrafast",
+                                   logger=cancellation.frame_logger())
+    record_encode("captions", time.perf_counter() - started, frames=int(final_video.duration * video.fps))
+    # Stop the decoder of the input video now instead of whenever the clips are garbage collected
+    final_video.close()
+    video.close()
 
     print(f"✅ Word-by-word captions added! Video saved at {output_path}")
     return output_path
@@ -155,13 +165,24 @@ def add_captions_to_video(video_path, timestamps_file, output_path=None, style_n
         text_clips.append(text_clip)
 
     final_video = CompositeVideoClip([video] + text_clips)
-    final_video.write_videofile(output_path, fps=video.fps, codec="libx264", preset="ultrafast")
+    started = time.perf_counter()
+    with tracing.span("moviepy.write_videofile", output="captions", path=output_path, words=len(text_clips)):
+        final_video.write_videofile(output_path, fps=video.fps, codec="libx264", preset="ultrafast",
+                                   logger=cancellation.frame_logger())
+    record_encode("captions", time.perf_counter() - started, frames=int(final_video.duration * video.fps))
+    # Stop the decoder of the input video now instead of whenever the clips are garbage collected
+    final_video.close()
+    video.close()
 
     print(f"✅ Captions added! Video saved at {output_path}")
     return output_path
 
-def process_video(caption_generator, video_path, style_name=None, output_path=None):
-    """Generic video processing pipeline for any caption model with word-by-word animation."""
+def process_video(caption_generator, video_path, style_name=None, output_path=None, audio_path=None):
+    """Generic video processing pipeline for any caption model with word-by-word animation.
+
+    audio_path is the audio track of the video when the caller has it; otherwise it is
+    extracted from the video into a temporary WAV file first.
+    """
     if not os.path.exists(video_path):
         print(f"❌ Video file not found: {video_path}")
         return None
@@ -172,10 +193,11 @@ def process_video(caption_generator, video_path, style_name=None, output_path=No
     if output_path is None:
         output_path = generate_video_path(video_path)
     
-    print(f"\n⏳ Extracting audio from '{os.path.basename(video_path)}'...")
-    audio_path = extract_audio(video_path)
-    if not audio_path:
-        return None
+    if audio_path is None or not os.path.exists(audio_path):
+        print(f"\n⏳ Extracting audio from '{os.path.basename(video_path)}'...")
+        audio_path = extract_audio(video_path, os.path.join(os.path.dirname(caption_generator.job.voiceover_path), "temp_audio.wav"))
+        if not audio_path:
+            return None
     
     print(f"\n⏳ Generating word-level timestamps...")
     timestamps_file = caption_generator.generate_word_timestamps(audio_path)
@@ -18,7 +18,7 @@ def get_available_caption_models():
     
     return models
 
-def load_caption_model(model_name=None):
+def load_caption_model(model_name=None, job=None):
     """Loads the specified caption model or uses the one from config."""
     if model_name is None:
         model_name = CAPTION_MODEL
@@ -27,7 +27,7 @@ def load_caption_model(model_name=None):
     try:
         module = importlib.import_module(module_name)
         print(f"📝 Loading Caption Model: {model_name}")
-        return module.CaptionGenerator()
+        return module.CaptionGenerator(job=job)
     except ImportError:
         raise ImportError(f"❌ Error: {model_name}.py not found in Models/Captions/Models")
 
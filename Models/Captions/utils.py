@@ -3,6 +3,7 @@ import json
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 import shutil
+from functools import lru_cache
 
 def get_available_caption_styles():
     """Returns a list of available caption styles in the Caption_Styles folder."""
@@ -97,25 +98,9 @@ def save_caption_style(style_name, style_config):
     print(f"✅ Caption style '{style_name}' saved.")
     return style_path
 
-def create_text_image(text, video_width, video_height, style=None):
-    """Creates an image containing styled text for captions."""
-    if style is None:
-        style = load_caption_style()
-        
-    font_size = int(video_height * style.get("font_size_ratio", 0.04))
-    padding_x = int(video_width * style.get("padding_x_ratio", 0.02))
-    padding_top = int(video_height * style.get("padding_top_ratio", 0.01))
-    padding_bottom = int(video_height * style.get("padding_bottom_ratio", 0.02))
-    bg_color = tuple(style.get("bg_color", [0, 0, 0, 200]))
-    text_color = tuple(style.get("text_color", [255, 255, 255, 255]))
-    
-    if style.get("uppercase", True):
-        text = text.upper()
-    
-    temp_img = Image.new("RGBA", (video_width, font_size + padding_top + padding_bottom), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(temp_img)
-    
-    font_name = style.get("font", "arial.ttf")
+@lru_cache(maxsize=32)
+def load_font(font_name, font_size):
+    """Loads a caption font once per name and size and keeps it resident."""
     captions_font_path = os.path.join(os.path.dirname(__file__), 'Fonts', font_name)
     data_font_path = os.path.join("Data", "Fonts", font_name)
     
@@ -139,6 +124,28 @@ def create_text_image(text, video_width, video_height, style=None):
         print(f"⚠️ Error loading font: {e}. Using default font.")
         font = ImageFont.load_default()
     
+    return font
+
+def create_text_image(text, video_width, video_height, style=None):
+    """Creates an image containing styled text for captions."""
+    if style is None:
+        style = load_caption_style()
+        
+    font_size = int(video_height * style.get("font_size_ratio", 0.04))
+    padding_x = int(video_width * style.get("padding_x_ratio", 0.02))
+    padding_top = int(video_height * style.get("padding_top_ratio", 0.01))
+    padding_bottom = int(video_height * style.get("padding_bottom_ratio", 0.02))
+    bg_color = tuple(style.get("bg_color", [0, 0, 0, 200]))
+    text_color = tuple(style.get("text_color", [255, 255, 255, 255]))
+    
+    if style.get("uppercase", True):
+        text = text.upper()
+    
+    temp_img = Image.new("RGBA", (video_width, font_size + padding_top + padding_bottom), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(temp_img)
+    
+    font = load_font(style.get("font", "arial.ttf"), font_size)
+    
     left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
     text_width, text_height = right - left, bottom - top
     
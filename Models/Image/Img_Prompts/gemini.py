@@ -4,11 +4,12 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.
 import google.generativeai as genai
 from dotenv import dotenv_values
 from Models.Image.utils import SYSTEM_PROMPT
-from Models.config import SAVE_SCRIPT_TO
+from Models.job_context import JobContext
 from config import PROMPT_MODEL_TYPE
 
 class PromptGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         env_vars = dotenv_values(".env")
         self.api_key = env_vars.get("GEMINI_API_KEY")
         
@@ -26,8 +27,12 @@ class PromptGenerator:
             }
         )
 
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+
     def generate_prompt(self, scene_text):
-        Generated_Script = open(SAVE_SCRIPT_TO, "r").read()
+        Generated_Script = open(self.job.script_path, "r").read()
         print(Generated_Script)
         """Generates an image prompt based on the scene text."""
         full_prompt = f"{SYSTEM_PROMPT}\n\nScript: {Generated_Script}\n\nScene: {scene_text}\n\nGenerate an image prompt:"
@@ -4,12 +4,13 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.
 from mistralai import Mistral
 from dotenv import dotenv_values
 from Models.Image.utils import SYSTEM_PROMPT
-from Models.config import SAVE_SCRIPT_TO
+from Models.job_context import JobContext
 from config import PROMPT_MODEL_TYPE
 
 
 class PromptGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         env_vars = dotenv_values(".env")
         self.api_key = env_vars.get("MISTRAL_API_KEY")
         
@@ -18,9 +19,13 @@ class PromptGenerator:
 
         self.client = Mistral(api_key=self.api_key)
 
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+
     def generate_prompt(self, scene_text):
         """Generates an image prompt based on the scene text."""
-        Generated_Script = open(SAVE_SCRIPT_TO, "r").read()
+        Generated_Script = open(self.job.script_path, "r").read()
         
         full_prompt = f"{SYSTEM_PROMPT}\n\nScript: {Generated_Script}\n\nScene: {scene_text}\n\nGenerate an image prompt:"
         response = self.client.chat.complete(
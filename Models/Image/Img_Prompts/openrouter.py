@@ -4,12 +4,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.
 from openai import OpenAI
 from dotenv import dotenv_values
 from Models.Image.utils import SYSTEM_PROMPT
-from Models.config import SAVE_SCRIPT_TO
+from Models.job_context import JobContext
 from config import PROMPT_MODEL_TYPE
+import deadline
 
 
 class PromptGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         env_vars = dotenv_values(".env")
         self.api_key = env_vars.get("OPENROUTER_API_KEY")
         self.base_url = "https://openrouter.ai/api/v1"
@@ -25,11 +27,18 @@ class PromptGenerator:
             http_client=http_client
         )
 
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+
     def generate_prompt(self, scene_text):
         """Generates an image prompt based on the scene text."""
-        Generated_Script = open(SAVE_SCRIPT_TO, "r").read()
+        Generated_Script = open(self.job.script_path, "r").read()
         
         full_prompt = f"{SYSTEM_PROMPT}\n\nScript: {Generated_Script}\n\nScene: {scene_text}\n\nGenerate an image prompt:"
+        # Within a job deadline the request may only take what is left of the stage's budget
+        timeout = deadline.timeout()
+        options = {"timeout": timeout} if timeout is not None else {}
         response = self.client.chat.completions.create(
             model=PROMPT_MODEL_TYPE,
             messages=[
@@ -37,7 +46,8 @@ class PromptGenerator:
                 {"role": "user", "content": full_prompt}
             ],
             temperature=0.7,
-            max_tokens=200
+            max_tokens=200,
+            **options
         )
         
         return response.choices[0].message.content
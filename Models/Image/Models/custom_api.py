@@ -5,12 +5,19 @@ import time
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.dont_write_bytecode = True
-from Models.config import SAVE_IMAGES_TO
+from Models.job_context import JobContext
 from Models.Image.utils import ensure_save_directory
+from config import PROMPT_MODEL
+from metrics import provider_request, record_retry
+import tracing
+import deadline
+import cancellation
+import job_logging
 
 
 class ImageGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         self.prompt_generator = None
         # Cloudflare Direct API Configuration
         self.account_id = "0c27843ed41f48522815727e4fbf5c3c"  # Your Account ID
@@ -26,14 +33,21 @@ class ImageGenerator:
     def set_prompt_generator(self, prompt_generator):
         self.prompt_generator = prompt_generator
         
+    def set_job(self, job):
+        """Points the generator (and its prompt generator) at another job's workspace."""
+        self.job = job
+        if self.prompt_generator:
+            self.prompt_generator.set_job(job)
+        
     def generate_image_prompt(self, text):
         if self.prompt_generator:
-            return self.prompt_generator.generate_prompt(text)
+            with tracing.span("prompt.generate_prompt", provider=PROMPT_MODEL):
+                return self.prompt_generator.generate_prompt(text)
         else:
             return text
             
     def download_image(self, prompt, img_number):
-        print(f"🎨 Generating image {img_number} with prompt: {prompt}")
+        job_logging.chatter(f"🎨 Generating image {img_number} with prompt: {prompt}")
         
         # Use the full prompt as received since AI is instructed to create short prompts
         optimized_prompt = prompt
@@ -49,33 +63,40 @@ class ImageGenerator:
         retry_delay = 3  # Shorter delay for faster feedback
         
         for attempt in range(max_retries):
+            if deadline.expired():
+                print(f"⏰ Deadline reached, giving up on image {img_number}")
+                return
+            if attempt > 0:
+                record_retry("custom_api")
             try:
-                # Use the already optimized headers
-                response = requests.post(
-                    self.api_url, 
-                    json=payload, 
-                    headers=self.headers,
-                    timeout=300,  # Cloudflare Direct API allows longer timeouts
-                    stream=True   # Stream for better memory handling
-                )
-                response.raise_for_status()
-                
-                filename = os.path.join(SAVE_IMAGES_TO, f"image_{img_number}.jpg")
-                ensure_save_directory(os.path.dirname(filename))
-                
-                # Stream and save the image for better memory management
-                with open(filename, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                with provider_request("custom_api"), \
+                        tracing.span("image.attempt", provider="custom_api", image=img_number, attempt=attempt + 1):
+                    # Use the already optimized headers
+                    response = cancellation.post(
+                        self.api_url, 
+                        json=payload, 
+                        headers=self.headers,
+                        timeout=deadline.timeout(300),  # Cloudflare Direct API allows longer timeouts, within the job's budget
+                        stream=True   # Stream for better memory handling
+                    )
+                    response.raise_for_status()
+                    
+                    filename = self.job.image_path(img_number)
+                    ensure_save_directory(os.path.dirname(filename))
+                    
+                    # Stream and save the image for better memory management
+                    with open(filename, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=8192):
+                            f.write(chunk)
                     
-                print(f"✅ Image {img_number} saved successfully as {filename}")
-                print(f"⏱️  Generated with full prompt length")
+                job_logging.chatter(f"✅ Image {img_number} saved successfully as {filename}")
+                job_logging.chatter(f"⏱️  Generated with full prompt length")
                 return  # Success, exit retry loop
                 
             except requests.exceptions.HTTPError as e:
                 if attempt < max_retries - 1:
                     print(f"⚠️ HTTP Error on attempt {attempt + 1}/{max_retries}, retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
+                    cancellation.sleep(retry_delay)
                 else:
                     print(f"❌ HTTP Error for image {img_number} after {max_retries} attempts: {e}")
                     print(f"Response: {response.text if response else 'No response'}")
@@ -83,22 +104,22 @@ class ImageGenerator:
             except requests.exceptions.Timeout:
                 if attempt < max_retries - 1:
                     print(f"⚠️ Timeout on attempt {attempt + 1}/{max_retries}, retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
+                    cancellation.sleep(retry_delay)
                 else:
                     print(f"❌ Timeout error for image {img_number} after {max_retries} attempts")
                     
             except Exception as e:
                 if attempt < max_retries - 1:
                     print(f"⚠️ Error on attempt {attempt + 1}/{max_retries}: {e}, retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
+                    cancellation.sleep(retry_delay)
                 else:
                     print(f"❌ Error generating image {img_number} after {max_retries} attempts: {e}")
 
     def generate_images_from_script(self, script_lines):
         for i, line in enumerate(script_lines, start=1):
-            print(f"🎨 Generating prompt for line {i}/{len(script_lines)}...")
+            job_logging.chatter(f"🎨 Generating prompt for line {i}/{len(script_lines)}...")
             image_prompt = self.generate_image_prompt(line)
-            print(f"📜 Prompt {i}: {image_prompt}")
+            job_logging.chatter(f"📜 Prompt {i}: {image_prompt}")
             
             self.download_image(image_prompt, i)
             time.sleep(1)  # Small delay to be respectful to the API
@@ -8,8 +8,14 @@ import json
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.dont_write_bytecode = True
-from Models.config import SAVE_IMAGES_TO
+from Models.job_context import JobContext
 from Models.Image.utils import ensure_save_directory
+from config import PROMPT_MODEL
+from metrics import provider_request, record_retry
+import tracing
+import deadline
+import cancellation
+import job_logging
 
 class DeepAI:
     def __init__(self, user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'):
@@ -85,7 +91,7 @@ class DeepAI:
         }
         
         try:
-            response = requests.post(self.base_url, headers=headers, data=data)
+            response = cancellation.post(self.base_url, headers=headers, data=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
@@ -106,46 +112,65 @@ if __name__ == "__main__":
     print(result)
 
 class ImageGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         self.prompt_generator = None
         self.client = DeepAI()
 
     def set_prompt_generator(self, prompt_generator):
         self.prompt_generator = prompt_generator
 
+    def set_job(self, job):
+        """Points the generator (and its prompt generator) at another job's workspace."""
+        self.job = job
+        if self.prompt_generator:
+            self.prompt_generator.set_job(job)
+        
     def generate_image_prompt(self, text):
         if self.prompt_generator:
-            return self.prompt_generator.generate_prompt(text)
+            with tracing.span("prompt.generate_prompt", provider=PROMPT_MODEL):
+                return self.prompt_generator.generate_prompt(text)
         else:
             return text
 
     def download_image(self, prompt, img_number):
-        print(f"🎨 Generating image {img_number} with prompt: {prompt}")
+        job_logging.chatter(f"🎨 Generating image {img_number} with prompt: {prompt}")
         max_retries = 3
         retry_delay = 3
         
         for attempt in range(max_retries):
+            if attempt > 0:
+                record_retry("deepai_wrapper")
             try:
                 # Attempt to use 9:16 aspect ratio
                 # DeepAI Free might not respect custom resolutions fully, but we try.
-                response_json = self.client.generate(prompt, width=1024, height=1820)
+                with provider_request("deepai_wrapper") as request, \
+                        tracing.span("image.attempt", provider="deepai_wrapper", image=img_number,
+                                     attempt=attempt + 1):
+                    response_json = self.client.generate(prompt, width=1024, height=1820)
+                    if 'output_url' not in response_json:
+                        request.fail()
                 
                 if 'output_url' in response_json:
                     image_url = response_json['output_url']
                     
-                    img_response = requests.get(image_url)
+                    with provider_request("deepai_wrapper") as request, \
+                            tracing.span("image.fetch", provider="deepai_wrapper", image=img_number):
+                        img_response = cancellation.get(image_url, timeout=deadline.timeout())
+                        if img_response.status_code != 200:
+                            request.fail()
                     if img_response.status_code == 200:
-                        filename = os.path.join(SAVE_IMAGES_TO, f"image_{img_number}.jpg")
+                        filename = self.job.image_path(img_number)
                         ensure_save_directory(os.path.dirname(filename))
                         with open(filename, "wb") as file:
                             file.write(img_response.content)
-                        print(f"✅ Image {img_number} saved successfully as {filename}")
+                        job_logging.chatter(f"✅ Image {img_number} saved successfully as {filename}")
                         return  # Success, exit retry loop
                     else:
                         print(f"❌ Failed to download image from URL: {image_url}")
                 elif 'error' in response_json and attempt < max_retries - 1:
                     print(f"⚠️ Attempt {attempt + 1} failed, retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
+                    cancellation.sleep(retry_delay)
                     continue
                 else:
                     print(f"❌ DeepAI Error: {response_json}")
@@ -153,15 +178,15 @@ class ImageGenerator:
             except Exception as e:
                 if attempt < max_retries - 1:
                     print(f"⚠️ Error on attempt {attempt + 1}: {e}, retrying...")
-                    time.sleep(retry_delay)
+                    cancellation.sleep(retry_delay)
                 else:
                     print(f"❌ Error generating image {img_number} after {max_retries} attempts: {e}")
 
     def generate_images_from_script(self, script_lines):
         for i, line in enumerate(script_lines, start=1):
-            print(f"🎨 Generating prompt for line {i}/{len(script_lines)}...")
+            job_logging.chatter(f"🎨 Generating prompt for line {i}/{len(script_lines)}...")
             image_prompt = self.generate_image_prompt(line)
-            print(f"📜 Prompt {i}: {image_prompt}")
+            job_logging.chatter(f"📜 Prompt {i}: {image_prompt}")
             
             self.download_image(image_prompt, i)
             time.sleep(3) # Be nice to the API, increased delay to avoid rate limiting
@@ -5,22 +5,35 @@ import time
 import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.dont_write_bytecode = True
-from Models.config import SAVE_IMAGES_TO
-from config import IMG_MODEL_TYPE
+from Models.job_context import JobContext
+from config import IMG_MODEL_TYPE, PROMPT_MODEL
 from Models.Image.utils import ensure_save_directory
+from metrics import provider_request
+import tracing
+import deadline
+import cancellation
+import job_logging
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 class ImageGenerator():
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         self.prompt_generator = None
         
     def set_prompt_generator(self, prompt_generator):
         self.prompt_generator = prompt_generator
         
+    def set_job(self, job):
+        """Points the generator (and its prompt generator) at another job's workspace."""
+        self.job = job
+        if self.prompt_generator:
+            self.prompt_generator.set_job(job)
+        
     def generate_image_prompt(self, text):
         if self.prompt_generator:
-            return self.prompt_generator.generate_prompt(text)
+            with tracing.span("prompt.generate_prompt", provider=PROMPT_MODEL):
+                return self.prompt_generator.generate_prompt(text)
         else:
             return text
         
@@ -41,7 +54,12 @@ class ImageGenerator():
         }
 
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=35)
+            with provider_request("pixelmuse") as request, \
+                    tracing.span("image.attempt", provider="pixelmuse", image=img_number, attempt=1) as span:
+                response = cancellation.post(url, headers=headers, json=payload, timeout=deadline.timeout(35))
+                span.set(status_code=response.status_code)
+                if response.status_code != 201:
+                    request.fail()
             
             if response.status_code == 201:
                 response_data = response.json()
@@ -54,10 +72,15 @@ class ImageGenerator():
                 if image_url:
                     print(image_url)
                     
-                    image_response = requests.get(image_url, timeout=35)
+                    with provider_request("pixelmuse") as request, \
+                            tracing.span("image.fetch", provider="pixelmuse", image=img_number) as span:
+                        image_response = cancellation.get(image_url, timeout=deadline.timeout(35))
+                        span.set(status_code=image_response.status_code)
+                        if image_response.status_code != 200:
+                            request.fail()
                     
                     if image_response.status_code == 200:
-                        filename = os.path.join(SAVE_IMAGES_TO, f"image_{img_number}.jpg")
+                        filename = self.job.image_path(img_number)
                         ensure_save_directory(os.path.dirname(filename))
                         
                         with open(filename, "wb") as file:
@@ -75,9 +98,9 @@ class ImageGenerator():
 
     def generate_images_from_script(self, script_lines):
         for i, line in enumerate(script_lines, start=1):
-            print(f"🎨 Generating prompt for line {i}/{len(script_lines)}...")
+            job_logging.chatter(f"🎨 Generating prompt for line {i}/{len(script_lines)}...")
             image_prompt = self.generate_image_prompt(line)
-            print(f"📜 Prompt {i}: {image_prompt}")
+            job_logging.chatter(f"📜 Prompt {i}: {image_prompt}")
             
             self.download_image(image_prompt, i)
             time.sleep(1)
\ No newline at end of file
@@ -5,21 +5,34 @@ import time
 import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.dont_write_bytecode = True
-from Models.config import SAVE_IMAGES_TO
-from config import IMG_MODEL_TYPE
+from Models.job_context import JobContext
+from config import IMG_MODEL_TYPE, PROMPT_MODEL
 from Models.Image.utils import ensure_save_directory
+from metrics import provider_request
+import tracing
+import deadline
+import cancellation
+import job_logging
 
 
 class ImageGenerator():
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         self.prompt_generator = None
         
     def set_prompt_generator(self, prompt_generator):
         self.prompt_generator = prompt_generator
         
+    def set_job(self, job):
+        """Points the generator (and its prompt generator) at another job's workspace."""
+        self.job = job
+        if self.prompt_generator:
+            self.prompt_generator.set_job(job)
+        
     def generate_image_prompt(self, text):
         if self.prompt_generator:
-            return self.prompt_generator.generate_prompt(text)
+            with tracing.span("prompt.generate_prompt", provider=PROMPT_MODEL):
+                return self.prompt_generator.generate_prompt(text)
         else:
             return text
             
@@ -44,16 +57,21 @@ class ImageGenerator():
         }
         
         try:
-            response = requests.get(url, params=params, timeout=60)
+            with provider_request("pollinations") as request, \
+                    tracing.span("image.attempt", provider="pollinations", image=img_number, attempt=1) as span:
+                response = cancellation.get(url, params=params, timeout=deadline.timeout(60))
+                span.set(status_code=response.status_code)
+                if response.status_code != 200:
+                    request.fail()
             
             if response.status_code == 200:
-                filename = os.path.join(SAVE_IMAGES_TO, f"image_{img_number}.jpg")
+                filename = self.job.image_path(img_number)
                 ensure_save_directory(os.path.dirname(filename))
                 
                 with open(filename, "wb") as file:
                     file.write(response.content)
                     
-                print(f"✅ Image {img_number} saved successfully as {filename}")
+                job_logging.chatter(f"✅ Image {img_number} saved successfully as {filename}")
             else:
                 print(f"❌ Failed to fetch image {img_number}. Status Code: {response.status_code}")
                 print(f"Response: {response.text}")
@@ -63,9 +81,9 @@ class ImageGenerator():
 
     def generate_images_from_script(self, script_lines):
         for i, line in enumerate(script_lines, start=1):
-            print(f"🎨 Generating prompt for line {i}/{len(script_lines)}...")
+            job_logging.chatter(f"🎨 Generating prompt for line {i}/{len(script_lines)}...")
             image_prompt = self.generate_image_prompt(line)
-            print(f"📜 Prompt {i}: {image_prompt}")
+            job_logging.chatter(f"📜 Prompt {i}: {image_prompt}")
             
             self.download_image(image_prompt, i)
             time.sleep(1)
\ No newline at end of file
@@ -6,13 +6,13 @@ import importlib
 from config import IMG_MODEL
 from Models.Image.Img_Prompts.img_prompt_factory import load_prompt_generator
 
-def load_image_model():
+def load_image_model(job=None):
     module_name = f"Models.Image.Models.{IMG_MODEL}"
     try:
         module = importlib.import_module(module_name)
         print(f"📝 Loading Image Model: {IMG_MODEL}")
-        image_generator = module.ImageGenerator()
-        prompt_generator = load_prompt_generator()
+        image_generator = module.ImageGenerator(job=job)
+        prompt_generator = load_prompt_generator(job=job)
         image_generator.set_prompt_generator(prompt_generator)
         return image_generator
     except ImportError:
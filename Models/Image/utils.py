@@ -1,5 +1,6 @@
 import sys
 import os
+import shutil
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 from Models.config import SAVE_SCRIPT_TO
 
@@ -25,6 +26,30 @@ def ensure_save_directory(filepath):
     if directory:
         os.makedirs(directory, exist_ok=True)
 
+def fill_missing_images(job, count):
+    """Copies the nearest generated image into every missing image slot.
+
+    Args:
+        job (JobContext): Job whose images are checked
+        count (int): Number of images the job needs
+
+    Returns:
+        list: (missing number, reused number) pairs for the filled slots
+    """
+    present = [i for i in range(1, count + 1) if os.path.exists(job.image_path(i))]
+    if not present:
+        return []
+
+    filled = []
+    for i in range(1, count + 1):
+        if i in present:
+            continue
+        # Prefer the previous image on a tie, so the scene carries on
+        neighbor = min(present, key=lambda n: (abs(n - i), n > i))
+        shutil.copyfile(job.image_path(neighbor), job.image_path(i))
+        filled.append((i, neighbor))
+    return filled
+
 def load_script_lines(script_file=SAVE_SCRIPT_TO):
     """Loads script and splits it into individual lines."""
     if not os.path.exists(script_file):
@@ -3,12 +3,13 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 from openai import OpenAI
 from dotenv import dotenv_values
-from Models.config import SAVE_SCRIPT_TO
+from Models.job_context import JobContext
 from Models.Script.utils import SYSTEM_PROMPT
 from config import SCRIPT_MODEL_TYPE
 
 class ScriptGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         env_vars = dotenv_values(".env")
         self.api_key = env_vars.get("DDC_API_KEY")
         self.base_url = "https://api.a4f.co/v1"
@@ -18,7 +19,11 @@ class ScriptGenerator:
 
         self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
 
-        os.makedirs(os.path.dirname(SAVE_SCRIPT_TO), exist_ok=True)
+        os.makedirs(os.path.dirname(self.job.script_path), exist_ok=True)
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
 
     def generate_script(self, topic):
         """Generates a script based on the given topic."""
@@ -34,7 +39,7 @@ class ScriptGenerator:
         )
         
         script_text = response.choices[0].message.content
-        with open(SAVE_SCRIPT_TO, "w", encoding="utf-8") as f:
+        with open(self.job.script_path, "w", encoding="utf-8") as f:
             f.write(script_text) 
         return script_text
 
@@ -42,4 +47,4 @@ if __name__ == "__main__":
     generator = ScriptGenerator()
     topic = input("Enter a topic: ")
     script = generator.generate_script(topic)
-    print("📝 Generated Script Successfully to:", SAVE_SCRIPT_TO)
+    print("📝 Generated Script Successfully to:", generator.job.script_path)
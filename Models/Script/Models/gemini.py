@@ -3,38 +3,41 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 import google.generativeai as genai
 from dotenv import dotenv_values
-from Models.config import SAVE_SCRIPT_TO
+from Models.job_context import JobContext
 from Models.Script.utils import SYSTEM_PROMPT
 from config import SCRIPT_MODEL_TYPE
 
-env_vars = dotenv_values(".env")
-GEMINI_API_KEY = env_vars.get("GEMINI_API_KEY")
-
-genai.configure(api_key=GEMINI_API_KEY)
-
-model = genai.GenerativeModel(
-    model_name=SCRIPT_MODEL_TYPE,
-    system_instruction=SYSTEM_PROMPT,
-    generation_config={
-        "temperature": 1.2,   
-        "top_p": 0.9,         
-        "top_k": 50          
-    }
-)
-
 class ScriptGenerator:
-    def __init__(self):
-        if not GEMINI_API_KEY:
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
+        env_vars = dotenv_values(".env")
+        self.api_key = env_vars.get("GEMINI_API_KEY")
+        if not self.api_key:
             raise ValueError("❌ GEMINI_API_KEY not found. Check your .env file.")
 
-        os.makedirs(os.path.dirname(SAVE_SCRIPT_TO), exist_ok=True)
+        genai.configure(api_key=self.api_key)
+        self.model = genai.GenerativeModel(
+            model_name=SCRIPT_MODEL_TYPE,
+            system_instruction=SYSTEM_PROMPT,
+            generation_config={
+                "temperature": 1.2,   
+                "top_p": 0.9,         
+                "top_k": 50          
+            }
+        )
+
+        os.makedirs(os.path.dirname(self.job.script_path), exist_ok=True)
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
 
     def generate_script(self, topic):
         """Generates a script based on the given topic."""
-        response = model.generate_content(topic)
+        response = self.model.generate_content(topic)
         
         script_text = response.text if hasattr(response, "text") else response.result
-        with open(SAVE_SCRIPT_TO, "w", encoding="utf-8") as f:
+        with open(self.job.script_path, "w", encoding="utf-8") as f:
             f.write(script_text)
         
         return script_text
@@ -43,4 +46,4 @@ if __name__ == "__main__":
     generator = ScriptGenerator()
     topic = input("Enter a topic: ")
     script = generator.generate_script(topic)
-    print("📝 Generated Script Successfully to:", SAVE_SCRIPT_TO)
+    print("📝 Generated Script Successfully to:", generator.job.script_path)
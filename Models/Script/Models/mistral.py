@@ -3,11 +3,12 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 from mistralai import Mistral
 from dotenv import dotenv_values
-from Models.config import SAVE_SCRIPT_TO
+from Models.job_context import JobContext
 from Models.Script.utils import SYSTEM_PROMPT
 
 class ScriptGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         env_vars = dotenv_values(".env")
         self.api_key = env_vars.get("MISTRAL_API_KEY")
         self.base_url = "https://api.mistral.ai/v1"
@@ -18,7 +19,11 @@ class ScriptGenerator:
         # Initialize Mistral AI client
         self.client = Mistral(api_key=self.api_key)
         
-        os.makedirs(os.path.dirname(SAVE_SCRIPT_TO), exist_ok=True)
+        os.makedirs(os.path.dirname(self.job.script_path), exist_ok=True)
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
 
     def generate_script(self, topic):
         """Generates a script based on the given topic using Mistral AI."""
@@ -35,7 +40,7 @@ class ScriptGenerator:
             )
             
             script_text = response.choices[0].message.content
-            with open(SAVE_SCRIPT_TO, "w", encoding="utf-8") as f:
+            with open(self.job.script_path, "w", encoding="utf-8") as f:
                 f.write(script_text) 
             return script_text
             
@@ -43,7 +48,7 @@ class ScriptGenerator:
             print(f"❌ Error generating script with Mistral AI: {str(e)}")
             # Fallback to a basic script if Mistral fails
             fallback_script = f"This is a video about {topic}. The content would discuss various aspects of this topic in an engaging way."
-            with open(SAVE_SCRIPT_TO, "w", encoding="utf-8") as f:
+            with open(self.job.script_path, "w", encoding="utf-8") as f:
                 f.write(fallback_script)
             return fallback_script
 
@@ -52,4 +57,4 @@ if __name__ == "__main__":
     generator = ScriptGenerator()
     topic = input("Enter a topic: ")
     script = generator.generate_script(topic)
-    print("📝 Generated Script Successfully to:", SAVE_SCRIPT_TO)
\ No newline at end of file
+    print("📝 Generated Script Successfully to:", generator.job.script_path)
\ No newline at end of file
@@ -3,13 +3,15 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 from openai import OpenAI
 from dotenv import dotenv_values
-from Models.config import SAVE_SCRIPT_TO
+from Models.job_context import JobContext
 from Models.Script.utils import SYSTEM_PROMPT
 from config import SCRIPT_MODEL_TYPE
+import deadline
 
 
 class ScriptGenerator:
-    def __init__(self):
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
         env_vars = dotenv_values(".env")
         self.api_key = env_vars.get("OPENROUTER_API_KEY")
         self.base_url = "https://openrouter.ai/api/v1"
@@ -23,12 +25,19 @@ class ScriptGenerator:
         http_client = httpx.Client()
         self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client)
 
-        os.makedirs(os.path.dirname(SAVE_SCRIPT_TO), exist_ok=True)
+        os.makedirs(os.path.dirname(self.job.script_path), exist_ok=True)
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
 
     def generate_script(self, topic):
         """Generates a script based on the given topic."""
         # Prepare the payload with appropriate parameters for OpenRouter
         # Some models (especially free ones) may have different parameter requirements
+        # Within a job deadline the request may only take what is left of the job's budget
+        timeout = deadline.timeout()
+        options = {"timeout": timeout} if timeout is not None else {}
         response = self.client.chat.completions.create(
             model=SCRIPT_MODEL_TYPE,
             messages=[
@@ -38,11 +47,12 @@ class ScriptGenerator:
             temperature=0.7,  # Reduced from 1.2 for better reliability with free models
             top_p=0.9,
             max_tokens=1000,
-            stream=False
+            stream=False,
+            **options
         )
         
         script_text = response.choices[0].message.content
-        with open(SAVE_SCRIPT_TO, "w", encoding="utf-8") as f:
+        with open(self.job.script_path, "w", encoding="utf-8") as f:
             f.write(script_text) 
         return script_text
 
@@ -51,4 +61,4 @@ if __name__ == "__main__":
     generator = ScriptGenerator()
     topic = input("Enter a topic: ")
     script = generator.generate_script(topic)
-    print("📝 Generated Script Successfully to:", SAVE_SCRIPT_TO)
\ No newline at end of file
+    print("📝 Generated Script Successfully to:", generator.job.script_path)
\ No newline at end of file
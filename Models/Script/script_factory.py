@@ -5,12 +5,12 @@ sys.dont_write_bytecode = True
 import importlib
 from config import SCRIPT_MODEL
 
-def load_script_model():
+def load_script_model(job=None):
     module_name = f"Models.Script.Models.{SCRIPT_MODEL}"
     try:
         module = importlib.import_module(module_name)
         print(f"📝 Loading Script Model: {SCRIPT_MODEL}")
-        return module.ScriptGenerator()
+        return module.ScriptGenerator(job=job)
     except ImportError:
         raise ImportError(f"❌ Error: {SCRIPT_MODEL}.py not found in Models/Script/Models")
 
@@ -13,8 +13,12 @@ SYSTEM_PROMPT = (
     "2. What if your next smartphone costs 30% more—and it's not because of inflation? Donald Trump is back in the headlines—this time with a bold plan to raise tariffs, especially on Chinese tech products like smartphones, computers, and chips. Trump’s calling it 'Liberation Day'—a 10% tax on all imported goods, and even higher taxes—up to 60% or more—for Chinese products. Countries like India, Japan, and South Korea might also get hit. Why? He says it's to protect American businesses and jobs. But experts warn it could make things more expensive for everyone… and shake up the global economy. Will these new tariffs help American business—or start a global trade war? Hit that follow button to stay updated on the latest business news that actually affects you."
 )
 
-def format_script(text):
-    """Formats the script by splitting into sentences for image generation."""
+def format_script(text, lines_per_image=1):
+    """Formats the script by splitting into sentences for image generation.
+
+    With lines_per_image above 1, that many consecutive sentences share a
+    line, and so an image.
+    """
     import re
     text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
     text = re.sub(r'\(.*?\)', '', text)
@@ -32,17 +36,21 @@ def format_script(text):
         # Filter out empty sentences and strip whitespace
         formatted_sentences = [sentence.strip() for sentence in sentences if sentence.strip()]
     
+    if lines_per_image > 1:
+        formatted_sentences = [" ".join(formatted_sentences[i:i + lines_per_image])
+                               for i in range(0, len(formatted_sentences), lines_per_image)]
+
     # Join with newlines for separate image generation
     formatted_script = "\n".join(formatted_sentences)
     return formatted_script
 
-def save_formatted_script(script_text, file_path=None):
+def save_formatted_script(script_text, file_path=None, lines_per_image=1):
     """Saves the formatted script to a file."""
     if file_path is None:
         file_path = SAVE_SCRIPT_TO
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     
-    formatted_text = format_script(script_text)
+    formatted_text = format_script(script_text, lines_per_image)
     with open(file_path, "w", encoding="utf-8") as f:
         f.write(formatted_text)
     
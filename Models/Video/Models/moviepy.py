@@ -1,70 +1,68 @@
 import os
 import sys
 import json
+import subprocess
+import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 sys.dont_write_bytecode = True
 from moviepy.editor import *
 from moviepy.video.fx.all import crop
 from Models.Animations.animations_factory import load_animation_model
 from Models.Video.utils import ensure_directories, verify_assets, transcribe_audio_with_script, crop_to_portrait, load_timestamps, load_script_lines
-from Models.config import SAVE_VIDEO_TO, VIDEO_FPS, SAVE_TIMESTAMPS_TO, SAVE_SCRIPT_TO, SAVE_VOICEOVER_TO, SAVE_IMAGES_TO
-from config import VIDEO_MODEL_CONFIG
+from Models.config import VIDEO_FPS, VIDEO_SCALE
+from Models.job_context import JobContext
+from config import VIDEO_MODEL_CONFIG, ANIMATION
+from metrics import record_encode
+import tracing
+import cancellation
 
 class VideoGenerator:
-    def __init__(self):
-        self.audio_file = SAVE_VOICEOVER_TO
-        ensure_directories()
-        self.animation = load_animation_model()
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
+        self.audio_file = self.job.voiceover_path
+        ensure_directories(self.job)
+        self.animation_name = None
+        self.load_animation()
         self.config = VIDEO_MODEL_CONFIG
         
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+        self.audio_file = self.job.voiceover_path
+        ensure_directories(self.job)
+        self.load_animation()
+
+    def load_animation(self):
+        """Loads the job's animation, keeping the current one if it hasn't changed."""
+        animation_name = self.job.setting("ANIMATION", ANIMATION)
+        if animation_name != self.animation_name:
+            self.animation = load_animation_model(animation_name)
+            self.animation_name = animation_name
+
     def generate_video(self, topic=None):
         """Generates the video based on the audio and images."""
         print(f"🎬 Starting video generation with config: {self.config}...")
         
-        # Check if timestamps already exist (from caption system or previous run)
-        if os.path.exists(SAVE_TIMESTAMPS_TO):
-            print("✅ Using existing timestamps...")
-            timestamps = load_timestamps(SAVE_TIMESTAMPS_TO)
-        else:
-            # Fallback to Whisper-based timestamp generation
-            # But since Whisper is causing numpy issues, we'll try to continue without timestamps
-            print("⚠️ No timestamps found, attempting to continue without them...")
-            # Load script lines directly and estimate timing
-            script_lines = load_script_lines(SAVE_SCRIPT_TO)
-            # Create a basic timeline assuming ~2.5 seconds per sentence
-            timestamps = []
-            current_time = 0.0
-            for i, line in enumerate(script_lines):
-                if line.strip():
-                    duration = max(2.0, 0.5 * len(line.split()))  # At least 2 seconds per segment
-                    timestamps.append({
-                        "start": current_time,
-                        "end": current_time + duration,
-                        "text": line.strip()
-                    })
-                    current_time += duration
-            
-            # Save the generated timestamps for future use
-            os.makedirs(os.path.dirname(SAVE_TIMESTAMPS_TO), exist_ok=True)
-            with open(SAVE_TIMESTAMPS_TO, "w", encoding="utf-8") as f:
-                json.dump(timestamps, f, indent=4)
-            print(f"✅ Estimated timestamps saved to {SAVE_TIMESTAMPS_TO}")
+        timestamps = self.get_timestamps()
         
-        if not verify_assets(timestamps, self.audio_file):
+        if not verify_assets(timestamps, self.audio_file, self.job.images_dir):
             print("⚠️ Some assets are missing but continuing with available ones...")
         
         image_clips = []
         
         for i, segment in enumerate(timestamps, start=1):
-            image_path = f"{SAVE_IMAGES_TO.rstrip('/')}/image_{i}.jpg"
+            image_path = self.job.image_path(i)
             if not os.path.exists(image_path):
                 print(f"⚠️ Warning: Image {image_path} not found, skipping...")
                 continue
 
             duration = segment["end"] - segment["start"]
             image_clip = ImageClip(image_path).set_duration(duration)
-            image_clip = image_clip.resize(1.1)
+            image_clip = image_clip.resize(1.1 * self.scale)
             image_clip = crop_to_portrait(image_clip)
+            # libx264 needs even dimensions, which a scaled-down frame may not have
+            w, h = image_clip.size
+            image_clip = crop(image_clip, x2=w - w % 2, y2=h - h % 2)
             image_clip = self.animation.apply(image_clip, zoom_in=(i % 2 == 1))
             image_clips.append(image_clip)
 
@@ -76,18 +74,170 @@ class VideoGenerator:
         audio = AudioFileClip(self.audio_file)
         video = video.set_audio(audio)
 
-        output_filename = SAVE_VIDEO_TO
+        output_filename = self.job.video_path
         print(f"⏳ Rendering video to {output_filename}...")
         
         os.makedirs(os.path.dirname(output_filename), exist_ok=True)
         
-        preset = "ultrafast" if self.config == "standard" else "medium"
-        threads = 4 if self.config == "standard" else 8
+        preset, threads = self.get_encoder_settings()
+        fps = self.fps
         
-        video.write_videofile(output_filename, fps=VIDEO_FPS, preset=preset, threads=threads)
+        started = time.perf_counter()
+        with tracing.span("moviepy.write_videofile", output="video", path=output_filename, duration=video.duration):
+            video.write_videofile(output_filename, fps=fps, preset=preset, threads=threads,
+                                  logger=cancellation.frame_logger())
+        record_encode("video", time.perf_counter() - started, frames=int(video.duration * fps))
+        # Stop the audio reader now instead of whenever the clips are garbage collected
+        video.close()
+        audio.close()
         print(f"✅ Video successfully saved as '{output_filename}'")
         return output_filename
 
+    @property
+    def fps(self):
+        """Frame rate of the job's video."""
+        return self.job.setting("VIDEO_FPS", VIDEO_FPS)
+
+    @property
+    def scale(self):
+        """Scale of the job's frames relative to the full output resolution."""
+        return self.job.setting("VIDEO_SCALE", VIDEO_SCALE)
+
+    def get_encoder_settings(self):
+        """Returns the x264 preset and thread count for the configured quality."""
+        preset = "ultrafast" if self.config == "standard" else "medium"
+        threads = 4 if self.config == "standard" else 8
+        return self.job.setting("VIDEO_PRESET", preset), threads
+
+    def get_timestamps(self):
+        """Loads existing timestamps or estimates them from the formatted script."""
+        # Check if timestamps already exist (from a previous run; captions write theirs elsewhere)
+        if os.path.exists(self.job.timestamps_path):
+            print("✅ Using existing timestamps...")
+            return load_timestamps(self.job.timestamps_path)
+        
+        # Fallback to Whisper-based timestamp generation
+        # But since Whisper is causing numpy issues, we'll try to continue without timestamps
+        print("⚠️ No timestamps found, attempting to continue without them...")
+        # Load script lines directly and estimate timing
+        script_lines = load_script_lines(self.job.script_path)
+        # Create a basic timeline assuming ~2.5 seconds per sentence
+        timestamps = []
+        current_time = 0.0
+        for i, line in enumerate(script_lines):
+            if line.strip():
+                duration = max(2.0, 0.5 * len(line.split()))  # At least 2 seconds per segment
+                timestamps.append({
+                    "start": current_time,
+                    "end": current_time + duration,
+                    "text": line.strip()
+                })
+                current_time += duration
+        
+        # Save the generated timestamps for future use
+        os.makedirs(os.path.dirname(self.job.timestamps_path), exist_ok=True)
+        with open(self.job.timestamps_path, "w", encoding="utf-8") as f:
+            json.dump(timestamps, f, indent=4)
+        print(f"✅ Estimated timestamps saved to {self.job.timestamps_path}")
+        return timestamps
+
+    def normalize_frame(self, image_path, size=None):
+        """Decodes an image into a portrait frame ready for rendering.
+        
+        Args:
+            image_path (str): Path to the generated image
+            size (tuple): Optional (width, height) the frame must match
+            
+        Returns:
+            numpy.ndarray: The decoded RGB frame
+        """
+        image_clip = ImageClip(image_path).resize(1.1 * self.scale)
+        image_clip = crop_to_portrait(image_clip)
+        frame = image_clip.get_frame(0)
+        
+        if size is None:
+            # libx264 needs even dimensions
+            h, w = frame.shape[:2]
+            return frame[:h - h % 2, :w - w % 2]
+        
+        if (frame.shape[1], frame.shape[0]) != tuple(size):
+            frame = ImageClip(frame).resize(newsize=tuple(size)).get_frame(0)
+        return frame
+
+    def render_segment(self, frame, duration, index, output_path=None):
+        """Renders a single animated segment without audio.
+        
+        Args:
+            frame (numpy.ndarray): Normalized frame from normalize_frame
+            duration (float): Segment length in seconds
+            index (int): 1-based segment number, also picks the zoom direction
+            output_path (str): Where to write the segment
+            
+        Returns:
+            str: Path to the rendered segment
+        """
+        if output_path is None:
+            output_path = os.path.join(self.job.segments_dir, f"segment_{index}.mp4")
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        
+        image_clip = ImageClip(frame).set_duration(duration)
+        image_clip = self.animation.apply(image_clip, zoom_in=(index % 2 == 1))
+        
+        preset, threads = self.get_encoder_settings()
+        fps = self.fps
+        started = time.perf_counter()
+        with tracing.span("moviepy.write_videofile", output="segment", segment=index, duration=duration):
+            image_clip.write_videofile(output_path, fps=fps, codec="libx264", preset=preset,
+                                       threads=threads, audio=False, logger=cancellation.frame_logger(None))
+        record_encode("segment", time.perf_counter() - started, frames=int(duration * fps))
+        image_clip.close()
+        return output_path
+
+    def assemble_segments(self, segment_paths, duration, audio_file=None, output_path=None):
+        """Joins rendered segments and adds the voiceover without re-encoding the video.
+        
+        Args:
+            segment_paths (list): Rendered segment paths in playback order
+            duration (float): Total video duration in seconds
+            audio_file (str): Voiceover to use as the audio track
+            output_path (str): Where to write the final video
+            
+        Returns:
+            str: Path to the assembled video, or None on failure
+        """
+        if not segment_paths:
+            print("❌ Error: No segments found to create video")
+            return None
+        
+        audio_file = audio_file or self.audio_file
+        output_path = output_path or self.job.video_path
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        
+        list_filename = os.path.join(os.path.dirname(segment_paths[0]), "segments.txt")
+        with open(list_filename, "w", encoding="utf-8") as list_file:
+            for segment_path in segment_paths:
+                list_file.write(f"file '{os.path.abspath(segment_path)}'\n")
+        
+        print(f"⏳ Assembling {len(segment_paths)} segments into {output_path}...")
+        cmd = [
+            'ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_filename,
+            '-i', audio_file, '-map', '0:v:0', '-map', '1:a:0',
+            '-c:v', 'copy', '-c:a', 'aac', '-t', f"{duration:.3f}", output_path
+        ]
+        started = time.perf_counter()
+        with tracing.span("ffmpeg.concat_segments", segments=len(segment_paths), path=output_path) as span:
+            result = cancellation.run_process(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            span.set(returncode=result.returncode)
+        record_encode("assemble", time.perf_counter() - started)
+        os.remove(list_filename)
+        
+        if result.returncode != 0:
+            print(f"❌ ffmpeg failed to assemble segments: {result.stderr.decode(errors='ignore')[-500:]}")
+            return None
+        
+        print(f"✅ Video successfully saved as '{output_path}'")
+        return output_path
+
 if __name__ == "__main__":
     topic = input("Enter the topic: ")
     generator = VideoGenerator()
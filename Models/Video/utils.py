@@ -3,12 +3,15 @@ import os
 import json
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 from Models.config import SAVE_TIMESTAMPS_TO, SAVE_VIDEO_TO, SAVE_VOICEOVER_TO, SAVE_IMAGES_TO, SAVE_SCRIPT_TO
-import whisper
-from moviepy.video.fx.all import crop
 from Models.config import VIDEO_RATIO
+import tracing
 
-def ensure_directories():
+def ensure_directories(job=None):
     """Ensures all necessary directories exist."""
+    if job is not None:
+        job.ensure_folders()
+        return
+    
     dirs = [
         os.path.dirname(SAVE_TIMESTAMPS_TO),
         os.path.dirname(SAVE_VIDEO_TO),
@@ -21,6 +24,7 @@ def ensure_directories():
 
 def crop_to_portrait(clip):
         """Ensure the image is in portrait ratio by cropping."""
+        from moviepy.video.fx.all import crop
         w, h = clip.size
         target_ratio = VIDEO_RATIO
         current_ratio = w / h
@@ -77,8 +81,11 @@ def transcribe_audio_with_script(audio_file=SAVE_VOICEOVER_TO, script_file=SAVE_
     
     # Attempt to use Whisper for accurate transcription
     try:
-        model = whisper.load_model("small")
-        result = model.transcribe(audio_file)
+        # Whisper pulls in torch, so only import it when a transcription actually runs
+        import whisper
+        with tracing.span("whisper.transcribe", model="small"):
+            model = whisper.load_model("small")
+            result = model.transcribe(audio_file)
 
         total_audio_duration = result["segments"][-1]["end"] if result["segments"] else 52.0
         script_lines = load_script_lines(script_file)
@@ -124,7 +131,7 @@ def transcribe_audio_with_script(audio_file=SAVE_VOICEOVER_TO, script_file=SAVE_
     print(f"✅ Timestamps saved to {output_file}")
     return matched_segments
 
-def verify_assets(timestamps=None, audio_file=SAVE_VOICEOVER_TO):
+def verify_assets(timestamps=None, audio_file=SAVE_VOICEOVER_TO, images_dir=SAVE_IMAGES_TO):
     """Verify that all necessary assets exist for video generation."""
     if not os.path.exists(audio_file):
         print(f"❌ Audio file not found: {audio_file}")
@@ -139,7 +146,7 @@ def verify_assets(timestamps=None, audio_file=SAVE_VOICEOVER_TO):
     
     missing_images = []
     for i in range(1, len(timestamps) + 1):
-        image_path = f"{SAVE_IMAGES_TO.rstrip('/')}/image_{i}.jpg"
+        image_path = f"{images_dir.rstrip('/')}/image_{i}.jpg"
         if not os.path.exists(image_path):
             missing_images.append(i)
     
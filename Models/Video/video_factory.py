@@ -5,12 +5,12 @@ sys.dont_write_bytecode = True
 import importlib
 from config import VIDEO_MODEL
 
-def load_video_model():
+def load_video_model(job=None):
     module_name = f"Models.Video.Models.{VIDEO_MODEL}"
     try:
         module = importlib.import_module(module_name)
         print(f"📝 Loading Video Model: {VIDEO_MODEL}")
-        video_generator = module.VideoGenerator()
+        video_generator = module.VideoGenerator(job=job)
         return video_generator
     except ImportError:
         raise ImportError(f"❌ Error: {VIDEO_MODEL}.py not found in Models/Video/Models")
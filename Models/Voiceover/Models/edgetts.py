@@ -3,16 +3,27 @@ import os
 import asyncio
 import edge_tts
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
-from Models.config import SAVE_VOICEOVER_TO
+from Models.job_context import JobContext
 from config import AUDIO_MODEL_VOICE
 from Models.utils import ensure_save_directory
+from metrics import provider_request
+import tracing
+import deadline
+import cancellation
+import job_logging
 import tempfile
 import subprocess
 import time
 
 class VoiceOverGenerator:
-    def __init__(self):
-        ensure_save_directory(SAVE_VOICEOVER_TO)
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
+        ensure_save_directory(self.job.voiceover_path)
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+        ensure_save_directory(self.job.voiceover_path)
 
     def split_text(self, text, max_chars=1000):
         """Split text into chunks of max_chars, breaking at sentence or paragraph boundaries."""
@@ -50,8 +61,12 @@ class VoiceOverGenerator:
         return chunks
 
     async def text_to_audio_chunk(self, text, output_path):
-        communicate = edge_tts.Communicate(text, AUDIO_MODEL_VOICE)
-        await communicate.save(output_path)
+        voice = self.job.setting("AUDIO_MODEL_VOICE", AUDIO_MODEL_VOICE)
+        communicate = edge_tts.Communicate(text, voice)
+        with provider_request("edgetts"), \
+                tracing.span("tts.chunk", provider="edgetts", voice=voice, characters=len(text), output=output_path):
+            # Within a job deadline the chunk may only take what is left of the job's budget
+            await cancellation.guard(asyncio.wait_for(communicate.save(output_path), deadline.timeout()))
 
     def generate_voiceover(self, text):
         # If text is too long, split it into chunks
@@ -62,8 +77,8 @@ class VoiceOverGenerator:
             
             chunk_files = []
             for i, chunk in enumerate(chunks):
-                chunk_path = f"{SAVE_VOICEOVER_TO[:-4]}_chunk_{i}.mp3"  # Remove .mp3 and add chunk
-                print(f"🔊 Processing chunk {i+1}/{len(chunks)}...")
+                chunk_path = f"{self.job.voiceover_path[:-4]}_chunk_{i}.mp3"  # Remove .mp3 and add chunk
+                job_logging.chatter(f"🔊 Processing chunk {i+1}/{len(chunks)}...")
                 
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
@@ -73,7 +88,7 @@ class VoiceOverGenerator:
                 chunk_files.append(chunk_path)
                 
             # Combine all chunks into the final audio file
-            self.combine_audio_chunks(chunk_files, SAVE_VOICEOVER_TO)
+            self.combine_audio_chunks(chunk_files, self.job.voiceover_path)
             
             # Clean up temporary chunk files
             for chunk_file in chunk_files:
@@ -83,10 +98,11 @@ class VoiceOverGenerator:
             # Original behavior for shorter text
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            loop.run_until_complete(self.text_to_audio_chunk(text, SAVE_VOICEOVER_TO))
+            loop.run_until_complete(self.text_to_audio_chunk(text, self.job.voiceover_path))
             loop.close()
         
-        print(f"✅ Audio file saved at {SAVE_VOICEOVER_TO}")
+        print(f"✅ Audio file saved at {self.job.voiceover_path}")
+        return self.job.voiceover_path
     
     def combine_audio_chunks(self, chunk_files, output_path):
         """Combine multiple audio chunks into a single file using ffmpeg."""
@@ -104,7 +120,8 @@ class VoiceOverGenerator:
             '-c', 'copy', output_path, '-y'
         ]
         
-        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with tracing.span("ffmpeg.concat_audio", chunks=len(chunk_files), output=output_path):
+            cancellation.run_process(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         
         # Clean up the temporary list file
         os.remove(list_filename)
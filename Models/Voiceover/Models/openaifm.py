@@ -1,31 +1,43 @@
 import sys
 import os
-import requests
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
-from Models.config import SAVE_VOICEOVER_TO
+from Models.job_context import JobContext
 from config import AUDIO_MODEL_VOICE
 from Models.utils import ensure_save_directory
+import tracing
+import deadline
+import cancellation
 
 class VoiceOverGenerator:
-    def __init__(self):
-        ensure_save_directory(SAVE_VOICEOVER_TO)
+    def __init__(self, job=None):
+        self.job = job or JobContext.default()
+        ensure_save_directory(self.job.voiceover_path)
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+        ensure_save_directory(self.job.voiceover_path)
 
     def generate_voiceover(self, text):
         url = "https://www.openai.fm/api/generate"
         payload = {
             "input": text,
-            "voice": AUDIO_MODEL_VOICE,
+            "voice": self.job.setting("AUDIO_MODEL_VOICE", AUDIO_MODEL_VOICE),
             "vibe": "null"
         }
         files = {key: (None, value) for key, value in payload.items()}
-        response = requests.post(url, files=files)
+        with tracing.span("tts.request", provider="openaifm", voice=payload["voice"], characters=len(text)) as span:
+            response = cancellation.post(url, files=files, timeout=deadline.timeout())
+            span.set(status_code=response.status_code)
 
         if response.status_code == 200:
-            with open(SAVE_VOICEOVER_TO, "wb") as f:
+            with open(self.job.voiceover_path, "wb") as f:
                 f.write(response.content)
-            print(f"✅ Audio file saved at {SAVE_VOICEOVER_TO}")
+            print(f"✅ Audio file saved at {self.job.voiceover_path}")
+            return self.job.voiceover_path
         else:
             print("❌ Error:", response.status_code, response.text)
+            return None
 
 
 if __name__ == "__main__":
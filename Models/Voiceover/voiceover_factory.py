@@ -5,12 +5,12 @@ sys.dont_write_bytecode = True
 import importlib
 from config import AUDIO_MODEL
 
-def load_voiceover_model():
+def load_voiceover_model(job=None):
     module_name = f"Models.Voiceover.Models.{AUDIO_MODEL}"
     try:
         module = importlib.import_module(module_name)
         print(f"🎙️ Loading Voiceover Model: {AUDIO_MODEL}")
-        return module.VoiceOverGenerator()
+        return module.VoiceOverGenerator(job=job)
     except ImportError:
         raise ImportError(f"❌ Error: {AUDIO_MODEL}.py not found in Models/Voiceover/Models")
 
@@ -1,8 +1,26 @@
+TEMP_DIR = "Data/Temp/"
+JOBS_DIR = "Data/Jobs/"
+OUTPUT_DIR = "Data/Output/"
 SAVE_SCRIPT_TO = "Data/Temp/Script/Script.txt"
 SAVE_IMAGES_TO = "Data/Temp/Generated_Images/"
 SAVE_VOICEOVER_TO = "Data/Temp/Voiceover/Voiceover.mp3"
 SAVE_TIMESTAMPS_TO = "Data/Temp/Timestamps/Timestamps.json"
+SAVE_WORD_TIMESTAMPS_TO = "Data/Temp/Timestamps/Word_Timestamps.json"
 SAVE_VIDEO_TO = "Data/Temp/Video/Video.mp4"
+SAVE_SEGMENTS_TO = "Data/Temp/Video/Segments/"
+STAGE_HISTORY_FILE = "Data/Stats/stage_history.jsonl"
+SHARED_QUEUE_DIR = "Data/Queue/"
+JOB_CACHE_DIR = "Data/Cache/Jobs/"
+ARTIFACT_STORE_DIR = "Data/Artifacts/"
+MEMORY_JOBS_DIR = "/dev/shm/text_to_video/Jobs/"
 VIDEO_FPS = 24
+VIDEO_SCALE = 1.0
 VIDEO_RATIO = 9/16
-DEFAULT_CAPTION_STYLE = "default"
\ No newline at end of file
+LINES_PER_IMAGE = 1
+DEFAULT_CAPTION_STYLE = "default"
+
+# Where job workspaces (and with them every intermediate file) live: "disk" (JOBS_DIR) or
+# "memory" (MEMORY_JOBS_DIR on a tmpfs); see workspace_storage.py
+WORKSPACE_STORAGE = "disk"
+MEMORY_WORKSPACE_BUDGET = 2 * 1024 ** 3  # Bytes all memory workspaces may hold together
+MEMORY_WORKSPACE_JOB_BYTES = 512 * 1024 ** 2  # Bytes reserved per memory workspace
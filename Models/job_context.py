@@ -0,0 +1,117 @@
+import os
+import shutil
+import time
+import uuid
+from Models.config import (TEMP_DIR, OUTPUT_DIR, SAVE_SCRIPT_TO, SAVE_IMAGES_TO,
+                           SAVE_VOICEOVER_TO, SAVE_TIMESTAMPS_TO, SAVE_WORD_TIMESTAMPS_TO, SAVE_VIDEO_TO,
+                           SAVE_SEGMENTS_TO)
+from Models import workspace_storage
+
+
+def _relative_to_temp(path):
+    """Returns a Data/Temp path relative to the temp directory, e.g. 'Script/Script.txt'."""
+    return os.path.relpath(path, TEMP_DIR)
+
+
+def new_job_id():
+    """Returns a unique, sortable job identifier."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+class JobContext:
+    """Owns the workspace directory of a single generation job.
+
+    Every factory-loaded generator receives a JobContext and reads and writes
+    its files through it, so several jobs can run side by side without
+    sharing any intermediate files. The layout inside the workspace mirrors
+    the legacy Data/Temp layout from Models/config.py.
+
+    Per-job settings (for example the voice) are kept in overrides, keyed by
+    the config.py name they replace, so concurrent jobs never have to edit
+    config.py.
+    """
+
+    def __init__(self, root, job_id=None, overrides=None):
+        self.root = root
+        self.job_id = job_id or os.path.basename(os.path.normpath(root))
+        self.overrides = dict(overrides or {})
+        self.script_path = os.path.join(root, _relative_to_temp(SAVE_SCRIPT_TO))
+        self.images_dir = os.path.join(root, _relative_to_temp(SAVE_IMAGES_TO))
+        self.voiceover_path = os.path.join(root, _relative_to_temp(SAVE_VOICEOVER_TO))
+        self.timestamps_path = os.path.join(root, _relative_to_temp(SAVE_TIMESTAMPS_TO))
+        # Captions keep their word timings apart from the segment timings the video is cut by
+        self.word_timestamps_path = os.path.join(root, _relative_to_temp(SAVE_WORD_TIMESTAMPS_TO))
+        self.video_path = os.path.join(root, _relative_to_temp(SAVE_VIDEO_TO))
+        self.segments_dir = os.path.join(root, _relative_to_temp(SAVE_SEGMENTS_TO))
+        self.temp_dir = os.path.join(root, "Tmp")
+        self.checkpoints_dir = os.path.join(root, "Checkpoints")
+        self.output_dir = os.path.join(OUTPUT_DIR, self.job_id)
+        self.profiles_dir = os.path.join(self.output_dir, "Profiles")
+        self.trace_path = os.path.join(self.output_dir, "trace.jsonl")
+
+    @classmethod
+    def create(cls, jobs_dir=None, job_id=None, overrides=None):
+        """Creates a job with a new, unique workspace under jobs_dir.
+
+        Without jobs_dir, the workspace storage picks a disk or memory
+        workspace (see workspace_storage.py).
+        """
+        if job_id is None:
+            job_id = new_job_id()
+        if jobs_dir is None:
+            jobs_dir = workspace_storage.current().jobs_dir(job_id)
+        job = cls(os.path.join(jobs_dir, job_id), job_id, overrides)
+        job.ensure_folders()
+        return job
+
+    @classmethod
+    def latest_job_id(cls, jobs_dir=None):
+        """Returns the id of the most recently modified job workspace, or None."""
+        jobs_dirs = [jobs_dir] if jobs_dir else workspace_storage.current().jobs_dirs
+        workspaces = [os.path.join(directory, name) for directory in jobs_dirs if os.path.isdir(directory)
+                      for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name))]
+        if not workspaces:
+            return None
+        return os.path.basename(max(workspaces, key=os.path.getmtime))
+
+    @classmethod
+    def default(cls):
+        """Returns the shared legacy workspace (Data/Temp) for standalone module runs."""
+        return cls(TEMP_DIR, job_id="default")
+
+    def setting(self, name, default=None):
+        """Returns the job's override for a config.py setting, or the given default."""
+        return self.overrides.get(name, default)
+
+    def image_path(self, img_number):
+        """Returns the path of the image for the given 1-based segment number."""
+        return os.path.join(self.images_dir, f"image_{img_number}.jpg")
+
+    def ensure_folders(self):
+        """Ensures all workspace folders exist."""
+        for folder in [os.path.dirname(self.script_path), self.images_dir,
+                       os.path.dirname(self.voiceover_path), os.path.dirname(self.timestamps_path),
+                       os.path.dirname(self.video_path), self.temp_dir, self.checkpoints_dir]:
+            os.makedirs(folder, exist_ok=True)
+
+    def publish(self, file_path, filename=None):
+        """Moves a finished artifact out of the workspace into the job's output folder.
+
+        Args:
+            file_path (str): Path of the file inside the workspace
+            filename (str): Optional new name for the published file
+
+        Returns:
+            str: Path of the published file
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        destination = os.path.join(self.output_dir, filename or os.path.basename(file_path))
+        shutil.move(file_path, destination)
+        return destination
+
+    def cleanup(self):
+        """Removes the job workspace. Published outputs are kept."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __repr__(self):
+        return f"JobContext(job_id={self.job_id!r}, root={self.root!r})"
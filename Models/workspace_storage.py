@@ -0,0 +1,160 @@
+"""
+Workspace Storage for Text-to-Video Pipeline
+
+Stages hand their intermediates to each other through files in the job
+workspace: the script, the images, the voiceover, the timestamps and the
+rendered, captioned and BGM videos. With the
+"memory" backend the workspace lives on a RAM-backed tmpfs (/dev/shm on
+Linux), so none of that traffic reaches the disk, without any generator
+knowing the difference. The published video is still moved to the output
+folder on disk.
+
+Memory workspaces share MEMORY_WORKSPACE_BUDGET bytes. A new job counts every
+memory workspace as at least MEMORY_WORKSPACE_JOB_BYTES (what a job grows
+to, roughly) and gets a disk workspace instead once the budget is spent, the
+tmpfs has less than that free, or there is no tmpfs. The check and the
+creation of the workspace happen under a lock, shared with other processes
+through a lock file, so jobs created together can't all take the last of
+the budget; the workspace holds its share until cleanup removes it.
+
+The fallback to disk only applies when a job is created. A running job is
+not moved, so one that grows far past MEMORY_WORKSPACE_JOB_BYTES can still
+fill the tmpfs and fail with ENOSPC; size the budget and the tmpfs for the
+largest jobs. A memory workspace doesn't survive a reboot, so such a job can
+only be resumed while the machine is up.
+"""
+
+import os
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows, which has no memory workspaces
+    fcntl = None
+
+from Models.config import (JOBS_DIR, MEMORY_JOBS_DIR, WORKSPACE_STORAGE, MEMORY_WORKSPACE_BUDGET,
+                           MEMORY_WORKSPACE_JOB_BYTES)
+
+logger = logging.getLogger(__name__)
+
+DISK = "disk"
+MEMORY = "memory"
+BACKENDS = (DISK, MEMORY)
+
+# In the memory jobs directory, held while a process picks and creates a workspace
+LOCK_FILE = ".lock"
+
+
+def _size(directory):
+    """Bytes held by the files under a directory."""
+    total = 0
+    for folder, _, names in os.walk(directory):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                continue
+    return total
+
+
+class WorkspaceStorage:
+    """Picks where the workspace of a new job is created."""
+
+    def __init__(self, backend=WORKSPACE_STORAGE, memory_dir=MEMORY_JOBS_DIR, budget=MEMORY_WORKSPACE_BUDGET,
+                 job_bytes=MEMORY_WORKSPACE_JOB_BYTES, disk_dir=JOBS_DIR):
+        """Initialize the storage.
+
+        Args:
+            backend (str): DISK or MEMORY
+            memory_dir (str): Jobs directory on a tmpfs
+            budget (int): Bytes all memory workspaces together may hold
+            job_bytes (int): Bytes reserved for every memory workspace
+            disk_dir (str): Jobs directory on disk
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"❌ Unknown workspace storage '{backend}', expected one of {', '.join(BACKENDS)}")
+        self.backend = backend
+        self.memory_dir = memory_dir
+        self.budget = budget
+        self.job_bytes = job_bytes
+        self.disk_dir = disk_dir
+        self._lock = threading.Lock()
+
+    @property
+    def jobs_dirs(self):
+        """Every directory a job workspace may be in, whichever backend created it."""
+        return (self.disk_dir, self.memory_dir)
+
+    def jobs_dir(self, job_id):
+        """Return the jobs directory for a job's workspace, creating the workspace in it.
+
+        An existing workspace (a resumed job) stays where it is. A new memory
+        workspace is created while the budget is locked, which reserves its
+        share of the budget until the workspace is removed.
+        """
+        for jobs_dir in self.jobs_dirs:
+            if os.path.isdir(os.path.join(jobs_dir, job_id)):
+                return jobs_dir
+        if self.backend == MEMORY and self.memory_available():
+            with self._locked():
+                if self.fits():
+                    os.makedirs(os.path.join(self.memory_dir, job_id))
+                    return self.memory_dir
+        return self.disk_dir
+
+    def memory_available(self):
+        """Whether the tmpfs for memory workspaces exists (it doesn't on Windows or macOS)."""
+        if os.name == "nt":
+            # There, /dev/shm would just be a folder on the current drive
+            logger.warning("No memory workspaces on Windows, using a disk workspace")
+            return False
+        try:
+            os.makedirs(self.memory_dir, exist_ok=True)
+            return True
+        except OSError as e:
+            logger.warning(f"No memory workspaces, {self.memory_dir} is not available: {str(e)}")
+            return False
+
+    def fits(self):
+        """Whether another job fits in the memory budget next to the running ones, and on the tmpfs.
+
+        Call it with the budget locked, or another job may take the room first.
+        """
+        reserved = sum(max(_size(os.path.join(self.memory_dir, name)), self.job_bytes)
+                       for name in os.listdir(self.memory_dir) if not name.startswith("."))
+        if reserved + self.job_bytes > self.budget:
+            logger.info(f"Memory workspaces hold {reserved} of {self.budget} bytes, using a disk workspace")
+            return False
+        stats = os.statvfs(self.memory_dir)
+        if stats.f_bavail * stats.f_frsize < self.job_bytes:
+            logger.info(f"Less than {self.job_bytes} bytes free in {self.memory_dir}, using a disk workspace")
+            return False
+        return True
+
+    @contextmanager
+    def _locked(self):
+        """Hold the budget against other threads, and other processes through the lock file."""
+        with self._lock, open(os.path.join(self.memory_dir, LOCK_FILE), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_storage = WorkspaceStorage()
+
+
+def configure(backend):
+    """Switch the workspace storage of this process to a backend."""
+    global _storage
+    _storage = WorkspaceStorage(backend)
+
+
+def current():
+    """The workspace storage of this process."""
+    return _storage
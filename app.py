@@ -6,7 +6,9 @@ from pathlib import Path
 import json
 from datetime import datetime
 import shutil
-import glob
+import uuid
+from Models.config import OUTPUT_DIR
+import service_client
 
 # Configure page
 st.set_page_config(
@@ -84,48 +86,56 @@ def delete_video(video_path):
             with open(log_file, 'w') as f:
                 json.dump(logs, f, indent=2)
 
-def run_main_script(topic, voice_choice):
-    """Run the main.py script with the given topic and voice choice"""
-    # Update config with voice choice
-    config_path = "config.py"
+VOICES = {
+    "Male": "en-US-ChristopherNeural",
+    "Female": "en-US-JennyNeural",
+}
+
+def store_video(generated_video, topic, voice_choice):
+    """Move a published video into the history folder and log it"""
+    final_video = f"Data/History/{topic.replace(' ', '_')}_video.mp4"
+    # Only the video moves; the job's manifest, logs, trace and profiles stay in its output folder
+    shutil.move(generated_video, final_video)
+    save_generation_log(topic, voice_choice, final_video)
+    return final_video
+
+def run_with_service(topic, voice_choice):
+    """Submit the job to the running generation service (server.py) and wait for it"""
+    output_name = f"{topic.replace(' ', '_')}_video.mp4"
+    job = service_client.submit_job(topic, voice=VOICES[voice_choice], output=output_name)
+    status = st.empty()
     
-    # Read current config
-    with open(config_path, 'r') as f:
-        config_content = f.read()
+    def show_status(record):
+        eta, estimate = record.get("eta_seconds"), record.get("estimated_seconds")
+        if record["status"] == "running" and eta is not None:
+            status.info(f"Generating, about {int(eta // 60)}m {int(eta % 60)}s left")
+        elif record["status"] == "queued" and estimate is not None:
+            status.info(f"Queued, the video should take about {int(estimate // 60)}m {int(estimate % 60)}s")
+        else:
+            status.info(f"Job {record['status']}")
     
-    # Update voice choice in config
-    if "AUDIO_MODEL_VOICE =" in config_content:
-        if voice_choice == "Male":
-            new_config = config_content.replace(
-                'AUDIO_MODEL_VOICE = "en-US-JennyNeural"', 
-                'AUDIO_MODEL_VOICE = "en-US-ChristopherNeural"'
-            ).replace(
-                'AUDIO_MODEL_VOICE = "en-US-AriaNeural"', 
-                'AUDIO_MODEL_VOICE = "en-US-ChristopherNeural"'
-            ).replace(
-                'AUDIO_MODEL_VOICE = "en-US-ZiraNeural"', 
-                'AUDIO_MODEL_VOICE = "en-US-ChristopherNeural"'
-            )
-        else:  # Female
-            new_config = config_content.replace(
-                'AUDIO_MODEL_VOICE = "en-US-ChristopherNeural"', 
-                'AUDIO_MODEL_VOICE = "en-US-JennyNeural"'
-            ).replace(
-                'AUDIO_MODEL_VOICE = "en-US-AriaNeural"', 
-                'AUDIO_MODEL_VOICE = "en-US-JennyNeural"'
-            ).replace(
-                'AUDIO_MODEL_VOICE = "en-US-ZiraNeural"', 
-                'AUDIO_MODEL_VOICE = "en-US-JennyNeural"'
-            )
-    else:
-        # If AUDIO_MODEL_VOICE line doesn't exist, add it
-        new_config = config_content
+    record = None
+    try:
+        record = service_client.wait_for_job(job["job_id"], on_update=show_status)
+    finally:
+        # The page was left or rerun before the job finished: give its capacity back to other jobs
+        if record is None:
+            service_client.cancel_job(job["job_id"])
+    status.empty()
     
-    with open(config_path, 'w') as f:
-        f.write(new_config)
+    if record["status"] == "done" and record.get("video_path") and os.path.exists(record["video_path"]):
+        return store_video(record["video_path"], topic, voice_choice), json.dumps(record, indent=2)
     
-    # Run main.py with topic
-    cmd = [sys.executable, "main.py", "--topic", topic, "--output", f"{topic.replace(' ', '_')}_video.mp4"]
+    return None, json.dumps(record, indent=2)
+
+def run_main_script(topic, voice_choice):
+    """Run the main.py script with the given topic and voice choice"""
+    # Run main.py with topic in its own job workspace
+    job_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    output_name = f"{topic.replace(' ', '_')}_video.mp4"
+    # Quiet: per-image and per-word lines would only be piped through here to be dropped
+    cmd = [sys.executable, "main.py", "--topic", topic, "--output", output_name, "--job-id", job_id,
+           "--voice", VOICES[voice_choice], "--quiet"]
     
     # Create a temporary file to capture output
     import tempfile
@@ -140,32 +150,37 @@ def run_main_script(topic, voice_choice):
         
         # Stream output to the temporary file and to Streamlit
         output_lines = []
-        for line in process.stdout:
-            output_lines.append(line)
-            tmp_file.write(line)
-            tmp_file.flush()
-        
-        process.wait()
+        try:
+            for line in process.stdout:
+                output_lines.append(line)
+                tmp_file.write(line)
+                tmp_file.flush()
+            
+            process.wait()
+        finally:
+            # The page was left or rerun before the job finished: main.py cancels the job on SIGTERM
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.communicate(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
         tmp_file.flush()
         
         # Move the generated video to history folder
-        generated_video = "Data/Temp/Video/output_video.mp4"
-        final_video = f"Data/History/{topic.replace(' ', '_')}_video.mp4"
+        generated_video = os.path.join(OUTPUT_DIR, job_id, output_name)
         
         if os.path.exists(generated_video):
-            shutil.move(generated_video, final_video)
-            save_generation_log(topic, voice_choice, final_video)
-            return final_video, "".join(output_lines)
-        else:
-            # Look for any mp4 file in Temp/Video
-            video_files = glob.glob("Data/Temp/Video/*.mp4")
-            if video_files:
-                shutil.move(video_files[0], final_video)
-                save_generation_log(topic, voice_choice, final_video)
-                return final_video, "".join(output_lines)
+            return store_video(generated_video, topic, voice_choice), "".join(output_lines)
     
     return None, "".join(output_lines)
 
+def generate_video(topic, voice_choice):
+    """Generate a video, preferring the warm generation service over a fresh main.py"""
+    if service_client.is_available():
+        return run_with_service(topic, voice_choice)
+    return run_main_script(topic, voice_choice)
+
 def main():
     st.title("🎬 Text-to-Video Generator")
     st.markdown("---")
@@ -187,7 +202,7 @@ def main():
             if topic.strip():
                 with st.spinner(f"Generating video for '{topic}' with {voice_choice.lower()} voice... This may take several minutes."):
                     try:
-                        video_path, output = run_main_script(topic, voice_choice)
+                        video_path, output = generate_video(topic, voice_choice)
                         
                         if video_path and os.path.exists(video_path):
                             st.success(f"✅ Video generated successfully!")
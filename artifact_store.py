@@ -0,0 +1,301 @@
+"""
+Artifact Store Module for Text-to-Video Pipeline
+
+This module keeps the files jobs produce (images, voiceover audio,
+timestamps, rendered segments and encoded videos) in a content-addressed
+store under a disk budget, instead of deleting them with the job workspace:
+
+    objects/<ab>/<sha256>        file contents, named by their hash
+    jobs/<job id>.json           path -> hash of every file a job left in its
+                                 workspace (Workspace/...) and output (Output/...)
+    pins/<owner>/<sha256>        artifacts an in-flight job still needs
+
+The same content is stored once, however many jobs produce it. Checkpoints
+put each stage's output files here as the stage finishes, so a resumed job
+gets back files that went missing from its workspace, and the job cache
+keeps its videos here. At the end of a job its whole workspace is recorded,
+so a failed or odd-looking job can be inspected later with
+`python artifact_store.py restore <job id>`.
+
+When the store grows past ARTIFACT_STORE_MAX_BYTES, the least recently used
+objects are evicted (reading or storing an object touches its modification
+time, which is the LRU clock) except the ones pinned by an in-flight job.
+Jobs drop their pins when they finish; pins of a job that crashed expire
+after PIN_TTL_SECONDS. Pins are files, so jobs in forked processes and on
+other nodes sharing the directory see each other's pins too.
+
+Files are hard-linked into the store when it shares a filesystem with them,
+so storing one costs no copy, and copied otherwise (a memory workspace).
+Objects are always copied out. The pipeline and its encoders may overwrite
+a workspace file in place, which changes an object linked to it as well, so
+get() checks an object against its hash and drops it if it changed.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import logging
+import argparse
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.dont_write_bytecode = True
+
+from Models.config import ARTIFACT_STORE_DIR
+from config import ARTIFACT_STORE_MAX_BYTES
+from checkpoints import hash_file
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PIN_TTL_SECONDS = 24 * 60 * 60
+
+STORE_BYTES = metrics.REGISTRY.gauge(
+    "text_to_video_artifact_store_bytes", "Bytes held by the artifact store after the last eviction.")
+EVICTED_ARTIFACTS = metrics.REGISTRY.counter(
+    "text_to_video_artifact_evictions_total", "Artifacts evicted from the artifact store to stay within its budget.")
+
+
+def _write_json(path, payload):
+    """Write a JSON file next to its destination and rename it into place."""
+    temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=4)
+    os.replace(temp_path, path)
+
+
+class ArtifactStore:
+    """Content-addressed files under a disk budget with LRU eviction and pinning."""
+
+    def __init__(self, directory=ARTIFACT_STORE_DIR, max_bytes=ARTIFACT_STORE_MAX_BYTES):
+        """Initialize the store.
+
+        Args:
+            directory (str): Where the store keeps its objects
+            max_bytes (int): Disk budget enforced by evict(), None for no limit
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(directory, "objects")
+        self.jobs_dir = os.path.join(directory, "jobs")
+        self.pins_dir = os.path.join(directory, "pins")
+        for folder in (self.objects_dir, self.jobs_dir, self.pins_dir):
+            os.makedirs(folder, exist_ok=True)
+
+    def path(self, digest):
+        """Path of an object in the store (it may not exist)."""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def has(self, digest):
+        return os.path.isfile(self.path(digest))
+
+    def put(self, file_path, digest=None, owner=None):
+        """Store a file's content.
+
+        Args:
+            file_path (str): File to store
+            digest (str): Its SHA-256, when the caller already hashed it
+            owner (str): Job that keeps the object pinned until release(owner)
+
+        Returns:
+            str: The content hash, which get() takes
+        """
+        digest = digest or hash_file(file_path)
+        if owner is not None:
+            self.pin(owner, digest)
+        object_path = self.path(digest)
+        try:
+            # Already stored: only mark it as recently used
+            os.utime(object_path)
+            return digest
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        temp_path = f"{object_path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.link(file_path, temp_path)
+        except OSError:
+            # Another filesystem (EXDEV), or one without hard links
+            shutil.copyfile(file_path, temp_path)
+        os.replace(temp_path, object_path)
+        return digest
+
+    def get(self, digest, destination):
+        """Copy an object to destination.
+
+        Returns:
+            str: destination, or None if the object isn't (or is no longer) stored
+        """
+        object_path = self.path(digest)
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        temp_path = f"{destination}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            shutil.copyfile(object_path, temp_path)
+        except FileNotFoundError:
+            return None
+        if hash_file(temp_path) != digest:
+            # The file it was linked from was overwritten in place
+            logger.warning(f"Dropping artifact {digest}, its content changed after it was stored")
+            os.remove(temp_path)
+            try:
+                os.remove(object_path)
+            except FileNotFoundError:
+                pass
+            return None
+        os.replace(temp_path, destination)
+        try:
+            os.utime(object_path)
+        except FileNotFoundError:
+            pass
+        return destination
+
+    def pin(self, owner, digest):
+        """Keep an object from being evicted until release(owner)."""
+        owner_dir = os.path.join(self.pins_dir, owner)
+        os.makedirs(owner_dir, exist_ok=True)
+        open(os.path.join(owner_dir, digest), "w").close()
+
+    def release(self, owner):
+        """Drop every pin of an owner."""
+        shutil.rmtree(os.path.join(self.pins_dir, owner), ignore_errors=True)
+
+    def pinned(self):
+        """Return the hashes pinned by any live owner, dropping pins that outlived PIN_TTL_SECONDS."""
+        digests = set()
+        now = time.time()
+        for owner in os.listdir(self.pins_dir):
+            owner_dir = os.path.join(self.pins_dir, owner)
+            try:
+                if now - os.path.getmtime(owner_dir) > PIN_TTL_SECONDS:
+                    logger.warning(f"Dropping stale artifact pins of {owner}")
+                    self.release(owner)
+                    continue
+                digests.update(os.listdir(owner_dir))
+            except FileNotFoundError:
+                continue
+        return digests
+
+    def archive(self, job):
+        """Store every file in a job's workspace and output folder and record where each one was.
+
+        Returns:
+            str: Path of the job's record
+        """
+        files = {}
+        for prefix, root in (("Workspace", job.root), ("Output", job.output_dir)):
+            for folder, _, names in os.walk(root):
+                for name in names:
+                    file_path = os.path.join(folder, name)
+                    relative_path = os.path.join(prefix, os.path.relpath(file_path, root))
+                    try:
+                        files[relative_path] = self.put(file_path, owner=job.job_id)
+                    except OSError as e:
+                        logger.warning(f"Could not store {file_path}: {str(e)}")
+        record_path = os.path.join(self.jobs_dir, f"{job.job_id}.json")
+        _write_json(record_path, {"job_id": job.job_id, "archived_at": time.time(), "files": files})
+        return record_path
+
+    def restore_job(self, job_id, destination):
+        """Copy the archived files of a job back into a workspace layout under destination.
+
+        Returns:
+            tuple: (restored paths, paths whose content was evicted)
+        """
+        with open(os.path.join(self.jobs_dir, f"{job_id}.json"), "r", encoding="utf-8") as f:
+            record = json.load(f)
+        restored, evicted = [], []
+        for relative_path, digest in record["files"].items():
+            target = os.path.join(destination, relative_path)
+            (restored if self.get(digest, target) else evicted).append(target)
+        return restored, evicted
+
+    def evict(self):
+        """Delete least recently used, unpinned objects until the store fits its budget.
+
+        Returns:
+            int: Bytes held by the store afterwards
+        """
+        objects = []
+        for folder, _, names in os.walk(self.objects_dir):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                object_path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(object_path)
+                except FileNotFoundError:
+                    continue
+                objects.append((stat.st_mtime, stat.st_size, name, object_path))
+        total = sum(size for _, size, _, _ in objects)
+
+        if self.max_bytes is not None and total > self.max_bytes:
+            pinned = self.pinned()
+            for _, size, digest, object_path in sorted(objects):
+                if total <= self.max_bytes:
+                    break
+                if digest in pinned:
+                    continue
+                try:
+                    os.remove(object_path)
+                except FileNotFoundError:
+                    continue
+                total -= size
+                EVICTED_ARTIFACTS.inc()
+            if total > self.max_bytes:
+                logger.warning(f"Artifact store holds {total} bytes, over its {self.max_bytes} byte budget, "
+                               f"in artifacts pinned by running jobs")
+        STORE_BYTES.set(total)
+        return total
+
+    def status(self):
+        """Summarize the store's size, budget, archived jobs and pins."""
+        objects, total = 0, 0
+        for folder, _, names in os.walk(self.objects_dir):
+            for name in names:
+                objects += 1
+                total += os.path.getsize(os.path.join(folder, name))
+        return {"objects": objects, "bytes": total, "max_bytes": self.max_bytes,
+                "jobs": len(os.listdir(self.jobs_dir)), "pinned": len(self.pinned())}
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Inspect the artifact store of finished jobs",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--dir", type=str, default=ARTIFACT_STORE_DIR, help="Artifact store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show the store's size and budget")
+    commands.add_parser("evict", help="Evict least recently used artifacts down to the budget")
+    restore = commands.add_parser("restore", help="Copy a job's archived workspace back for inspection")
+    restore.add_argument("job_id", help="Id of the job")
+    restore.add_argument("destination", nargs="?", help="Where to restore it (Data/Restored/<job id> by default)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    store = ArtifactStore(args.dir)
+
+    if args.command == "status":
+        print(json.dumps(store.status(), indent=2))
+    elif args.command == "evict":
+        print(f"🧹 Artifact store now holds {store.evict()} bytes")
+    else:
+        destination = args.destination or os.path.join("Data", "Restored", args.job_id)
+        try:
+            restored, evicted = store.restore_job(args.job_id, destination)
+        except FileNotFoundError:
+            print(f"❌ No archived workspace for job {args.job_id}")
+            return
+        print(f"✅ Restored {len(restored)} files of job {args.job_id} to {destination}")
+        for path in evicted:
+            print(f"⚠️ Evicted, not restored: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Batch Module for Text-to-Video Pipeline
+
+This module generates videos for many topics with a pool of workers. Each
+worker owns a GenerationPipeline, so its generators (and models such as
+WhisperX) are loaded once and stay warm across all the topics it handles.
+With fork=True the workers share one fork server instead and every topic
+runs in its own forked process (see fork_server.py).
+"""
+
+import os
+import json
+import queue
+import threading
+import logging
+import time
+
+from Models.config import OUTPUT_DIR
+from Models.job_context import JobContext
+from pipeline import GenerationPipeline
+from fork_server import ForkServer
+from scheduler import ResourceScheduler
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def load_topics(topics_file):
+    """Loads batch entries from a JSONL file.
+
+    Each line is either a JSON object with a "topic" key (and optionally
+    "output", "job_id", "deadline" in seconds and "fresh" to skip the job
+    cache) or a plain JSON string with the topic.
+
+    Args:
+        topics_file (str): Path to the JSONL file
+
+    Returns:
+        list: Entries as dicts with at least a "topic" key
+    """
+    entries = []
+    with open(topics_file, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                entry = {"topic": entry}
+            if not entry.get("topic"):
+                raise ValueError(f"❌ Line {line_number} of {topics_file} has no topic")
+            entries.append(entry)
+    return entries
+
+
+def write_job_manifest(job, result):
+    """Writes the result of one job next to its published video.
+
+    Returns:
+        str: Path to the manifest file
+    """
+    os.makedirs(job.output_dir, exist_ok=True)
+    manifest_path = os.path.join(job.output_dir, "manifest.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=4)
+    return manifest_path
+
+
+class BatchWorker(threading.Thread):
+    """Takes topics off the shared queue and runs them on a warm pipeline."""
+
+    def __init__(self, number, topics, on_result, pipeline_options=None, cleanup=True, pipeline=None,
+                 scheduler=None):
+        super().__init__(name=f"batch-worker-{number}", daemon=True)
+        self.topics = topics
+        self.on_result = on_result
+        self.pipeline = pipeline or GenerationPipeline(scheduler=scheduler, **(pipeline_options or {}))
+        self.cleanup = cleanup
+
+    def run(self):
+        while True:
+            try:
+                index, entry = self.topics.get_nowait()
+            except queue.Empty:
+                return
+            metrics.set_queue_depth("batch", self.topics.qsize())
+
+            overrides = {"JOB_DEADLINE": entry["deadline"]} if entry.get("deadline") else {}
+            if entry.get("fresh"):
+                overrides["JOB_CACHE_MAX_AGE"] = 0
+            started = time.time()
+            try:
+                # Inside the try, so a topic whose workspace can't be created fails instead of the worker
+                job = JobContext.create(job_id=entry.get("job_id"), overrides=overrides)
+                result = self.pipeline.run(
+                    entry["topic"],
+                    job,
+                    output_name=entry.get("output", "output_video.mp4"),
+                    cleanup=self.cleanup
+                )
+                result["index"] = index
+                result["worker"] = self.name
+                result["duration"] = time.time() - started
+                result["manifest_path"] = write_job_manifest(job, result)
+            except Exception as e:
+                logger.error(f"Topic {index + 1} '{entry['topic']}' crashed: {str(e)}")
+                result = {"index": index, "topic": entry["topic"], "error": str(e), "worker": self.name}
+            self.on_result(result)
+
+
+def run_batch(topics_file, workers=2, manifest_path=None, pipeline_options=None, cleanup=True, fork=False):
+    """Generates a video for every topic in a JSONL file.
+
+    Args:
+        topics_file (str): JSONL file with one topic per line
+        workers (int): Number of parallel workers
+        manifest_path (str): JSONL file that receives one result line per topic
+        pipeline_options (dict): Keyword arguments for GenerationPipeline
+        cleanup (bool): Remove each job workspace after it finishes
+        fork (bool): Run every topic in a process forked from one warm fork server
+
+    Returns:
+        list: Per-topic results in input order
+    """
+    entries = load_topics(topics_file)
+    if manifest_path is None:
+        manifest_path = os.path.join(OUTPUT_DIR, f"batch_{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+
+    topics = queue.Queue()
+    for index, entry in enumerate(entries):
+        topics.put((index, entry))
+    metrics.set_queue_depth("batch", topics.qsize())
+
+    results = []
+    lock = threading.Lock()
+
+    def on_result(result):
+        with lock:
+            results.append(result)
+            with open(manifest_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+            status = "❌ failed" if result.get("error") else "✅ done"
+            print(f"📦 [{len(results)}/{len(entries)}] {status}: {result['topic']}")
+
+    workers = max(1, min(workers, len(entries)))
+    print(f"📦 Generating {len(entries)} videos with {workers} workers")
+    logger.info(f"Batch of {len(entries)} topics from {topics_file}, {workers} workers, manifest {manifest_path}")
+
+    estimate = GenerationPipeline(**(pipeline_options or {})).estimate()
+    if estimate is not None:
+        total = estimate["total_seconds"] * len(entries)
+        print(f"⏳ Estimated {estimate['total_seconds']:.0f}s per video, about {total / workers:.0f}s for the batch")
+
+    # The fork server has to be forked before any worker thread starts
+    fork_server = ForkServer(pipeline_options).start() if fork else None
+    # Workers' stages are admitted by resource class, so one topic's downloads overlap another's render
+    scheduler = ResourceScheduler()
+    pool = [BatchWorker(n + 1, topics, on_result, pipeline_options, cleanup, fork_server, scheduler)
+            for n in range(workers)]
+
+    started = time.time()
+    try:
+        for worker in pool:
+            worker.start()
+        for worker in pool:
+            worker.join()
+    finally:
+        if fork_server is not None:
+            fork_server.stop()
+
+    failed = len([r for r in results if r.get("error")])
+    print(f"\n📦 Batch complete in {time.time() - started:.2f}s: "
+          f"{len(results) - failed} succeeded, {failed} failed")
+    print(f"Results written to: {manifest_path}")
+
+    return sorted(results, key=lambda r: r["index"])
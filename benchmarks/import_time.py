@@ -0,0 +1,149 @@
+"""
+Startup Benchmark for Text-to-Video Pipeline
+
+Measures what it costs to start the pipeline: the wall time of
+`python main.py --help` and the import time of the entry points and of each
+provider module selected in config.py. Every measurement runs in a fresh
+interpreter with `python -X importtime`, so nothing is cached between them,
+and the heaviest modules pulled in by each import are listed.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 3] [--top 8] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.dont_write_bytecode = True
+
+from config import SCRIPT_MODEL, IMG_MODEL, PROMPT_MODEL, AUDIO_MODEL, VIDEO_MODEL, CAPTION_MODEL, BGM_MODEL, ANIMATION
+
+ENTRY_POINTS = ["main", "pipeline", "batch", "server"]
+
+PROVIDER_MODULES = [
+    f"Models.Script.Models.{SCRIPT_MODEL}",
+    f"Models.Image.Img_Prompts.{PROMPT_MODEL}",
+    f"Models.Image.Models.{IMG_MODEL}",
+    f"Models.Voiceover.Models.{AUDIO_MODEL}",
+    f"Models.Video.Models.{VIDEO_MODEL}",
+    f"Models.Animations.Models.{ANIMATION}",
+    f"Models.Captions.Models.{CAPTION_MODEL}",
+    f"Models.BGM.Models.{BGM_MODEL}",
+]
+
+# Imported by every interpreter before the measured module
+STARTUP_PACKAGES = {"site", "encodings", "codecs", "io", "abc", "stat", "posixpath", "ntpath", "genericpath",
+                    "os", "_collections_abc", "_distutils_hack", "zipimport", "_frozen_importlib_external"}
+
+
+def parse_importtime(stderr):
+    """Parses `-X importtime` output into (module, self_us, cumulative_us) tuples."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def measure_import(module, repeat=3):
+    """Imports a module in fresh interpreters and keeps the fastest run.
+
+    Returns:
+        dict: Wall and import time in seconds, heaviest sub-imports, or an error
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        wall = time.perf_counter() - started
+
+        if process.returncode != 0:
+            errors = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+            return {"module": module, "error": errors[-1] if errors else f"exit code {process.returncode}"}
+
+        entries = parse_importtime(process.stderr)
+        cumulative = next((c for name, _, c in reversed(entries) if name == module), 0)
+        if best is None or wall < best["wall"]:
+            best = {"module": module, "wall": wall, "import": cumulative / 1e6, "entries": entries}
+    return best
+
+
+def measure_command(args, repeat=3):
+    """Returns the fastest wall time in seconds of running a command from the repo root."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, capture_output=True)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def heaviest(module, entries, top=8):
+    """Returns the packages (other than the module's own) with the largest cumulative import time."""
+    own_package = module.split(".")[0]
+    packages = {}
+    for name, _, cumulative in entries:
+        package = name.split(".")[0]
+        if package == own_package or package in STARTUP_PACKAGES:
+            continue
+        packages[package] = max(packages.get(package, 0), cumulative)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def run_benchmark(modules, repeat=3, top=8):
+    """Measures CLI startup and the import cost of each module."""
+    report = {
+        "python": sys.version.split()[0],
+        "cli_help_seconds": measure_command([sys.executable, "main.py", "--help"], repeat),
+        "modules": []
+    }
+    print(f"⏱️ python main.py --help: {report['cli_help_seconds']:.3f}s\n")
+
+    for module in modules:
+        result = measure_import(module, repeat)
+        if "error" in result:
+            print(f"❌ {module}: import failed ({result['error']})")
+            report["modules"].append(result)
+            continue
+
+        packages = heaviest(module, result.pop("entries"), top)
+        result["heaviest"] = [{"package": name, "seconds": us / 1e6} for name, us in packages]
+        report["modules"].append(result)
+
+        print(f"📦 {module}: {result['import']:.3f}s import, {result['wall']:.3f}s wall")
+        for name, us in packages:
+            print(f"    {name:<30} {us / 1e6:.3f}s")
+
+    return report
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Measure startup and per-module import cost",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("modules", nargs="*", help="Modules to measure (entry points and configured providers by default)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is kept")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest packages listed per module")
+    parser.add_argument("--json", type=str, help="Also write the report to this JSON file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    report = run_benchmark(args.modules or ENTRY_POINTS + PROVIDER_MODULES, args.repeat, args.top)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"\nReport written to: {args.json}")
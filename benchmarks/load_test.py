@@ -0,0 +1,409 @@
+"""
+Load Test for Text-to-Video Pipeline
+
+Simulates N web-app users on one box. The generation service (server.py)
+runs in this process with the real stage graph, scheduler, video generator,
+caption processor and BGM mixer, and with the script, prompt, image and TTS
+providers replaced by the stubs in benchmarks/stubs.py. Every stub request
+takes a lognormal latency around a realistic median, and --failure-rate
+fails a share of them.
+
+Each simulated user does what app.py does: it submits a job over the HTTP
+API with service_client and polls it until it is done, then thinks for a
+while (exponentially distributed) before its next video. Users start spread
+over --ramp-up seconds.
+
+The report has throughput, p50/p95/p99 of the latency users saw, queue wait
+and run time, CPU saturation of the box (busy share of every core from
+/proc/stat, load average and the CPU time of the service process and its
+ffmpeg children, which in fork mode leaves out the job processes) and the
+failure modes: failed and cancelled jobs grouped by error, client errors
+and timeouts, failed provider requests (counted in this process only, so
+not in fork mode), videos missing or published at the same path by two
+jobs, and files written to the shared legacy workspace (Data/Temp) during
+the run, which concurrent jobs must never touch.
+
+Usage:
+    python benchmarks/load_test.py [--users 8] [--jobs-per-user 2] [--workers 2] [--latency-scale 0.5]
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import threading
+import urllib.error
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.dont_write_bytecode = True
+
+from benchmarks.stubs import Latency, write_tone
+from benchmarks.pipeline_benchmark import BenchmarkPipeline, BENCHMARK_DIR, git_commit
+from Models.config import TEMP_DIR, OUTPUT_DIR
+from server import GenerationService, create_server
+import resource_monitor
+import service_client
+import job_logging
+
+# Median seconds and log standard deviation of one request to each provider
+LATENCIES = {
+    "script": (4.0, 0.5),
+    "prompt": (1.5, 0.4),
+    "image": (6.0, 0.6),
+    "tts": (2.5, 0.4),
+}
+
+SAMPLE_INTERVAL = 1.0
+
+
+def build_latencies(scale=1.0, failure_rate=0.0, seed=None):
+    """Returns a Latency per provider, with the medians multiplied by scale."""
+    return {provider: Latency(median * scale, sigma, failure_rate, None if seed is None else seed + n)
+            for n, (provider, (median, sigma)) in enumerate(LATENCIES.items())}
+
+
+def percentile(values, p):
+    """Returns the p-th percentile (nearest rank) of values, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def distribution(values):
+    """Returns the mean, p50, p95, p99 and max of values."""
+    if not values:
+        return None
+    return {"mean": round(sum(values) / len(values), 2), "p50": round(percentile(values, 50), 2),
+            "p95": round(percentile(values, 95), 2), "p99": round(percentile(values, 99), 2),
+            "max": round(max(values), 2)}
+
+
+def _read_cpu_times():
+    """Returns the busy and total jiffies of all cores from /proc/stat, or None."""
+    try:
+        with open("/proc/stat", "r") as f:
+            fields = [int(value) for value in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return sum(fields) - idle, sum(fields)
+
+
+class Sampler:
+    """Samples CPU use of the box, the load average and the service queue while the test runs."""
+
+    def __init__(self, service, interval=SAMPLE_INTERVAL):
+        self.service = service
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-test-sampler", daemon=True)
+        self._start = None
+        self._end = None
+
+    def start(self):
+        self._start = resource_monitor.sample()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._end = resource_monitor.sample()
+
+    def _run(self):
+        previous = _read_cpu_times()
+        while not self._stop.wait(self.interval):
+            current = _read_cpu_times()
+            busy = None
+            if previous and current and current[1] > previous[1]:
+                busy = (current[0] - previous[0]) / (current[1] - previous[1])
+            previous = current
+            status = self.service.status()
+            self.samples.append({
+                "time": time.time(),
+                "cpu_busy": busy,
+                "load_1m": os.getloadavg()[0] if hasattr(os, "getloadavg") else None,
+                "queue_depth": status["queue_depth"],
+                "running": status["jobs"].get("running", 0),
+                "rss": status["memory"]["rss"],
+            })
+
+    def summary(self):
+        """Returns CPU saturation, load, queue depth and RSS over the test."""
+        cpu_count = os.cpu_count() or 1
+        busy = [s["cpu_busy"] for s in self.samples if s["cpu_busy"] is not None]
+        load = [s["load_1m"] for s in self.samples if s["load_1m"] is not None]
+        rss = [s["rss"] for s in self.samples if s["rss"] is not None]
+        usage = resource_monitor.delta(self._start, self._end)
+        cpu_seconds = [usage.get(name) for name in ("cpu_user_seconds", "cpu_sys_seconds",
+                                                    "child_cpu_user_seconds", "child_cpu_sys_seconds")]
+        cpu_seconds = sum(value for value in cpu_seconds if value is not None)
+        wall = usage["wall_seconds"] or 0.0
+        return {
+            "cpu_count": cpu_count,
+            "cpu_busy_mean": round(sum(busy) / len(busy), 3) if busy else None,
+            "cpu_busy_p95": round(percentile(busy, 95), 3) if busy else None,
+            # Share of the samples with the cores at least 90% busy
+            "cpu_saturated_share": round(sum(1 for b in busy if b >= 0.9) / len(busy), 3) if busy else None,
+            "load_1m_max": round(max(load), 2) if load else None,
+            "load_per_core_max": round(max(load) / cpu_count, 2) if load else None,
+            "service_cpu_seconds": round(cpu_seconds, 2),
+            "service_cores_used": round(cpu_seconds / wall, 2) if wall else None,
+            "queue_depth_max": max((s["queue_depth"] for s in self.samples), default=None),
+            "running_max": max((s["running"] for s in self.samples), default=None),
+            "peak_rss_bytes": max(rss) if rss else None,
+        }
+
+
+def simulate_user(user, jobs, base_url, overrides, think_time, start_delay, timeout, poll_interval, seed=None):
+    """Submits jobs one after another like an app user and returns what each one saw."""
+    rng = random.Random(seed)
+    time.sleep(start_delay)
+    results = []
+    for number in range(1, jobs + 1):
+        if number > 1 and think_time > 0:
+            time.sleep(rng.expovariate(1.0 / think_time))
+
+        result = {"user": user, "job": number, "job_id": None, "status": None, "error": None}
+        topic = f"Load test user {user} video {number}"
+        started = time.time()
+        try:
+            record = service_client.submit_job(topic, output=f"load_user{user}_{number}.mp4", fresh=True,
+                                               base_url=base_url, overrides=overrides)
+            result["job_id"] = record["job_id"]
+            result["submit_seconds"] = time.time() - started
+            record = service_client.wait_for_job(record["job_id"], poll_interval=poll_interval, timeout=timeout,
+                                                 base_url=base_url)
+        except TimeoutError as e:
+            result.update(status="timeout", error=str(e), latency_seconds=time.time() - started)
+            if result["job_id"]:
+                service_client.cancel_job(result["job_id"], base_url=base_url)
+            results.append(result)
+            continue
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            result.update(status="client_error", error=str(e), latency_seconds=time.time() - started)
+            results.append(result)
+            continue
+
+        result.update(
+            status=record["status"],
+            error=record.get("error"),
+            latency_seconds=time.time() - started,
+            queue_wait_seconds=record["started_at"] - record["submitted_at"] if record.get("started_at") else None,
+            run_seconds=(record["finished_at"] - record["started_at"]
+                         if record.get("started_at") and record.get("finished_at") else None),
+            video_path=record.get("video_path"),
+            degraded=bool((record.get("degradation") or {}).get("steps")),
+        )
+        results.append(result)
+        print(f"👤 User {user} video {number}: {result['status']} after {result['latency_seconds']:.1f}s")
+    return results
+
+
+def _temp_files():
+    """Returns the files in the shared legacy workspace with their modification times."""
+    files = {}
+    for directory, _, names in os.walk(TEMP_DIR):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                files[path] = os.path.getmtime(path)
+            except OSError:
+                pass
+    return files
+
+
+def failure_modes(results, latencies, temp_before, temp_after):
+    """Groups what went wrong in the run, by kind and error."""
+    modes = Counter()
+    for result in results:
+        if result["status"] != "done":
+            # Job ids and numbers (seconds, counts) would split one kind of error into many
+            error = re.sub(r"\d{8}-\d{6}-[0-9a-f]{8}", "<job>", result["error"] or "no error message")
+            error = re.sub(r"\d+(\.\d+)?", "N", error)[:120]
+            modes[f"{result['status']}: {error}"] += 1
+
+    published = Counter(result["video_path"] for result in results
+                        if result["status"] == "done" and result.get("video_path"))
+    missing = sum(1 for result in results if result["status"] == "done"
+                  and not (result.get("video_path") and os.path.exists(result["video_path"])))
+    return {
+        "by_error": dict(modes.most_common()),
+        # Failed stub requests, including those a job got over (e.g. an image replaced by its neighbour)
+        "provider_errors": {name: latency.failures for name, latency in latencies.items() if latency.failures},
+        "missing_videos": missing,
+        "shared_video_paths": sum(count for count in published.values() if count > 1),
+        "temp_files_written": sorted(path for path, mtime in temp_after.items()
+                                     if temp_before.get(path) != mtime),
+    }
+
+
+def run_load_test(users=4, jobs_per_user=2, workers=2, segments=5, think_time=5.0, ramp_up=0.0, latency_scale=1.0,
+                  failure_rate=0.0, image_size=(768, 1024), pipeline_options=None, fork=False, degrade=True,
+                  timeout=None, poll_interval=1.0, seed=None, keep=False):
+    """Runs the service with stub providers under simulated users and returns the report."""
+    workspace = os.path.join(BENCHMARK_DIR, "LoadTest")
+    bgm_path = write_tone(os.path.join(workspace, "bgm.mp3"), duration=60, frequency=110)
+    latencies = build_latencies(latency_scale, failure_rate, seed)
+
+    options = dict(pipeline_options or {}, latencies=latencies, image_size=image_size)
+    service = GenerationService(workers=workers, pipeline_options=options, fork=fork, degrade=degrade,
+                                pipeline_class=BenchmarkPipeline)
+    service.start()
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, name="load-test-server", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    overrides = {"SCRIPT_SENTENCES": segments, "BGM_PATH": bgm_path}
+
+    print(f"\n🚦 {users} user(s) x {jobs_per_user} video(s) on {workers} worker(s) at {base_url}")
+    temp_before = _temp_files()
+    results = []
+    results_lock = threading.Lock()
+
+    def user_thread(user):
+        delay = ramp_up * (user - 1) / max(1, users - 1) if ramp_up else 0.0
+        user_results = simulate_user(user, jobs_per_user, base_url, overrides, think_time, delay, timeout,
+                                     poll_interval, None if seed is None else seed * 1000 + user)
+        with results_lock:
+            results.extend(user_results)
+
+    sampler = Sampler(service).start()
+    started = time.time()
+    threads = [threading.Thread(target=user_thread, args=(user,), name=f"load-test-user-{user}")
+               for user in range(1, users + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.time() - started
+    sampler.stop()
+    server.shutdown()
+
+    done = [result for result in results if result["status"] == "done"]
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "settings": {"users": users, "jobs_per_user": jobs_per_user, "workers": workers, "segments": segments,
+                     "think_time": think_time, "ramp_up": ramp_up, "fork": fork, "degrade": degrade,
+                     "image_size": list(image_size), "pipeline_options": pipeline_options or {},
+                     "latencies": {name: latency.to_dict() for name, latency in latencies.items()}},
+        "wall_seconds": round(wall, 2),
+        "jobs": len(results),
+        "statuses": dict(Counter(result["status"] for result in results)),
+        "degraded": sum(1 for result in done if result.get("degraded")),
+        "throughput_per_minute": round(len(done) / wall * 60, 2) if wall else None,
+        "latency_seconds": distribution([r["latency_seconds"] for r in done]),
+        "queue_wait_seconds": distribution([r["queue_wait_seconds"] for r in results
+                                            if r.get("queue_wait_seconds") is not None]),
+        "run_seconds": distribution([r["run_seconds"] for r in done if r.get("run_seconds") is not None]),
+        "cpu": sampler.summary(),
+        "failures": failure_modes(results, latencies, temp_before, _temp_files()),
+        "results": sorted(results, key=lambda r: (r["user"], r["job"])),
+    }
+
+    if not keep:
+        for result in results:
+            if result["job_id"]:
+                shutil.rmtree(os.path.join(OUTPUT_DIR, result["job_id"]), ignore_errors=True)
+        shutil.rmtree(workspace, ignore_errors=True)
+    return report
+
+
+def print_report(report):
+    """Prints the throughput, latencies, CPU saturation and failure modes of a run."""
+    settings = report["settings"]
+    print(f"\n📊 Load test @ {report['commit']}: {settings['users']} user(s), {settings['workers']} worker(s), "
+          f"{report['jobs']} job(s) in {report['wall_seconds']:.1f}s")
+    print(f"Statuses: {report['statuses']} ({report['degraded']} degraded)")
+    print(f"Throughput: {report['throughput_per_minute']} videos/min")
+    for name in ("latency_seconds", "queue_wait_seconds", "run_seconds"):
+        values = report[name]
+        if values:
+            print(f"{name:<20} p50 {values['p50']:>7.1f}s  p95 {values['p95']:>7.1f}s  "
+                  f"p99 {values['p99']:>7.1f}s  max {values['max']:>7.1f}s")
+
+    cpu = report["cpu"]
+    if cpu["cpu_busy_mean"] is not None:
+        print(f"CPU: {cpu['cpu_busy_mean'] * 100:.0f}% busy on average, p95 {cpu['cpu_busy_p95'] * 100:.0f}%, "
+              f"saturated {cpu['cpu_saturated_share'] * 100:.0f}% of the time over {cpu['cpu_count']} core(s)")
+    if cpu["load_1m_max"] is not None:
+        print(f"Load: max {cpu['load_1m_max']} ({cpu['load_per_core_max']} per core)")
+    print(f"Service: {cpu['service_cores_used']} core(s) used, peak queue depth {cpu['queue_depth_max']}, "
+          f"peak RSS {(cpu['peak_rss_bytes'] or 0) / 1e6:.0f} MB")
+
+    failures = report["failures"]
+    for mode, count in failures["by_error"].items():
+        print(f"❌ {count} x {mode}")
+    if failures["provider_errors"]:
+        print(f"⚠️ Failed provider requests: {failures['provider_errors']}")
+    if failures["missing_videos"] or failures["shared_video_paths"]:
+        print(f"⚠️ {failures['missing_videos']} missing video(s), "
+              f"{failures['shared_video_paths']} video(s) published at the same path")
+    if failures["temp_files_written"]:
+        print(f"⚠️ {len(failures['temp_files_written'])} file(s) written to the shared {TEMP_DIR} workspace")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Load test of the generation service with simulated app users and stub providers",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=4, help="Concurrent simulated users")
+    parser.add_argument("--jobs-per-user", type=int, default=2, help="Videos each user generates, one after another")
+    parser.add_argument("--workers", type=int, default=2, help="Service worker threads")
+    parser.add_argument("--segments", type=int, default=5, help="Sentences (segments) per video")
+    parser.add_argument("--think-time", type=float, default=5.0, help="Mean pause of a user between videos (s)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which the users start")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplies the median provider latencies (0 for none)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of stub provider requests that fail")
+    parser.add_argument("--image-size", type=str, default="768x1024", help="Stub image size, WIDTHxHEIGHT")
+    parser.add_argument("--timeout", type=float, help="Seconds a user waits for a video before cancelling it")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between a user's status polls")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible latencies and think times")
+    parser.add_argument("--fork", action="store_true", help="Run every job in a process forked from a warm parent")
+    parser.add_argument("--no-degrade", action="store_true", help="Never cheapen jobs taken off a backed-up queue")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming per-segment renderer")
+    parser.add_argument("--no-captions", action="store_true", help="Skip caption generation")
+    parser.add_argument("--no-bgm", action="store_true", help="Skip background music addition")
+    parser.add_argument("--verbose", action="store_true", help="Show per-item progress of the jobs")
+    parser.add_argument("--keep", action="store_true", help="Keep the published videos and job logs")
+    parser.add_argument("--output", type=str, help="Report path (default Data/Benchmarks/load_<commit>_<time>.json)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    job_logging.setup(log_file=None, quiet=not args.verbose)
+
+    width, height = (int(value) for value in args.image_size.lower().split("x"))
+    pipeline_options = {"stream": args.stream, "no_captions": args.no_captions, "no_bgm": args.no_bgm}
+
+    report = run_load_test(args.users, args.jobs_per_user, args.workers, args.segments, args.think_time,
+                           args.ramp_up, args.latency_scale, args.failure_rate, (width, height), pipeline_options,
+                           args.fork, not args.no_degrade, args.timeout, args.poll_interval, args.seed, args.keep)
+
+    output_path = args.output or os.path.join(
+        BENCHMARK_DIR, f"load_{report['commit'] or 'unknown'}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+
+    print_report(report)
+    print(f"\nReport written to: {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
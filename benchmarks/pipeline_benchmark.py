@@ -0,0 +1,307 @@
+"""
+Offline Pipeline Benchmark for Text-to-Video Pipeline
+
+Runs the real stage graph, VideoGenerator, caption processor and
+BGMGenerator over fixed scenarios, with the remote script, prompt, image and
+TTS providers replaced by the deterministic stubs in benchmarks/stubs.py.
+Captions use the local simple_captions model, so no network or GPU is
+needed. The report (wall time, per-stage times, throughput, CPU and memory)
+is tagged with the git commit, and --compare shows the change against an
+earlier report.
+
+Scenarios:
+    - 5, 15 and 40 segments with the configured animation and caption style
+    - 5 segments with each animation
+    - 5 segments with each caption style
+    (--full runs every combination instead)
+
+Usage:
+    python benchmarks/pipeline_benchmark.py [--repeat 3] [--image-latency 1.5] [--compare old.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+from functools import partial
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.dont_write_bytecode = True
+
+from benchmarks.stubs import (StubScriptGenerator, StubPromptGenerator, StubImageGenerator,
+                              StubVoiceOverGenerator, write_tone)
+from Models.Video.video_factory import load_video_model
+from Models.Captions.captions_factory import load_caption_model
+from Models.Captions.utils import get_available_caption_styles
+from Models.BGM.bgm_factory import load_bgm_model
+from Models.job_context import JobContext
+from pipeline import GenerationPipeline
+from stage_history import StageHistory, EtaPredictor
+from config import ANIMATION, CAPTION_STYLE
+
+BENCHMARK_DIR = "Data/Benchmarks/"
+SEGMENT_COUNTS = (5, 15, 40)
+
+
+def get_available_animations():
+    """Returns the names of the animation modules in Models/Animations/Models."""
+    models_dir = os.path.join(ROOT, "Models", "Animations", "Models")
+    return sorted(file[:-3] for file in os.listdir(models_dir) if file.endswith(".py") and not file.startswith("__"))
+
+
+def build_scenarios(segment_counts=SEGMENT_COUNTS, full=False):
+    """Returns the benchmark scenarios as dicts with segments, animation and caption_style."""
+    animations = get_available_animations()
+    styles = get_available_caption_styles()
+
+    if full:
+        combinations = [(n, a, s) for n in segment_counts for a in animations for s in styles]
+    else:
+        smallest = min(segment_counts)
+        combinations = [(n, ANIMATION, CAPTION_STYLE) for n in segment_counts]
+        combinations += [(smallest, a, CAPTION_STYLE) for a in animations]
+        combinations += [(smallest, ANIMATION, s) for s in styles]
+
+    scenarios = []
+    for segments, animation, style in dict.fromkeys(combinations):
+        scenarios.append({
+            "name": f"{segments}seg-{animation}-{style}",
+            "segments": segments,
+            "animation": animation,
+            "caption_style": style,
+        })
+    return scenarios
+
+
+class BenchmarkPipeline(GenerationPipeline):
+    """A GenerationPipeline whose remote providers are replaced by stubs."""
+
+    def __init__(self, latencies=None, image_size=(1024, 1024), **options):
+        options.setdefault("request_delay", 0)
+        # Every run of a scenario must generate, not reuse the first run's video
+        options.setdefault("job_cache", False)
+        # Archiving the workspace would be timed with the run and fill Data/Artifacts
+        options.setdefault("archive_artifacts", False)
+        super().__init__(**options)
+        # Stub timings would skew the ETAs of real jobs, so they get their own history
+        self.history = StageHistory(os.path.join(BENCHMARK_DIR, "stage_history.jsonl"))
+        self.predictor = EtaPredictor(self.history)
+        latencies = latencies or {}
+        self.LOADERS = {
+            "script": partial(StubScriptGenerator, latency=latencies.get("script", 0.0)),
+            "voiceover": partial(StubVoiceOverGenerator, latency=latencies.get("tts", 0.0)),
+            "image": partial(self._load_image_model, latency=latencies.get("image", 0.0),
+                             prompt_latency=latencies.get("prompt", 0.0), size=image_size),
+            "video": load_video_model,
+            "captions": partial(load_caption_model, "simple_captions"),
+            "estimated_captions": partial(load_caption_model, "simple_captions"),
+            "bgm": load_bgm_model,
+        }
+
+    def job_features(self, job):
+        return {**super().job_features(job), "script_model": "stub", "img_model": "stub",
+                "caption_model": "none" if self.no_captions else "simple_captions"}
+
+    @staticmethod
+    def _load_image_model(job=None, latency=0.0, prompt_latency=0.0, size=(1024, 1024)):
+        image_generator = StubImageGenerator(job=job, latency=latency, size=size)
+        image_generator.set_prompt_generator(StubPromptGenerator(job=job, latency=prompt_latency))
+        return image_generator
+
+
+def probe_duration(video_path):
+    """Returns a media file's duration in seconds, or None."""
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    try:
+        return ffmpeg_parse_infos(video_path).get("duration")
+    except (IOError, OSError):
+        return None
+
+
+def git_commit():
+    """Returns the short hash of the checked-out commit, or None outside a git checkout."""
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def run_scenario(pipeline, scenario, run_number, bgm_path, jobs_dir, keep=False):
+    """Runs one scenario once and returns its measurements."""
+    job = JobContext.create(
+        jobs_dir=jobs_dir,
+        job_id=f"bench-{scenario['name']}-{run_number}-{int(time.time())}",
+        overrides={
+            "SCRIPT_SENTENCES": scenario["segments"],
+            "ANIMATION": scenario["animation"],
+            "CAPTION_STYLE": scenario["caption_style"],
+            "BGM_PATH": bgm_path,
+        }
+    )
+
+    started = time.time()
+    result = pipeline.run(f"Benchmark {scenario['name']}", job, output_name="benchmark.mp4", cleanup=not keep)
+    wall = time.time() - started
+
+    measurement = {"wall_seconds": wall, "stage_times": result.get("stage_times", {}), "error": result.get("error")}
+
+    if result.get("resources_path") and os.path.exists(result["resources_path"]):
+        with open(result["resources_path"], "r", encoding="utf-8") as f:
+            usage = json.load(f)["job"] or {}
+        cpu = [usage.get(name) for name in ("cpu_user_seconds", "cpu_sys_seconds",
+                                            "child_cpu_user_seconds", "child_cpu_sys_seconds")]
+        measurement["cpu_seconds"] = sum(value for value in cpu if value is not None)
+        measurement["peak_rss_delta_bytes"] = usage.get("peak_rss_delta_bytes")
+
+    if result.get("video_path") and os.path.exists(result["video_path"]):
+        measurement["video_seconds"] = probe_duration(result["video_path"])
+
+    if not keep:
+        shutil.rmtree(job.output_dir, ignore_errors=True)
+    return measurement
+
+
+def summarize(scenario, runs):
+    """Reduces repeated runs of a scenario to medians."""
+    succeeded = [run for run in runs if not run["error"]]
+    summary = dict(scenario)
+    summary["runs"] = len(runs)
+    summary["failures"] = len(runs) - len(succeeded)
+    summary["errors"] = [run["error"] for run in runs if run["error"]]
+    if not succeeded:
+        return summary
+
+    def median(name):
+        values = [run[name] for run in succeeded if run.get(name) is not None]
+        return statistics.median(values) if values else None
+
+    wall = median("wall_seconds")
+    video_seconds = median("video_seconds")
+    stages = sorted({stage for run in succeeded for stage in run["stage_times"]})
+    summary.update({
+        "wall_seconds": wall,
+        "wall_seconds_min": min(run["wall_seconds"] for run in succeeded),
+        "wall_seconds_max": max(run["wall_seconds"] for run in succeeded),
+        "segments_per_second": scenario["segments"] / wall if wall else None,
+        "video_seconds": video_seconds,
+        "realtime_factor": video_seconds / wall if wall and video_seconds else None,
+        "cpu_seconds": median("cpu_seconds"),
+        "peak_rss_delta_bytes": median("peak_rss_delta_bytes"),
+        "stage_times": {stage: statistics.median(run["stage_times"][stage] for run in succeeded
+                                                 if stage in run["stage_times"]) for stage in stages},
+    })
+    return summary
+
+
+def print_report(report, baseline=None):
+    """Prints one line per scenario, with the change against a baseline report if given."""
+    previous = {s["name"]: s for s in baseline["scenarios"]} if baseline else {}
+    print(f"\n📊 Pipeline benchmark @ {report['commit']} ({report['repeat']} run(s) per scenario)")
+    print(f"{'scenario':<40} {'wall':>8} {'seg/s':>7} {'rt x':>6} {'cpu':>8} {'rss MB':>7}  change")
+    for scenario in report["scenarios"]:
+        if scenario.get("wall_seconds") is None:
+            print(f"{scenario['name']:<40} ❌ failed: {'; '.join(scenario['errors'])[:60]}")
+            continue
+
+        change = ""
+        before = previous.get(scenario["name"], {}).get("wall_seconds")
+        if before:
+            change = f"{(scenario['wall_seconds'] - before) / before * 100:+.1f}% vs {baseline['commit']}"
+
+        rss = scenario["peak_rss_delta_bytes"]
+        print(f"{scenario['name']:<40} {scenario['wall_seconds']:>7.2f}s {scenario['segments_per_second']:>7.2f} "
+              f"{scenario['realtime_factor'] or 0:>6.2f} {scenario['cpu_seconds'] or 0:>7.2f}s "
+              f"{(rss or 0) / 1e6:>7.1f}  {change}")
+
+
+def run_benchmark(scenarios, repeat=1, latencies=None, image_size=(1024, 1024), pipeline_options=None,
+                  keep=False):
+    """Runs every scenario repeat times on one warm pipeline and returns the report."""
+    workspace = os.path.join(BENCHMARK_DIR, "Workspace")
+    jobs_dir = os.path.join(workspace, "Jobs")
+    bgm_path = write_tone(os.path.join(workspace, "bgm.mp3"), duration=30, frequency=110)
+
+    pipeline = BenchmarkPipeline(latencies=latencies, image_size=image_size, **(pipeline_options or {}))
+    pipeline.warm_up()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "latencies": latencies or {},
+        "image_size": list(image_size),
+        "pipeline_options": pipeline_options or {},
+        "scenarios": [],
+    }
+    for scenario in scenarios:
+        print(f"\n⏱️ Scenario {scenario['name']}")
+        runs = [run_scenario(pipeline, scenario, n + 1, bgm_path, jobs_dir, keep) for n in range(repeat)]
+        report["scenarios"].append(summarize(scenario, runs))
+
+    if not keep:
+        shutil.rmtree(workspace, ignore_errors=True)
+    return report
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Offline end-to-end pipeline benchmark with stub providers",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--segments", type=int, nargs="+", default=list(SEGMENT_COUNTS),
+                        help="Segment counts to benchmark")
+    parser.add_argument("--full", action="store_true", help="Run every segment/animation/style combination")
+    parser.add_argument("--scenario", action="append", help="Only run scenarios with this name (repeatable)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; medians are reported")
+    parser.add_argument("--script-latency", type=float, default=0.0, help="Injected script provider latency (s)")
+    parser.add_argument("--prompt-latency", type=float, default=0.0, help="Injected prompt provider latency per image (s)")
+    parser.add_argument("--image-latency", type=float, default=0.0, help="Injected image provider latency per image (s)")
+    parser.add_argument("--tts-latency", type=float, default=0.0, help="Injected TTS provider latency (s)")
+    parser.add_argument("--image-size", type=str, default="1024x1024", help="Stub image size, WIDTHxHEIGHT")
+    parser.add_argument("--stream", action="store_true", help="Benchmark the streaming per-segment renderer")
+    parser.add_argument("--no-captions", action="store_true", help="Skip caption generation")
+    parser.add_argument("--no-bgm", action="store_true", help="Skip background music addition")
+    parser.add_argument("--keep", action="store_true", help="Keep job workspaces and videos")
+    parser.add_argument("--output", type=str, help="Report path (default Data/Benchmarks/pipeline_<commit>_<time>.json)")
+    parser.add_argument("--compare", type=str, help="Earlier report to compare wall times against")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    scenarios = build_scenarios(args.segments, args.full)
+    if args.scenario:
+        scenarios = [s for s in scenarios if s["name"] in args.scenario]
+    if not scenarios:
+        print("❌ No scenarios selected")
+        return None
+
+    width, height = (int(value) for value in args.image_size.lower().split("x"))
+    latencies = {"script": args.script_latency, "prompt": args.prompt_latency,
+                 "image": args.image_latency, "tts": args.tts_latency}
+    pipeline_options = {"stream": args.stream, "no_captions": args.no_captions, "no_bgm": args.no_bgm}
+
+    report = run_benchmark(scenarios, args.repeat, latencies, (width, height), pipeline_options, args.keep)
+
+    output_path = args.output or os.path.join(
+        BENCHMARK_DIR, f"pipeline_{report['commit'] or 'unknown'}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nReport written to: {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
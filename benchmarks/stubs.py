@@ -0,0 +1,212 @@
+"""
+Stub Providers for Benchmarks
+
+Deterministic local stand-ins for the remote script, prompt, image and TTS
+providers. They honour the same interface and JobContext workspace as the
+real generators, produce the same kind of files, and sleep for a
+configurable latency instead of calling an API, so the pipeline's own cost
+can be measured without network access or a GPU. Like a real request, the
+latency ends early when the job is cancelled.
+
+A latency is a number of seconds or a Latency, which draws each request's
+latency from a lognormal distribution and can fail a share of requests the
+way a flaky provider does.
+"""
+
+import os
+import sys
+import random
+import hashlib
+import threading
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.dont_write_bytecode = True
+
+import numpy as np
+from PIL import Image
+
+from Models.job_context import JobContext
+import tracing
+import cancellation
+
+WORDS = ["the", "ocean", "hides", "ancient", "secrets", "that", "scientists", "are", "only", "now",
+         "starting", "to", "understand", "deep", "below", "light", "never", "reaches", "strange", "creatures"]
+
+WORDS_PER_SENTENCE = 8
+SECONDS_PER_WORD = 0.5
+
+
+def _seed(text):
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+class StubProviderError(RuntimeError):
+    """A request that a Latency failed on purpose."""
+
+
+class Latency:
+    """Lognormal request latency, with an optional share of failed requests.
+
+    Provider latencies have a long right tail: most requests take about the
+    median and a few take several times as long, which a fixed sleep misses.
+    """
+
+    def __init__(self, median, sigma=0.0, failure_rate=0.0, seed=None):
+        """Initialize the distribution.
+
+        Args:
+            median (float): Median latency in seconds
+            sigma (float): Standard deviation of the log latency (0: always the median)
+            failure_rate (float): Share of requests that raise StubProviderError after their latency
+            seed (int): Seed, for a reproducible sequence of latencies
+        """
+        self.median = median
+        self.sigma = sigma
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    def sample(self):
+        """Returns the latency of one request in seconds and whether it fails."""
+        with self._lock:
+            if os.getpid() != self._pid:
+                # A forked job process would otherwise repeat the draws of every other one
+                self._pid = os.getpid()
+                self._random.seed(None if self.seed is None else f"{self.seed}-{self._pid}")
+            seconds = self.median * self._random.lognormvariate(0.0, self.sigma) if self.median > 0 else 0.0
+            failed = self._random.random() < self.failure_rate
+            self.requests += 1
+            self.failures += failed
+            return seconds, failed
+
+    def to_dict(self):
+        return {"median": self.median, "sigma": self.sigma, "failure_rate": self.failure_rate,
+                "requests": self.requests, "failures": self.failures}
+
+
+def wait(latency, provider="stub"):
+    """Sleeps for a request's latency (seconds or a Latency), raising if the request fails."""
+    if not isinstance(latency, Latency):
+        cancellation.sleep(latency)
+        return
+    seconds, failed = latency.sample()
+    cancellation.sleep(seconds)
+    if failed:
+        raise StubProviderError(f"{provider} stub request failed after {seconds:.2f}s")
+
+
+class StubScriptGenerator:
+    """Writes a script with a fixed number of sentences, derived from the topic.
+
+    The job setting SCRIPT_SENTENCES overrides the number of sentences.
+    """
+
+    def __init__(self, job=None, latency=0.0, sentences=5):
+        self.job = job or JobContext.default()
+        self.latency = latency
+        self.sentences = sentences
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+
+    def generate_script(self, topic):
+        wait(self.latency, "script")
+        seed = _seed(topic)
+        sentences = []
+        for i in range(self.job.setting("SCRIPT_SENTENCES", self.sentences)):
+            words = [WORDS[(seed + i * 7 + j * 3) % len(WORDS)] for j in range(WORDS_PER_SENTENCE)]
+            sentences.append(" ".join(words).capitalize() + ".")
+        script_text = " ".join(sentences)
+
+        os.makedirs(os.path.dirname(self.job.script_path), exist_ok=True)
+        with open(self.job.script_path, "w", encoding="utf-8") as f:
+            f.write(script_text)
+        return script_text
+
+
+class StubPromptGenerator:
+    """Turns a scene into an image prompt without calling an LLM."""
+
+    def __init__(self, job=None, latency=0.0):
+        self.job = job or JobContext.default()
+        self.latency = latency
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+
+    def generate_prompt(self, scene_text):
+        wait(self.latency, "prompt")
+        return f"cinematic, highly detailed, {scene_text.strip()}"
+
+
+class StubImageGenerator:
+    """Renders a deterministic gradient image per prompt."""
+
+    def __init__(self, job=None, latency=0.0, size=(1024, 1024)):
+        self.job = job or JobContext.default()
+        self.latency = latency
+        self.size = size
+        self.prompt_generator = None
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+        if self.prompt_generator is not None:
+            self.prompt_generator.set_job(job)
+
+    def set_prompt_generator(self, prompt_generator):
+        self.prompt_generator = prompt_generator
+
+    def download_image(self, scene_text, img_number):
+        prompt = scene_text
+        if self.prompt_generator:
+            with tracing.span("prompt.generate_prompt", provider="stub"):
+                prompt = self.prompt_generator.generate_prompt(scene_text)
+        with tracing.span("image.attempt", provider="stub", image=img_number, attempt=1):
+            wait(self.latency, "image")
+
+        rng = np.random.default_rng(_seed(prompt))
+        width, height = self.size
+        start, end = rng.integers(0, 256, size=3), rng.integers(0, 256, size=3)
+        ramp = np.linspace(0.0, 1.0, height)[:, None, None]
+        pixels = (start + (end - start) * ramp) * np.ones((1, width, 1))
+        pixels += rng.normal(0, 12, size=(height, width, 1))
+
+        image_path = self.job.image_path(img_number)
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(image_path, quality=90)
+        return image_path
+
+
+class StubVoiceOverGenerator:
+    """Synthesizes a tone as long as the script would take to read."""
+
+    def __init__(self, job=None, latency=0.0):
+        self.job = job or JobContext.default()
+        self.latency = latency
+
+    def set_job(self, job):
+        """Points the generator at another job's workspace."""
+        self.job = job
+
+    def generate_voiceover(self, text):
+        with tracing.span("tts.request", provider="stub", characters=len(text)):
+            wait(self.latency, "tts")
+        duration = max(1.0, len(text.split()) * SECONDS_PER_WORD)
+        return write_tone(self.job.voiceover_path, duration, frequency=220 + _seed(text) % 220)
+
+
+def write_tone(output_path, duration, frequency=220):
+    """Writes a sine tone with ffmpeg, in the format implied by the file extension."""
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    cmd = ["ffmpeg", "-y", "-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={duration:.3f}",
+           "-ac", "2", output_path]
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return output_path
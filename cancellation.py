@@ -0,0 +1,284 @@
+"""
+Cancellation Module for Text-to-Video Pipeline
+
+This module lets a running job be cancelled, for example when its user
+abandons it in the app, so it stops taking CPU and network away from live
+jobs. A job's CancelToken is kept in a context variable, so stage threads
+and segment workers started with contextvars.copy_context().run see it too.
+
+Work checks the token between units (images, segments, and every frame or
+audio chunk moviepy writes through frame_logger()), and registers a callback
+for work it can't check from inside: HTTP requests made through get() and
+post() have their socket shut down, ffmpeg processes started through
+run_process() are killed and awaitables wrapped in guard() are cancelled.
+A cancelled job gives back its CPU and network within about a second.
+
+JobCancelled derives from BaseException, like asyncio.CancelledError, so the
+`except Exception` retry loops of the providers don't swallow it. Without a
+token every helper here behaves like the call it wraps.
+"""
+
+import time
+import socket
+import asyncio
+import logging
+import threading
+import subprocess
+import contextvars
+from contextlib import contextmanager
+
+import proglog
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+
+import job_logging
+
+logger = logging.getLogger(__name__)
+
+_token = contextvars.ContextVar("cancel_token", default=None)
+
+
+class JobCancelled(BaseException):
+    """Raised in a job's threads once the job has been cancelled."""
+
+
+class CancelToken:
+    """Cancellation flag of one job, with callbacks to interrupt blocking work."""
+
+    def __init__(self):
+        self.reason = None
+        self._event = threading.Event()
+        self._callbacks = {}
+        # Reentrant, since cancel() may run in a signal handler on a thread that holds it
+        self._lock = threading.RLock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="Job cancelled"):
+        """Cancel the job and interrupt the blocking work registered with it."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        logger.warning(f"{reason}, stopping its work")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancel callback failed: {str(e)}")
+
+    def check(self):
+        """Raise JobCancelled if the job has been cancelled."""
+        if self._event.is_set():
+            raise JobCancelled(self.reason)
+
+    def wait(self, seconds):
+        """Sleep up to the given seconds; returns True early if the job is cancelled."""
+        return self._event.wait(seconds)
+
+    def add_callback(self, callback):
+        """Call callback when the job is cancelled, right away if it already is.
+
+        Returns:
+            object: Handle for remove_callback
+        """
+        handle = object()
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks[handle] = callback
+                return handle
+        callback()
+        return handle
+
+    def remove_callback(self, handle):
+        with self._lock:
+            self._callbacks.pop(handle, None)
+
+
+@contextmanager
+def bind(token):
+    """Make a token the current job's token for the with-block."""
+    context_token = _token.set(token)
+    try:
+        yield token
+    finally:
+        _token.reset(context_token)
+
+
+def current():
+    """The current job's token, or None."""
+    return _token.get()
+
+
+def check():
+    """Raise JobCancelled if the current job has been cancelled."""
+    token = _token.get()
+    if token is not None:
+        token.check()
+
+
+def sleep(seconds):
+    """time.sleep that ends early, raising JobCancelled, when the job is cancelled."""
+    token = _token.get()
+    if token is None:
+        time.sleep(seconds)
+        return
+    token.wait(seconds)
+    token.check()
+
+
+@contextmanager
+def on_cancel(callback):
+    """Call callback if the current job is cancelled during the with-block."""
+    token = _token.get()
+    if token is None:
+        yield
+        return
+    handle = token.add_callback(callback)
+    try:
+        yield
+    finally:
+        token.remove_callback(handle)
+
+
+def run_process(cmd, **kwargs):
+    """subprocess.run that kills the process when the job is cancelled.
+
+    Raises:
+        JobCancelled: If the job was cancelled before or while the process ran
+    """
+    check()
+    with subprocess.Popen(cmd, **kwargs) as process:
+        with on_cancel(process.kill):
+            stdout, stderr = process.communicate()
+    check()
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+async def guard(awaitable):
+    """Await in a job's event loop, cancelling the awaitable when the job is cancelled."""
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(awaitable)
+    with on_cancel(lambda: loop.call_soon_threadsafe(task.cancel)):
+        try:
+            return await task
+        except asyncio.CancelledError:
+            check()
+            raise
+
+
+class _CheckingLogger:
+    """Checks the job's token on every progress update, i.e. every frame or audio chunk."""
+
+    def __init__(self, token, **kwargs):
+        super().__init__(**kwargs)
+        self.token = token
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        self.token.check()
+        super().bars_callback(bar, attr, value, old_value)
+
+
+class _CheckingBarLogger(_CheckingLogger, proglog.TqdmProgressBarLogger):
+    pass
+
+
+class _CheckingMuteLogger(_CheckingLogger, proglog.ProgressBarLogger):
+    pass
+
+
+def frame_logger(logger="bar"):
+    """moviepy logger that stops a write at the next frame once the job is cancelled.
+
+    Args:
+        logger: What would otherwise be passed as moviepy's logger ("bar" or None)
+    """
+    if logger == "bar" and job_logging.quiet():
+        # The frame progress bar is per-frame chatter
+        logger = None
+    token = _token.get()
+    if token is None:
+        return logger
+    if logger == "bar":
+        return _CheckingBarLogger(token)
+    return _CheckingMuteLogger(token, logged_bars=None)
+
+
+def _abort(connection):
+    """Shut down a connection's socket, so a request blocked on it fails at once."""
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        return
+    try:
+        # The plain socket call, so a TLS socket isn't unwrapped under the reading thread
+        socket.socket.shutdown(sock, socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _CancellablePool:
+    """Registers every connection taken out of the pool with the current job's token."""
+
+    def _get_conn(self, timeout=None):
+        connection = super()._get_conn(timeout)
+        token = _token.get()
+        if token is not None:
+            connection.cancel_handle = (token, token.add_callback(lambda: _abort(connection)))
+        return connection
+
+    def _put_conn(self, connection):
+        if connection is not None and getattr(connection, "cancel_handle", None):
+            token, handle = connection.cancel_handle
+            token.remove_callback(handle)
+            connection.cancel_handle = None
+        super()._put_conn(connection)
+
+
+class _CancellableHTTPPool(_CancellablePool, HTTPConnectionPool):
+    pass
+
+
+class _CancellableHTTPSPool(_CancellablePool, HTTPSConnectionPool):
+    pass
+
+
+class CancellableAdapter(HTTPAdapter):
+    """requests adapter whose in-flight requests fail with JobCancelled when the job is cancelled."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _CancellableHTTPPool,
+                                                   "https": _CancellableHTTPSPool}
+
+    def send(self, request, **kwargs):
+        check()
+        try:
+            return super().send(request, **kwargs)
+        except Exception:
+            # A request failing because its socket was shut down is reported as the cancellation
+            check()
+            raise
+
+
+def request(method, url, **kwargs):
+    """requests.request whose request is aborted when the job is cancelled."""
+    with requests.Session() as session:
+        adapter = CancellableAdapter()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session.request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    """requests.get whose request is aborted when the job is cancelled."""
+    return request("get", url, **kwargs)
+
+
+def post(url, **kwargs):
+    """requests.post whose request is aborted when the job is cancelled."""
+    return request("post", url, **kwargs)
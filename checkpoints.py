@@ -0,0 +1,182 @@
+"""
+Checkpoints Module for Text-to-Video Pipeline
+
+This module writes a manifest for every finished stage of a job, recording a
+hash of the stage's inputs, a hash of its config and its outputs (with the
+content hash of every output file). A resumed run reuses a stage whose
+inputs and config are unchanged and whose output files are still intact,
+so retrying a failed render doesn't repeat the LLM, TTS and image calls.
+With an ArtifactStore, the output files are stored there as well, and an
+output file that went missing or changed is copied back from it.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path):
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(value):
+    """Returns a JSON-serializable fingerprint of a stage value.
+
+    Strings that name an existing file are replaced by the hash of the file
+    content, so a regenerated file changes the fingerprint even when its
+    path stays the same.
+    """
+    if isinstance(value, str) and os.path.isfile(value):
+        return {"file": value, "sha256": hash_file(value)}
+    if isinstance(value, (list, tuple)):
+        return [fingerprint(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): fingerprint(item) for key, item in value.items()}
+    return value
+
+
+def hash_value(value):
+    """Returns a SHA-256 hex digest of a value's fingerprint."""
+    encoded = json.dumps(fingerprint(value), sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _output_files(value):
+    """Yields every existing file path contained in an output value."""
+    if isinstance(value, str):
+        if os.path.isfile(value):
+            yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _output_files(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _output_files(item)
+
+
+class StageCheckpoints:
+    """Reads and writes the per-stage manifests of one job."""
+
+    INITIAL_FILE = "initial.json"
+
+    def __init__(self, directory, store=None, owner=None):
+        """Initialize the checkpoints of one job.
+
+        Args:
+            directory (str): The job's checkpoint directory
+            store (ArtifactStore): Optional store that keeps a copy of every output file
+            owner (str): Job id that pins the stored files while the job runs
+        """
+        self.directory = directory
+        self.store = store
+        self.owner = owner
+        self.incomplete = set()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def manifest_path(self, stage):
+        """Returns the manifest path for a stage."""
+        return os.path.join(self.directory, f"{stage.name}.json")
+
+    def save_initial(self, initial):
+        """Stores the initial graph inputs (e.g. the topic) so a resume can reuse them."""
+        with open(os.path.join(self.directory, self.INITIAL_FILE), "w", encoding="utf-8") as f:
+            json.dump(initial, f, indent=4)
+
+    def load_initial(self):
+        """Returns the stored initial graph inputs, or an empty dict."""
+        initial_path = os.path.join(self.directory, self.INITIAL_FILE)
+        if not os.path.exists(initial_path):
+            return {}
+        with open(initial_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def key(self, node, results):
+        """Returns the input and config hashes that identify a stage run."""
+        inputs = {name: results[name] for name in node.inputs}
+        return {"input_hash": hash_value(inputs), "config_hash": hash_value(node.config)}
+
+    def restore(self, node, key):
+        """Returns the recorded outputs of a stage if they are still valid, else None.
+
+        A checkpoint is valid when the input and config hashes match and every
+        recorded output file still exists with the same content, or can be
+        copied back from the artifact store.
+        """
+        manifest_path = self.manifest_path(node.stage)
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {manifest_path}: {str(e)}")
+            return None
+
+        if manifest.get("input_hash") != key["input_hash"]:
+            logger.info(f"Checkpoint for {node.stage.name} is stale: inputs changed")
+            return None
+        if manifest.get("config_hash") != key["config_hash"]:
+            logger.info(f"Checkpoint for {node.stage.name} is stale: config changed")
+            return None
+
+        for file_path, digest in manifest.get("files", {}).items():
+            if os.path.isfile(file_path) and hash_file(file_path) == digest:
+                continue
+            if self.store is not None and self.store.get(digest, file_path):
+                logger.info(f"Restored {file_path} for {node.stage.name} from the artifact store")
+                if self.owner:
+                    self.store.pin(self.owner, digest)
+            else:
+                logger.info(f"Checkpoint for {node.stage.name} is stale: {file_path} changed or is missing")
+                return None
+
+        return manifest["outputs"]
+
+    def record(self, node, key, outputs):
+        """Writes the manifest for a finished stage.
+
+        Stages marked incomplete (they fell back to a degraded result) get no
+        manifest, so a resumed run retries them.
+        """
+        manifest_path = self.manifest_path(node.stage)
+        with self._lock:
+            if node.stage in self.incomplete:
+                if os.path.exists(manifest_path):
+                    os.remove(manifest_path)
+                return
+
+        files = {file_path: hash_file(file_path) for file_path in _output_files(outputs)}
+        if self.store is not None:
+            for file_path, digest in files.items():
+                self.store.put(file_path, digest, owner=self.owner)
+        manifest = {
+            "stage": node.stage.name,
+            "input_hash": key["input_hash"],
+            "config_hash": key["config_hash"],
+            "config": node.config,
+            "outputs": outputs,
+            "files": files,
+        }
+        # Write next to the manifest and rename, so a crash never leaves half a manifest
+        temp_path = f"{manifest_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=4, default=str)
+        os.replace(temp_path, manifest_path)
+
+    def mark_incomplete(self, stage):
+        """Marks a stage whose result should not be reused by a resumed run."""
+        with self._lock:
+            self.incomplete.add(stage)
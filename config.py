@@ -23,4 +23,55 @@ CAPTION_STYLE = "comic"
 BGM_MODEL = "moviepy"
 BGM_ENABLED = True
 BGM_VOLUME = 0.3
-BGM_PATH = "Data\creepy-piano-atmosphere-161660.mp3"
\ No newline at end of file
+BGM_PATH = "Data\creepy-piano-atmosphere-161660.mp3"
+
+# Stages of concurrent jobs admitted at once per resource class (network: script, prompts,
+# images, TTS; cpu: rendering and captions; memory: WhisperX)
+RESOURCE_LIMITS = {"network": 8, "cpu": 1, "memory": 1}
+
+# Overall time budget of a job in seconds, split into stage budgets; stages fall back to
+# degraded results (reused images, estimated caption timestamps, no BGM) to stay within it
+JOB_DEADLINE = None
+
+# Adaptive degradation of jobs taken off a backed-up service queue (see degradation.py); each
+# threshold reached turns on one more step: simple captions, lower resolution and fps, faster
+# x264 preset, one image per two script lines
+ADAPTIVE_DEGRADATION = True
+DEGRADE_QUEUE_DEPTHS = (2, 4, 6, 8)  # Queued jobs per worker
+DEGRADE_WAIT_SECONDS = (60, 180, 300, 600)  # Seconds the job waited in the queue
+
+# Work queue shared by several nodes through a common directory (see shared_queue.py); a node
+# stops heartbeating its claimed task when it dies, and after LEASE_SECONDS another node takes it
+LEASE_SECONDS = 60
+HEARTBEAT_SECONDS = 10
+REMOTE_CLAIM_TIMEOUT = 30  # Seconds a stage handed to other nodes may wait before it runs locally
+
+# Reuse of finished videos for a repeated topic with the same effective config (see job_cache.py);
+# script generation isn't deterministic, so set a max age in seconds to get a fresh video after
+# a while (None: reuse at any age, 0: always regenerate; also a per-job override)
+JOB_CACHE_ENABLED = True
+JOB_CACHE_MAX_AGE = None
+
+# Content-addressed store of job artifacts (see artifact_store.py): cached videos, checkpointed
+# stage outputs of jobs that may be resumed (resumed ones, ones kept with --skip-cleanup or named
+# with --job-id, or every job with CHECKPOINT_ARTIFACTS) and, with ARCHIVE_JOB_ARTIFACTS, the
+# workspace of every finished job. The least recently used artifacts not pinned by a running job
+# are evicted to stay within the budget
+ARTIFACT_STORE_MAX_BYTES = 5 * 1024 ** 3
+CHECKPOINT_ARTIFACTS = False
+ARCHIVE_JOB_ARTIFACTS = False
+
+# Memory governor (see memory_governor.py): RSS cap of a worker process in bytes. Stages wait until
+# their expected memory fits under it, and idle models (WhisperX) are unloaded to make room and
+# loaded again on their next use (None: no cap, models stay loaded)
+MEMORY_RSS_CAP = None
+MEMORY_MODEL_BYTES = 1536 * 1024 ** 2  # WhisperX and its align model, until they were loaded once
+MEMORY_DECODE_BYTES = 256 * 1024 ** 2  # Decode and encode buffers of a render or re-encode
+MEMORY_SEGMENT_BYTES = 32 * 1024 ** 2  # Decoded frame of an image, held while the video renders
+MEMORY_CAPTION_WORD_BYTES = 256 * 1024  # Rendered caption word clip
+
+# Logging (see job_logging.py): every job also gets its own log in Data/Output/<job id>/; quiet mode
+# drops per-image, per-chunk, per-segment and per-word progress and the progress bars
+LOG_QUIET = False
+LOG_MAX_BYTES = 10 * 1024 ** 2
+LOG_BACKUP_COUNT = 3
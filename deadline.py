@@ -0,0 +1,199 @@
+"""
+Deadline Module for Text-to-Video Pipeline
+
+This module gives a job an overall time budget (JOB_DEADLINE, or
+`--deadline` per job) and splits it into stage budgets as the stages start.
+A starting stage gets its share of the time that is left, weighed against
+the stages that still have to follow it on the longest chain, using the
+predicted stage durations when there is history and DEFAULT_STAGE_WEIGHTS
+otherwise. Stages that can't degrade (script, voiceover, rendering) may
+use all the time left, at the expense of the stages after them.
+
+Provider calls take their timeout from the running stage's budget through
+timeout(), and stages pick a fallback once their budget is spent (reuse a
+neighbouring image, caption from estimated timestamps, skip the background
+music). For our SLA a slightly degraded video on time beats a late one.
+
+The budget of the running stage is kept in a context variable, so threads
+started with contextvars.copy_context().run see it too. Without a deadline
+every helper here is a no-op.
+"""
+
+import time
+import threading
+import contextvars
+import logging
+from contextlib import contextmanager
+
+from config import JOB_DEADLINE
+
+logger = logging.getLogger(__name__)
+
+# Relative share of a job each stage gets when there is no stage history
+DEFAULT_STAGE_WEIGHTS = {
+    "SCRIPT": 1,
+    "VOICEOVER": 1,
+    "IMAGE_PREP": 0.1,
+    "IMAGE_GEN": 4,
+    "VIDEO": 3,
+    "CAPTIONS": 2,
+    "BGM_MIX": 0.5,
+    "BGM": 0.5,
+}
+
+# Stages without a fallback; they may use whatever time is left
+ESSENTIAL_STAGES = ("SCRIPT", "VOICEOVER", "IMAGE_PREP", "VIDEO")
+
+# Requests shorter than this are not worth starting
+MIN_TIMEOUT = 1.0
+
+_job = contextvars.ContextVar("job_deadline", default=None)
+_stage = contextvars.ContextVar("stage_budget", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a provider call is about to start with no budget left."""
+
+
+class StageBudget:
+    """The time a running stage may use."""
+
+    def __init__(self, name, seconds, needed=None):
+        self.name = name
+        self.seconds = seconds
+        # Predicted seconds of this stage and the stages after it, when there is history
+        self.needed = needed
+        self.ends = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.ends - time.monotonic()
+
+
+class JobDeadline:
+    """Overall time budget of one job and its split into stage budgets."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.ends = self.started + seconds
+        self.dependencies = {}
+        self.fallbacks = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_job(cls, job):
+        """Return the deadline configured for a job, or None if it has none."""
+        seconds = job.setting("JOB_DEADLINE", JOB_DEADLINE)
+        return cls(float(seconds)) if seconds else None
+
+    def remaining(self):
+        return self.ends - time.monotonic()
+
+    def plan(self, dependencies):
+        """Set the stage graph the budget is split over.
+
+        Args:
+            dependencies (dict): Stage name -> names of the stages it waits for
+        """
+        self.dependencies = dependencies
+
+    def allocate(self, stage, predictions=None):
+        """Budget for a stage that starts now.
+
+        A stage without a fallback may use all the time that is left (the
+        stages after it can still fall back); any other stage gets its share
+        of it, weighed against the heaviest chain of stages still to follow.
+
+        Args:
+            stage (str): Stage name
+            predictions (dict): Predicted seconds per stage name, from the stage history
+        """
+        remaining = max(self.remaining(), 0.0)
+        predictions = predictions or {}
+        # Predicted seconds and default weights don't mix, so predictions are used only when complete
+        if all(name in predictions for name in self.dependencies):
+            weights = {name: max(seconds, 0.1) for name, seconds in predictions.items()}
+            needed = self._chain(stage, predictions)
+        else:
+            weights = DEFAULT_STAGE_WEIGHTS
+            needed = None
+
+        if stage in ESSENTIAL_STAGES:
+            return StageBudget(stage, remaining, needed)
+        share = weights.get(stage, 1) / self._chain(stage, weights)
+        return StageBudget(stage, remaining * min(share, 1.0), needed)
+
+    def _chain(self, stage, weights):
+        """Weight of a stage plus the heaviest chain of stages that wait for it."""
+        followers = [other for other, deps in self.dependencies.items() if stage in deps]
+        return weights.get(stage, 1) + max((self._chain(other, weights) for other in followers), default=0.0)
+
+    @contextmanager
+    def stage(self, stage, predictions=None):
+        """Run the with-block under the budget of a stage."""
+        budget = self.allocate(stage, predictions)
+        logger.info(f"Stage {stage} budget {budget.seconds:.1f}s of {self.remaining():.1f}s left")
+        job_token = _job.set(self)
+        stage_token = _stage.set(budget)
+        try:
+            yield budget
+        finally:
+            _stage.reset(stage_token)
+            _job.reset(job_token)
+
+    def record_fallback(self, stage, description):
+        with self._lock:
+            self.fallbacks.append({"stage": stage, "fallback": description,
+                                   "at_seconds": round(time.monotonic() - self.started, 2)})
+        logger.warning(f"Deadline fallback in {stage}: {description}")
+
+
+def remaining():
+    """Seconds left for the running stage (never past the job deadline), or None without a deadline."""
+    job, budget = _job.get(), _stage.get()
+    if job is None:
+        return None
+    left = job.remaining()
+    if budget is not None:
+        left = min(left, budget.remaining())
+    return left
+
+
+def expired():
+    """True when the running stage has used up its budget."""
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def affordable():
+    """True unless the running stage's budget is spent, or the job can't fit the
+    stage and the stages after it as long as they are predicted to take."""
+    job, budget = _job.get(), _stage.get()
+    if job is None:
+        return True
+    if budget is None:
+        return job.remaining() > 0
+    if budget.remaining() <= 0:
+        return False
+    return budget.needed is None or job.remaining() >= budget.needed
+
+
+def timeout(default=None):
+    """Timeout for a provider call: the default, capped by the running stage's budget.
+
+    Raises:
+        DeadlineExceeded: If less than MIN_TIMEOUT is left
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left < MIN_TIMEOUT:
+        raise DeadlineExceeded(f"Deadline reached ({left:.1f}s left)")
+    return left if default is None else min(default, left)
+
+
+def record_fallback(stage, description):
+    """Note that a stage degraded its result to stay within the deadline."""
+    job = _job.get()
+    if job is not None:
+        job.record_fallback(stage, description)
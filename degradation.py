@@ -0,0 +1,97 @@
+"""
+Degradation Module for Text-to-Video Pipeline
+
+This module lowers the cost of new jobs while the service's queue is backed
+up. The pressure on a job is taken when a worker picks it up: how many jobs
+are still queued per worker, and how long the job itself waited. Each
+threshold in DEGRADE_QUEUE_DEPTHS or DEGRADE_WAIT_SECONDS that is reached
+turns on one more step of DEGRADATION_STEPS, cheapest loss of quality first:
+
+    1. simple_captions    caption from estimated timestamps instead of WhisperX
+    2. lower_resolution   render at a smaller size and frame rate
+    3. faster_preset      encode with a faster x264 preset (only when
+                          VIDEO_MODEL_CONFIG isn't "standard", which already
+                          uses ultrafast)
+    4. merge_lines        one image per two script lines, halving the images
+
+The steps are applied as per-job overrides, so a setting the client chose
+for the job is never changed, and the decision is kept in the job manifest.
+"""
+
+import logging
+
+from config import ADAPTIVE_DEGRADATION, DEGRADE_QUEUE_DEPTHS, DEGRADE_WAIT_SECONDS, VIDEO_MODEL_CONFIG
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Name and per-job overrides of each step, in the order they are turned on
+DEGRADATION_STEPS = (
+    ("simple_captions", {"CAPTION_MODEL": "simple_captions"}),
+    ("lower_resolution", {"VIDEO_SCALE": 0.75, "VIDEO_FPS": 20}),
+    # The standard quality already encodes with ultrafast; the others use medium
+    ("faster_preset", {"VIDEO_PRESET": "veryfast"} if VIDEO_MODEL_CONFIG != "standard" else {}),
+    ("merge_lines", {"LINES_PER_IMAGE": 2}),
+)
+
+DEGRADED_JOBS = metrics.REGISTRY.counter(
+    "text_to_video_degraded_jobs_total", "Jobs run with a degradation step turned on.", ["step"])
+DEGRADATION_LEVEL = metrics.REGISTRY.gauge(
+    "text_to_video_degradation_level", "Degradation steps turned on for the latest job.")
+
+
+class DegradationPolicy:
+    """Picks the degradation steps of a job from the queue pressure."""
+
+    def __init__(self, queue_depths=DEGRADE_QUEUE_DEPTHS, wait_seconds=DEGRADE_WAIT_SECONDS,
+                 enabled=ADAPTIVE_DEGRADATION):
+        """Initialize the policy.
+
+        Args:
+            queue_depths (tuple): Queued jobs per worker at which each next step is turned on
+            wait_seconds (tuple): Seconds a job waited in the queue at which each next step is turned on
+            enabled (bool): Run every job at full quality when False
+        """
+        self.queue_depths = tuple(queue_depths)
+        self.wait_seconds = tuple(wait_seconds)
+        self.enabled = enabled
+
+    def level(self, queue_depth, queue_wait, workers=1):
+        """Return how many steps to turn on for the given pressure."""
+        if not self.enabled:
+            return 0
+        depth = queue_depth / max(workers, 1)
+        by_depth = sum(1 for threshold in self.queue_depths if depth >= threshold)
+        by_wait = sum(1 for threshold in self.wait_seconds if queue_wait >= threshold)
+        return min(max(by_depth, by_wait), len(DEGRADATION_STEPS))
+
+    def apply(self, job, queue_depth, queue_wait, workers=1):
+        """Turn on the steps for a job's pressure as overrides of the job.
+
+        Args:
+            job (JobContext): Job about to run
+            queue_depth (int): Jobs still queued behind it
+            queue_wait (float): Seconds the job waited in the queue
+            workers (int): Workers taking jobs off the queue
+
+        Returns:
+            dict: The decision, for the job manifest
+        """
+        level = self.level(queue_depth, queue_wait, workers)
+        steps, settings = [], {}
+        for name, overrides in DEGRADATION_STEPS[:level]:
+            # A setting the client asked for wins over the step
+            applied = {key: value for key, value in overrides.items() if key not in job.overrides}
+            if not applied:
+                continue
+            steps.append(name)
+            settings.update(applied)
+            DEGRADED_JOBS.inc(step=name)
+        job.overrides.update(settings)
+        DEGRADATION_LEVEL.set(level)
+
+        if steps:
+            logger.warning(f"Job {job.job_id} degraded under queue pressure "
+                           f"(depth {queue_depth}, waited {queue_wait:.0f}s): {', '.join(steps)}")
+        return {"level": level, "queue_depth": queue_depth, "queue_wait_seconds": round(queue_wait, 1),
+                "steps": steps, "settings": settings}
@@ -0,0 +1,333 @@
+"""
+Fork Server Module for Text-to-Video Pipeline
+
+This module runs every generation job in its own forked process. A fork
+server process imports the heavy modules and loads every generator of a
+GenerationPipeline once (the WhisperX caption model included). Each job is
+then run in a child forked from it: the child starts with everything
+already loaded and shares those memory pages with the fork server
+copy-on-write, so jobs are isolated from each other without paying for
+model loading, or for a private copy of the model, per process.
+
+The fork server is forked before the caller starts any threads and stays
+single-threaded, since forking a process with running threads can leave
+locks held in the child. Metrics and ETAs of a job stay in its child
+process; results, manifests, traces and the stage history are shared
+through the job's files as usual. Cancelling a job sends its child SIGTERM,
+which cancels the job inside the child.
+
+Only available where os.fork exists (Linux, macOS).
+"""
+
+import os
+import gc
+import sys
+import signal
+import random
+import logging
+import importlib
+import threading
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+from pipeline import GenerationPipeline
+from Models.job_context import JobContext
+from cancellation import CancelToken
+import metrics
+import job_logging
+
+logger = logging.getLogger(__name__)
+
+# Imported by the fork server so no job pays for them; models are loaded by warm_up()
+PRELOAD_MODULES = ("numpy", "PIL.Image", "moviepy.editor", "requests")
+
+POLL_INTERVAL = 0.5
+
+
+def preload_modules(modules=PRELOAD_MODULES):
+    """Import modules ahead of the first job, skipping ones that aren't installed.
+
+    Returns:
+        list: Names of the modules that were imported
+    """
+    loaded = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        loaded.append(name)
+    return loaded
+
+
+class ForkServer:
+    """Runs jobs in processes forked from a warm fork server.
+
+    run() has the same signature as GenerationPipeline.run, so workers can
+    use a ForkServer in place of a pipeline. It may be called from several
+    threads at once; each call runs in its own child process.
+    """
+
+    def __init__(self, pipeline_options=None, pipeline_class=GenerationPipeline):
+        self.pipeline_options = pipeline_options or {}
+        self.pipeline_class = pipeline_class
+        # Workers read a pipeline's tracker for live ETAs; a job's tracker lives in its child
+        self.tracker = None
+        self.pid = None
+        self._requests = None
+        self._results = None
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._reader = None
+
+    def start(self):
+        """Fork the fork server and wait until it has loaded every generator.
+
+        Call this before starting any threads of your own.
+
+        Returns:
+            ForkServer: self, for chaining
+        """
+        if not hasattr(os, "fork"):
+            raise RuntimeError("❌ Fork server mode needs os.fork (Linux or macOS)")
+
+        request_reader, request_writer = multiprocessing.Pipe(duplex=False)
+        result_reader, result_writer = multiprocessing.Pipe(duplex=False)
+        # The fork server and every child write to the same result pipe
+        result_lock = multiprocessing.Lock()
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            request_writer.close()
+            result_reader.close()
+            code = 0
+            try:
+                self._serve(request_reader, result_writer, result_lock)
+            except BaseException:
+                logger.error(f"Fork server crashed: {traceback.format_exc()}")
+                code = 1
+            finally:
+                job_logging.flush()
+                os._exit(code)
+
+        request_reader.close()
+        result_writer.close()
+        self.pid = pid
+        self._requests = request_writer
+        self._results = result_reader
+
+        try:
+            message = self._results.recv()
+        except EOFError:
+            message = ("failed", "the fork server exited during warm-up")
+        if message[0] != "ready":
+            os.waitpid(pid, 0)
+            raise RuntimeError(f"❌ Fork server could not warm up: {message[1]}")
+        logger.info(f"Fork server {pid} ready, preloaded {', '.join(message[2]) or 'no modules'}")
+
+        self._reader = threading.Thread(target=self._collect, name="fork-server-results", daemon=True)
+        self._reader.start()
+        return self
+
+    def run(self, topic, job=None, output_name="output_video.mp4", cleanup=True, resume=False, cancel_token=None):
+        """Generate one video in a child of the fork server and wait for its result.
+
+        Args:
+            topic (str): Topic for the video
+            job (JobContext): Workspace for the job, created when omitted
+            output_name (str): File name for the published video
+            cleanup (bool): Remove the job workspace afterwards
+            resume (bool): Skip stages whose checkpoint in the workspace is still valid
+            cancel_token (CancelToken): Token that cancels the job's child process
+
+        Returns:
+            dict: The job result, with an "error" key if generation failed
+        """
+        if self._requests is None:
+            raise RuntimeError("❌ Fork server is not running; call start() first")
+        # Here rather than in the child, which couldn't return the job's id to wait on
+        job = job or JobContext.create()
+
+        done = threading.Event()
+        slot = {"done": done, "result": None}
+        with self._pending_lock:
+            self._pending[job.job_id] = slot
+        request = {"topic": topic, "job": job, "output_name": output_name, "cleanup": cleanup, "resume": resume}
+        try:
+            with self._send_lock:
+                self._requests.send(request)
+        except OSError as e:
+            with self._pending_lock:
+                self._pending.pop(job.job_id, None)
+            return {"job_id": job.job_id, "topic": topic, "error": f"Fork server unavailable: {str(e)}"}
+
+        if cancel_token is None:
+            done.wait()
+            return slot["result"]
+        handle = cancel_token.add_callback(lambda: self._send({"cancel": job.job_id}))
+        try:
+            done.wait()
+        finally:
+            cancel_token.remove_callback(handle)
+        return slot["result"]
+
+    def _send(self, message):
+        """Send a message to the fork server, if it is still running."""
+        with self._send_lock:
+            if self._requests is None:
+                return
+            try:
+                self._requests.send(message)
+            except OSError as e:
+                logger.warning(f"Could not reach the fork server: {str(e)}")
+
+    def stop(self):
+        """Stop the fork server once its running jobs are done."""
+        if self._requests is None:
+            return
+        with self._send_lock:
+            try:
+                self._requests.send(None)
+            except OSError:
+                pass
+            self._requests.close()
+            self._requests = None
+        os.waitpid(self.pid, 0)
+        if self._reader is not None:
+            self._reader.join()
+
+    def _collect(self):
+        """Hand results coming back from the fork server to the waiting run() calls."""
+        while True:
+            try:
+                job_id, result = self._results.recv()
+            except (EOFError, OSError):
+                break
+            with self._pending_lock:
+                slot = self._pending.pop(job_id, None)
+            if slot is not None:
+                slot["result"] = result
+                slot["done"].set()
+
+        # The fork server is gone; fail whoever is still waiting
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for job_id, slot in pending.items():
+            slot["result"] = {"job_id": job_id, "error": "Fork server exited"}
+            slot["done"].set()
+
+    def _serve(self, requests, results, result_lock):
+        """Main loop of the fork server process."""
+        # Ctrl+C reaches the whole process group; the fork server stops when its parent closes the pipe
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        try:
+            pipeline = self.pipeline_class(**self.pipeline_options)
+            preloaded = preload_modules()
+            pipeline.warm_up()
+        except Exception as e:
+            logger.error(f"Fork server warm-up failed: {traceback.format_exc()}")
+            results.send(("failed", str(e)))
+            return
+        # Keep the collector from touching (and so copying) the warm objects in every child
+        gc.collect()
+        gc.freeze()
+        with result_lock:
+            results.send(("ready", os.getpid(), preloaded))
+
+        children = {}
+        while True:
+            ready = wait([requests], timeout=POLL_INTERVAL)
+            self._reap(children, results, result_lock, block=False)
+            if not ready:
+                continue
+            try:
+                request = requests.recv()
+            except EOFError:
+                break
+            if request is None:
+                break
+            if "cancel" in request:
+                self._cancel(children, request["cancel"])
+                continue
+
+            pid = os.fork()
+            if pid == 0:
+                requests.close()
+                code = 0
+                try:
+                    self._run_child(pipeline, request, results, result_lock)
+                except BaseException:
+                    logger.error(f"Job {request['job'].job_id} crashed: {traceback.format_exc()}")
+                    code = 1
+                finally:
+                    # os._exit skips atexit, which would write the records still queued
+                    job_logging.flush()
+                    os._exit(code)
+            children[pid] = request
+            logger.info(f"Forked job {request['job'].job_id} as process {pid}")
+
+        self._reap(children, results, result_lock, block=True)
+
+    @staticmethod
+    def _cancel(children, job_id):
+        """Ask the child running a job to cancel it."""
+        for pid, request in children.items():
+            if request["job"].job_id == job_id:
+                request["cancelled"] = True
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+                logger.info(f"Cancelling job {job_id} (process {pid})")
+                return
+
+    @staticmethod
+    def _run_child(pipeline, request, results, result_lock):
+        """Run one job inside a freshly forked child."""
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        cancel_token = CancelToken()
+        signal.signal(signal.SIGTERM, lambda signum, frame: cancel_token.cancel())
+        # A child only sees its own job, so its textfile would overwrite the parent's totals
+        metrics.configure_textfile(None)
+        # Every child would otherwise draw the same "random" choices as its siblings
+        random.seed()
+        if "numpy" in sys.modules:
+            sys.modules["numpy"].random.seed()
+
+        job = request["job"]
+        result = pipeline.run(request["topic"], job, output_name=request["output_name"],
+                              cleanup=request["cleanup"], resume=request["resume"], cancel_token=cancel_token)
+        result["pid"] = os.getpid()
+        sys.stdout.flush()
+        with result_lock:
+            results.send((job.job_id, result))
+
+    @staticmethod
+    def _reap(children, results, result_lock, block):
+        """Collect finished children, reporting the ones that died without sending a result."""
+        while children:
+            pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            if pid == 0:
+                return
+            request = children.pop(pid, None)
+            if request is None or status == 0:
+                continue
+            if os.WIFSIGNALED(status):
+                reason = f"killed by signal {os.WTERMSIG(status)}"
+            else:
+                reason = f"exited with code {os.WEXITSTATUS(status)}"
+            job = request["job"]
+            if request.get("cancelled"):
+                # SIGTERM arrived before the child had set up its handler
+                result = {"job_id": job.job_id, "topic": request["topic"], "error": "Job cancelled",
+                          "cancelled": True}
+            else:
+                logger.error(f"Job {job.job_id} (process {pid}) {reason}")
+                result = {"job_id": job.job_id, "topic": request["topic"], "error": f"Job process {reason}"}
+            with result_lock:
+                results.send((job.job_id, result))
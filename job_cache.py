@@ -0,0 +1,133 @@
+"""
+Job Cache Module for Text-to-Video Pipeline
+
+This module keeps the published video of finished jobs, keyed by the
+normalized topic and the job's effective config: the settings of every
+stage the job runs (script model, voice, image model, animation, caption
+model and style, BGM, and any per-job overrides of them, see
+GenerationPipeline.stage_config). A job whose key was generated before
+gets the stored video at once instead of another full run, so retries,
+duplicate submissions and reposts of a topic cost nothing.
+
+Script generation is not deterministic, so a repeat of a topic may be
+wanted as a new video. Freshness is opt-in: JOB_CACHE_MAX_AGE (or the
+per-job override of the same name) makes older entries count as misses,
+and 0 always regenerates. Failed, cancelled and degraded runs (a stage
+fell back, for example to reach its deadline) are never stored.
+
+The videos are kept in the artifact store, so they count against its disk
+budget; an entry whose video was evicted is a miss. Concurrent jobs with the
+same key in one process run one after the other, so a duplicate submitted
+while the first is still running waits for it and then hits.
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+
+from Models.config import JOB_CACHE_DIR
+import cancellation
+
+logger = logging.getLogger(__name__)
+
+# Per-key locks shared by every JobCache of the process, since each warm pipeline has its own
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+
+def normalize_topic(topic):
+    """Case- and whitespace-insensitive form of a topic, without trailing punctuation."""
+    return " ".join(topic.casefold().split()).rstrip(".!?")
+
+
+class JobCache:
+    """Stored results of finished jobs, keyed by topic and effective config."""
+
+    def __init__(self, artifacts, directory=JOB_CACHE_DIR):
+        """Initialize the cache.
+
+        Args:
+            artifacts (ArtifactStore): Where the cached videos are kept
+            directory (str): Where the cache entries are kept
+        """
+        self.artifacts = artifacts
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, topic, config):
+        """Returns the cache key of a topic generated with the given effective config."""
+        encoded = json.dumps({"topic": normalize_topic(topic), "config": config}, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def acquire(self, key):
+        """Wait until no other job of this process is generating the key."""
+        with _key_locks_lock:
+            lock = _key_locks.setdefault(key, threading.Lock())
+        # Poll, so a cancelled job stops waiting for its twin
+        while not lock.acquire(timeout=0.5):
+            cancellation.check()
+
+    def release(self, key):
+        with _key_locks_lock:
+            _key_locks[key].release()
+
+    def lookup(self, key, max_age=None):
+        """Returns the stored entry for a key, or None on a miss.
+
+        Args:
+            key (str): Key from key()
+            max_age (float): Entries older than this many seconds are misses (None: any age)
+        """
+        try:
+            with open(self.entry_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        age = time.time() - entry["created_at"]
+        if max_age is not None and age >= max_age:
+            logger.info(f"Cached job {entry['job_id']} is {age:.0f}s old, older than {max_age}s; regenerating")
+            return None
+        if not self.artifacts.has(entry["video"]):
+            logger.info(f"Cached video of job {entry['job_id']} was evicted from the artifact store")
+            return None
+        return entry
+
+    def restore(self, entry, job, output_name):
+        """Publishes the stored video of an entry as a job's output.
+
+        Returns:
+            str: Path of the published video, or None if it was evicted meanwhile
+        """
+        return self.artifacts.get(entry["video"], os.path.join(job.output_dir, output_name))
+
+    def store(self, key, topic, config, result):
+        """Stores a finished job's published video and script under a key."""
+        video_path = result.get("video_path")
+        if not video_path or not os.path.isfile(video_path):
+            return
+
+        entry = {
+            "key": key,
+            "topic": topic,
+            "config": config,
+            "job_id": result["job_id"],
+            "created_at": time.time(),
+            "video": self.artifacts.put(video_path),
+            "script": result.get("script"),
+            "stage_times": result.get("stage_times", {}),
+        }
+        # Write next to the entry and rename, so a lookup never reads half an entry
+        entry_path = self.entry_path(key)
+        temp_path = f"{entry_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=4, default=str)
+        os.replace(temp_path, entry_path)
+        logger.info(f"Cached the result of job {result['job_id']}")
@@ -0,0 +1,291 @@
+"""
+Job Logging Module for Text-to-Video Pipeline
+
+This module keeps logging off the generation threads. setup() puts a
+QueueHandler on the root logger and replaces sys.stdout with a stream that
+turns every printed line into a log record, so a log call or print() in a
+render loop only appends to a queue. One listener thread takes the records
+off the queue and writes them:
+
+    console          stdout as before: printed lines as they are, log
+                     records with a timestamp, logger and level
+    shared log       generation.log, log records of every job tagged with
+                     the job id (printed lines stay on the console)
+    job log          Data/Output/<job id>/generation.log, everything the
+                     job logged or printed, from any of its threads
+
+Log files rotate at LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old files.
+Only the listener thread writes them, so concurrent jobs don't interleave in
+one file and a slow write never holds up a job.
+
+A record belongs to the job bound with bind() in its thread or in the
+context the thread was started from (stage and segment threads copy it).
+Per-item progress (each image, TTS chunk, rendered segment or caption
+word) is logged with chatter(); quiet mode drops it, along with the moviepy
+progress bars and the overall progress bar, and keeps stage, warning and
+error lines.
+
+The listener is stopped before a fork and started again afterwards in both
+processes, so a forked job process gets its own thread and queue.
+"""
+
+import io
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import LOG_QUIET, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+
+# Between DEBUG and INFO: shown by default, dropped in quiet mode
+CHATTER = 15
+logging.addLevelName(CHATTER, "CHATTER")
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+SHARED_LOG_FORMAT = '%(asctime)s - %(job_id)s - %(name)s - %(levelname)s - %(message)s'
+PRINT_FORMAT = '%(asctime)s - %(message)s'
+LOG_NAME = "generation.log"
+
+# Logger of the lines written to stdout, such as print() calls
+PRINT_LOGGER = "stdout"
+
+_job = contextvars.ContextVar("job_log", default=None)
+_job_paths = {}
+_job_paths_lock = threading.Lock()
+_listener = None
+_running = False
+_quiet = LOG_QUIET
+
+print_logger = logging.getLogger(PRINT_LOGGER)
+
+
+class _Formatter(logging.Formatter):
+    """Formats printed lines without the logger and level."""
+
+    def __init__(self, fmt, print_fmt):
+        super().__init__(fmt)
+        self._print_formatter = logging.Formatter(print_fmt) if print_fmt else None
+
+    def format(self, record):
+        if record.name == PRINT_LOGGER and self._print_formatter is None:
+            return record.getMessage()
+        if record.name == PRINT_LOGGER:
+            return self._print_formatter.format(record)
+        return super().format(record)
+
+
+class _JobQueueHandler(QueueHandler):
+    """Queues records, tagged with the job of the thread that logged them."""
+
+    def prepare(self, record):
+        record.job_id = _job.get() or "-"
+        return super().prepare(record)
+
+
+class _Dispatcher(logging.Handler):
+    """Writes queued records to the console, the shared log and the log of their job."""
+
+    def __init__(self, console, shared):
+        super().__init__()
+        self.console = console
+        self.shared = shared
+        self.jobs = {}
+
+    def handle(self, record):
+        closing = getattr(record, "close_job_log", None)
+        if closing is not None:
+            with _job_paths_lock:
+                _job_paths.pop(closing, None)
+            handler = self.jobs.pop(closing, None)
+            if handler is not None:
+                handler.close()
+            return True
+
+        self.console.handle(record)
+        if getattr(record, "console_only", False):
+            return True
+        if self.shared is not None and record.name != PRINT_LOGGER:
+            self.shared.handle(record)
+        handler = self._job_handler(record.job_id)
+        if handler is not None:
+            handler.handle(record)
+        return True
+
+    def _job_handler(self, job_id):
+        handler = self.jobs.get(job_id)
+        if handler is None:
+            with _job_paths_lock:
+                path = _job_paths.get(job_id)
+            if path is None:
+                return None
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = _rotating_handler(path)
+            handler.setFormatter(_Formatter(LOG_FORMAT, PRINT_FORMAT))
+            self.jobs[job_id] = handler
+        return handler
+
+    def close(self):
+        for handler in (self.console, self.shared, *self.jobs.values()):
+            if handler is not None:
+                handler.close()
+        super().close()
+
+
+class _PrintStream(io.TextIOBase):
+    """Replacement for sys.stdout that logs every complete line."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._logger = print_logger
+        # print() writes the text and the newline separately, so lines are collected per thread
+        self._pending = threading.local()
+
+    def write(self, text):
+        pending = getattr(self._pending, "text", "") + text
+        *lines, self._pending.text = pending.split("\n")
+        for line in lines:
+            if line.strip():
+                self._logger.info(line)
+        return len(text)
+
+    def flush(self):
+        # An input() prompt has no newline, but is flushed before reading
+        pending = getattr(self._pending, "text", "")
+        if pending.strip():
+            self._pending.text = ""
+            self._logger.info(pending)
+
+    @property
+    def encoding(self):
+        return self.stream.encoding
+
+    def fileno(self):
+        return self.stream.fileno()
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    def writable(self):
+        return True
+
+
+def _rotating_handler(path):
+    return RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+
+
+def setup(log_file=LOG_NAME, quiet=None, level=None):
+    """Route logging and print() through a queue and a listener thread.
+
+    Args:
+        log_file (str): Shared log of every job, None for none
+        quiet (bool): Drop per-item progress, overriding LOG_QUIET
+        level (int): Root log level (INFO in quiet mode, CHATTER otherwise)
+    """
+    global _listener, _quiet
+    if _listener is not None:
+        return
+    if quiet is not None:
+        _quiet = quiet
+
+    stdout = sys.stdout
+    console = logging.StreamHandler(stdout)
+    console.setFormatter(_Formatter(LOG_FORMAT, None))
+    shared = None
+    if log_file:
+        shared = _rotating_handler(log_file)
+        shared.setFormatter(logging.Formatter(SHARED_LOG_FORMAT))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_JobQueueHandler(records))
+    root.setLevel(level or (logging.INFO if _quiet else CHATTER))
+    _listener = QueueListener(records, _Dispatcher(console, shared))
+    _start()
+    sys.stdout = _PrintStream(stdout)
+    # Write what is still queued when the process exits
+    atexit.register(_stop)
+    os.register_at_fork(before=_stop, after_in_parent=_start, after_in_child=_after_fork_in_child)
+
+
+def _start():
+    global _running
+    if _listener is not None and not _running:
+        _listener.start()
+        _running = True
+
+
+def _stop():
+    # Drains the queue first; before a fork, so the child doesn't inherit a lock the thread holds
+    global _running
+    if _listener is not None and _running:
+        _listener.stop()
+        _running = False
+
+
+def _after_fork_in_child():
+    if _listener is None:
+        return
+    # Other threads of the parent may have been putting records in the old queue
+    records = queue.SimpleQueue()
+    _listener.queue = records
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, _JobQueueHandler):
+            handler.queue = records
+    _start()
+
+
+def quiet():
+    """Whether per-item progress is dropped."""
+    return _quiet
+
+
+def chatter(message):
+    """Log per-item progress (an image, a chunk, a segment, a word), which quiet mode drops."""
+    if _listener is None:
+        # Logging isn't set up, when a model is run on its own
+        if not _quiet:
+            print(message)
+        return
+    print_logger.log(CHATTER, message)
+
+
+def console(message):
+    """Show a line on the console only, for a message that is logged in full as well."""
+    if _listener is None:
+        print(message)
+        return
+    print_logger.info(message, extra={"console_only": True})
+
+
+@contextmanager
+def bind(job):
+    """Send what the with-block (and threads started from it) logs and prints to the job's log too."""
+    path = os.path.join(job.output_dir, LOG_NAME)
+    with _job_paths_lock:
+        _job_paths[job.job_id] = path
+    token = _job.set(job.job_id)
+    try:
+        yield path
+    finally:
+        _job.reset(token)
+        if _listener is not None:
+            # Closed by the listener after the job's last queued record
+            _listener.queue.put(logging.makeLogRecord({"close_job_log": job.job_id}))
+        else:
+            with _job_paths_lock:
+                _job_paths.pop(job.job_id, None)
+
+
+def flush():
+    """Write every queued record before returning, for a process that ends with os._exit()."""
+    if _running:
+        sys.stdout.flush()
+        _stop()
+        _start()
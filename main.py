@@ -1,35 +1,14 @@
 import sys
 import os
-import shutil
+import signal
 import logging
-import traceback
 import argparse
-from pathlib import Path
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("generation.log", encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 sys.dont_write_bytecode = True
 
-from Models.Script.script_factory import load_script_model
-from Models.Voiceover.voiceover_factory import load_voiceover_model
-from Models.Image.image_factory import load_image_model
-from Models.Video.video_factory import load_video_model
-from Models.Captions.captions_factory import load_caption_model
-from Models.Script.utils import save_formatted_script
-from Models.Image.utils import format_for_image_prompt
-from Models.BGM.bgm_factory import load_bgm_model
-from config import CAPTION_MODEL, CAPTION_STYLE, BGM_ENABLED, BGM_PATH, BGM_MODEL
-from progress_tracker import ProgressTracker, Stage
-import time
 
 
 def parse_arguments():
@@ -45,11 +24,63 @@ def parse_arguments():
         help="Topic for video generation"
     )
     
+    parser.add_argument(
+        "--batch",
+        type=str,
+        help="JSONL file with one {\"topic\": ...} object per line to generate in batch mode"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Number of parallel workers in batch mode"
+    )
+    
+    parser.add_argument(
+        "--fork",
+        action="store_true",
+        help="In batch mode, load generators once in a fork server and run every topic in a forked process"
+    )
+    
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        help="Where batch mode writes its per-topic results (JSONL)"
+    )
+    
     parser.add_argument(
         "--output", "-o",
         type=str,
         default="output_video.mp4",
-        help="Output filename for the generated video"
+        help="Output filename for the generated video, saved under Data/Output/<job id>/"
+    )
+    
+    parser.add_argument(
+        "--voice",
+        type=str,
+        help="Voice for this run, overriding AUDIO_MODEL_VOICE in config.py"
+    )
+    
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Time budget for the job in seconds; late stages fall back to degraded results to finish on time"
+    )
+    
+    parser.add_argument(
+        "--job-id",
+        type=str,
+        help="Identifier for the job workspace (generated when omitted)"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="JOB_ID",
+        help="Resume a job from its stage checkpoints, skipping stages whose inputs and config are unchanged "
+             "(the most recent job when no id is given)"
     )
     
     parser.add_argument(
@@ -64,6 +95,67 @@ def parse_arguments():
         help="Skip background music addition"
     )
     
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Render each segment as soon as its image is ready instead of waiting for all images"
+    )
+    
+    parser.add_argument(
+        "--stream-queue-size",
+        type=int,
+        default=2,
+        help="Maximum images or frames waiting between streaming steps"
+    )
+    
+    parser.add_argument(
+        "--workspace",
+        choices=["disk", "memory"],
+        help="Keep job workspaces on disk or in memory (tmpfs), overriding WORKSPACE_STORAGE in Models/config.py"
+    )
+    
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Generate a new video even if this topic was generated with the same config before"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Neither reuse nor store finished videos (see JOB_CACHE_ENABLED in config.py)"
+    )
+    
+    parser.add_argument(
+        "--remote-stages",
+        nargs="+",
+        default=[],
+        metavar="STAGE",
+        help="Stages (e.g. VIDEO CAPTIONS) to hand to other nodes through the shared queue; "
+             "start those nodes with shared_queue.py work --serve <stages>"
+    )
+    
+    parser.add_argument(
+        "--queue-dir",
+        type=str,
+        default="Data/Queue/",
+        help="Directory shared by the nodes for --remote-stages"
+    )
+    
+    parser.add_argument(
+        "--memory-cap",
+        type=int,
+        metavar="MB",
+        help="RSS cap of the process in MB, overriding MEMORY_RSS_CAP: stages wait for memory and "
+             "idle models are unloaded to stay under it"
+    )
+    
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Leave out per-image, per-chunk and per-word progress and the progress bars"
+    )
+    
     parser.add_argument(
         "--debug",
         action="store_true",
@@ -76,6 +168,30 @@ def parse_arguments():
         help="Skip cleanup of temporary files"
     )
     
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Print the predicted duration of each stage from past jobs and exit without generating"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Sample each stage and write a speedscope profile per stage to Data/Output/<job id>/Profiles/"
+    )
+    
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        help="Write Prometheus metrics (stage durations, provider latency, render speed) to this textfile"
+    )
+    
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics at http://127.0.0.1:<port>/metrics while the run lasts"
+    )
+    
     return parser.parse_args()
 
 
@@ -83,176 +199,106 @@ def main():
     """Main function to orchestrate the text-to-video generation pipeline."""
     args = parse_arguments()
     
+    # Logging goes through a queue to the console, generation.log and each job's own log
+    import job_logging
+    job_logging.setup(quiet=args.quiet or None, level=logging.DEBUG if args.debug else None)
     if args.debug:
-        logging.getLogger().setLevel(logging.DEBUG)
         logger.debug("Debug logging enabled")
     
-    try:
-        if not args.skip_cleanup:
-            clear_temp_data()
-        ensure_temp_folders()
-
-        topic = args.topic
-        if not topic:
-            topic = input("Enter a topic for your video: ")
-            
-        tracker = ProgressTracker(topic)
-        
-        # 1. Generate Script
-        tracker.update_stage(Stage.SCRIPT)
-        script_generator = load_script_model()
-        tracker.log_substep("Generating script...")
-        script = script_generator.generate_script(topic)
-        print(f"\nGenerated Script:\n{script}\n")
-        
-        # 2. Generate Voiceover
-        tracker.update_stage(Stage.VOICEOVER)
-        voiceover_generator = load_voiceover_model()
-        tracker.log_substep("Synthesizing voiceover...")
-        audio_path = voiceover_generator.generate_voiceover(script)
-        tracker.log_substep(f"Voiceover saved to: {audio_path}")
+    # Imported after argument parsing, so --help and argument errors return without loading the pipeline
+    from Models.job_context import JobContext
+    from Models import workspace_storage
+    import memory_governor
+    from pipeline import GenerationPipeline
+    from batch import run_batch
+    from cancellation import CancelToken
+    import metrics
+    
+    if args.metrics_file:
+        metrics.configure_textfile(args.metrics_file)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    
+    if args.workspace:
+        workspace_storage.configure(args.workspace)
+    
+    if args.memory_cap:
+        memory_governor.configure(args.memory_cap * 1024 ** 2)
+    
+    if args.estimate:
+        return print_estimate(GenerationPipeline(**pipeline_options(args)))
+    
+    if args.batch:
+        return run_batch(
+            args.batch,
+            workers=args.workers,
+            manifest_path=args.manifest,
+            pipeline_options=pipeline_options(args),
+            cleanup=not args.skip_cleanup,
+            fork=args.fork
+        )
+    
+    job_id = args.job_id
+    if args.resume:
+        job_id = JobContext.latest_job_id() if args.resume == "latest" else args.resume
+        if job_id is None:
+            print("❌ No job workspace found to resume")
+            return None
+        print(f"♻️ Resuming job {job_id}")
+    
+    topic = args.topic
+    if not topic and not args.resume:
+        topic = input("Enter a topic for your video: ")
+    
+    pipeline = GenerationPipeline(**pipeline_options(args))
+    job = JobContext.create(job_id=job_id, overrides=job_overrides(args))
+    # The app terminates an abandoned job's process; stop its downloads and encodes instead of dying mid-write
+    cancel_token = CancelToken()
+    signal.signal(signal.SIGTERM, lambda signum, frame: cancel_token.cancel())
+    return pipeline.run(topic, job, output_name=args.output, cleanup=not args.skip_cleanup,
+                        resume=bool(args.resume), cancel_token=cancel_token)
 
-        # 3. Format script for image generation
-        tracker.update_stage(Stage.IMAGE_PREP)
-        tracker.log_substep("Formatting script for image generation...")
-        formatted_script = save_formatted_script(script)
-        
-        # 4. Format script for image prompts
-        tracker.log_substep("Creating image prompts...")
-        image_prompts = format_for_image_prompt(formatted_script)
-        tracker.log_substep(f"Created {len(image_prompts)} image prompts")
-        
-        # 5. Generate Images
-        tracker.update_stage(Stage.IMAGE_GEN)
-        image_generator = load_image_model()
-        image_paths = []
-        
-        for i, prompt in enumerate(image_prompts):
-            tracker.log_substep(f"Generating image", i+1, len(image_prompts))
-            image_path = f"image_{i+1}.jpg"
-            try:
-                image_generator.download_image(prompt, i+1)
-                image_paths.append(image_path)
-            except Exception as e:
-                tracker.error(f"Error generating image {i+1}", e)
-            time.sleep(1)
-        
-        # 6. Generate Video
-        tracker.update_stage(Stage.VIDEO)
-        tracker.log_substep("Assembling video...")
-        video_generator = load_video_model()
-        video_path = video_generator.generate_video(topic)
-        
-        if video_path and args.output and args.output != "output_video.mp4":
-            try:
-                output_dir = os.path.dirname(video_path)
-                new_path = os.path.join(output_dir, args.output)
-                os.rename(video_path, new_path)
-                video_path = new_path
-                tracker.log_substep(f"Video renamed to {args.output}")
-            except Exception as e:
-                tracker.warning(f"Could not rename output file: {str(e)}")
-        
-        # 7. Add Captions to Video
-        if video_path and not args.no_captions:
-            tracker.update_stage(Stage.CAPTIONS)
-            tracker.log_substep(f"Adding captions using model: {CAPTION_MODEL}, style: {CAPTION_STYLE}")
-            
-            caption_generator = load_caption_model(CAPTION_MODEL)
-            
-            try:
-                captioned_video_path = caption_generator.process_video(video_path, CAPTION_STYLE)
-                
-                if captioned_video_path:
-                    video_path = captioned_video_path
-                else:
-                    tracker.warning("Captioning failed, but original video is available")
-            except Exception as e:
-                tracker.error(f"Error during captioning", e)
-        elif video_path and args.no_captions:
-            tracker.log_substep("Skipping caption generation (--no-captions flag)")
-        else:
-            tracker.error("Video generation failed")
-        
-        # 8. Add Background Music to Video
-        if video_path and BGM_ENABLED and not args.no_bgm:
-            tracker.update_stage(Stage.BGM)
-            tracker.log_substep(f"Adding background music using model: {BGM_MODEL}")
-            
-            bgm_generator = load_bgm_model()
-            
-            try:
-                bgm_video_path = bgm_generator.add_background_music(
-                    video_path=video_path,
-                    bgm_path=BGM_PATH,
-                    bgm_volume=0.3,
-                    voiceover_volume=1.0
-                )
-                
-                if bgm_video_path:
-                    video_path = bgm_video_path
-                else:
-                    tracker.warning("BGM addition failed, but video is available without BGM")
-            except Exception as e:
-                tracker.error(f"Error during BGM addition", e)
-        elif video_path and (not BGM_ENABLED or args.no_bgm):
-            tracker.log_substep("Skipping BGM addition (--no-bgm flag or BGM disabled in config)")
-        else:
-            tracker.error("Video generation failed before BGM stage")
 
-        # Clear the Temp data after Generation
-        if not args.skip_cleanup:
-            tracker.update_stage(Stage.CLEANUP)
-            tracker.log_substep("Cleaning up temporary files...")
-            clear_temp_data()
-        else:
-            tracker.log_substep("Skipping cleanup (--skip-cleanup flag)")
-        
-        # Complete the process
-        tracker.complete(video_path if 'video_path' in locals() and video_path else None)
-          
-        return {
-            "script": formatted_script,
-            "audio_path": audio_path,
-            "image_paths": image_paths,
-            "video_path": video_path if 'video_path' in locals() else None
-        }
-    
-    except Exception as e:
-        logger.error(f"Error in main process: {str(e)}")
-        logger.error(traceback.format_exc())
-        if 'tracker' in locals():
-            tracker.error("Fatal error in generation process", e)
-        return {"error": str(e)}
+def print_estimate(pipeline):
+    """Print the pre-run cost estimate of a job."""
+    estimate = pipeline.estimate()
+    if estimate is None:
+        print("No stage history yet; run a few jobs to get estimates")
+        return None
+    print(f"⏳ Estimated from {estimate['samples']} past jobs:")
+    for stage, seconds in estimate["stages"].items():
+        print(f"  {stage}: {seconds:.1f}s")
+    print(f"  Total: {estimate['total_seconds']:.1f}s (stages overlap where the graph allows)")
+    return estimate
 
 
-def clear_temp_data():
-    """Clear temporary data from previous generations."""
-    logger.info("Clearing temporary data")
-    temp_dir = Path("Data/Temp")
-    
-    if not temp_dir.exists():
-        logger.warning("Temp directory does not exist")
-        return
-        
-    for item in temp_dir.iterdir():
-        try:
-            if item.is_dir():
-                shutil.rmtree(item, ignore_errors=True)
-            elif item.is_file():
-                item.unlink()
-        except PermissionError:
-            logger.warning(f"Could not remove {item} - Permission denied")
-        except Exception as e:
-            logger.warning(f"Error clearing {item}: {str(e)}")
+def job_overrides(args):
+    """Map command line flags to per-job config overrides."""
+    overrides = {}
+    if args.voice:
+        overrides["AUDIO_MODEL_VOICE"] = args.voice
+    if args.deadline:
+        overrides["JOB_DEADLINE"] = args.deadline
+    if args.fresh:
+        overrides["JOB_CACHE_MAX_AGE"] = 0
+    if args.job_id:
+        # A job given a name is one to come back to with --resume
+        overrides["CHECKPOINT_ARTIFACTS"] = True
+    return overrides
 
 
-def ensure_temp_folders():
-    """Ensure all required temporary folders exist."""
-    logger.info("Ensuring temporary folders exist")
-    for folder in ["Script", "Voiceover", "Generated_Images", "Video", "Timestamps"]:
-        folder_path = Path("Data/Temp") / folder
-        folder_path.mkdir(parents=True, exist_ok=True)
+def pipeline_options(args):
+    """Map command line flags to GenerationPipeline options."""
+    return {
+        "no_captions": args.no_captions,
+        "no_bgm": args.no_bgm,
+        "stream": args.stream,
+        "stream_queue_size": args.stream_queue_size,
+        "profile": args.profile,
+        "remote_stages": args.remote_stages,
+        "queue_dir": args.queue_dir,
+        "job_cache": not args.no_cache,
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+"""
+Memory Governor Module for Text-to-Video Pipeline
+
+This module keeps the process under an RSS cap (MEMORY_RSS_CAP). Two kinds
+of memory add up when jobs are packed onto one worker:
+
+    residents     models kept loaded between jobs, such as WhisperX and its
+                  alignment model, which only the caption stage needs
+    stage memory  what a running stage decodes and holds for a while: the
+                  frame of every image while the video renders, a clip per
+                  caption word and the decode buffers of a re-encode
+
+Owners of a resident track() it with its size and an unload callback and
+hold it with use() while they need it. A stage reserve()s its expected
+memory before it runs. If the RSS plus the memory reserved by running
+stages leaves no room for it, idle residents are unloaded, least recently
+used first, and once none are left the stage waits until running stages
+release their memory (back-pressure), instead of the worker being killed
+by the OOM killer. An unloaded model is loaded again by its next use, and
+when a finished stage leaves the process over the cap, idle residents are
+unloaded right away.
+
+Reservations count in full until they are released, on top of the RSS the
+reserved work has grown by already, so admission errs on the side of
+waiting. A stage is never kept waiting for memory only its own thread has
+reserved, or when nothing is running that could free any; it goes over the
+cap with a warning instead. Without a cap, residents stay loaded and no
+stage waits.
+
+The governor is per process: in fork mode every job process has its own.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from config import MEMORY_RSS_CAP
+from resource_monitor import current_rss
+import metrics
+import cancellation
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting stage checks the RSS again, since it also falls without a release
+POLL_SECONDS = 0.5
+
+MEMORY_WAIT = metrics.REGISTRY.histogram(
+    "text_to_video_memory_wait_seconds", "Time stages waited for memory under the RSS cap.")
+RESIDENT_BYTES = metrics.REGISTRY.gauge(
+    "text_to_video_resident_bytes", "Size of the models the memory governor keeps loaded.", ["resident"])
+RESIDENT_UNLOADS = metrics.REGISTRY.counter(
+    "text_to_video_resident_unloads_total", "Models unloaded to stay under the RSS cap.", ["resident"])
+
+
+class MemoryGovernor:
+    """Tracks large residents and admits stages by the memory they need under an RSS cap."""
+
+    def __init__(self, cap=MEMORY_RSS_CAP):
+        """Initialize the governor.
+
+        Args:
+            cap (int): RSS cap of the process in bytes, None for no cap
+        """
+        self.cap = cap
+        self._residents = {}
+        self._sizes = {}
+        self._in_use = {}
+        self._reservations = {}
+        self._condition = threading.Condition()
+
+    def track(self, name, size, unload):
+        """Record a loaded resident.
+
+        Args:
+            name (str): Name of the resident, unique in the process
+            size (int): Bytes it holds
+            unload (callable): Called without arguments to free it; must not call the governor
+        """
+        with self._condition:
+            self._residents[name] = {"size": size, "unload": unload, "last_used": time.monotonic()}
+            self._sizes[name] = size
+        RESIDENT_BYTES.set(size, resident=name)
+
+    def resident_size(self, name, default):
+        """Bytes a resident held when it was last loaded, or default if it never was."""
+        with self._condition:
+            return self._sizes.get(name, default)
+
+    @contextmanager
+    def use(self, name):
+        """Keep a resident from being unloaded for the with-block.
+
+        The resident doesn't need to be loaded yet; its owner (re)loads it inside the block.
+        """
+        with self._condition:
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_use[name] -= 1
+                if name in self._residents:
+                    self._residents[name]["last_used"] = time.monotonic()
+
+    @contextmanager
+    def reserve(self, size, name=None):
+        """Hold size bytes of the RSS cap for the with-block, waiting until they fit.
+
+        Args:
+            size (int): Bytes the work is expected to add to the RSS
+            name (str): What is waiting, for the log
+
+        Yields:
+            float: Seconds spent waiting for memory
+        """
+        if self.cap is None or not size:
+            yield 0.0
+            return
+
+        token = object()
+        owner = threading.get_ident()
+        started = time.perf_counter()
+        with cancellation.on_cancel(self._wake):
+            with self._condition:
+                while not self._fits(size):
+                    if self._unload_idle():
+                        continue
+                    if all(holder == owner for _, holder in self._reservations.values()):
+                        logger.warning(f"{name or 'Work'} needs {size} bytes and goes over the "
+                                       f"{self.cap} byte RSS cap, nothing else running could free memory")
+                        break
+                    cancellation.check()
+                    self._condition.wait(POLL_SECONDS)
+                self._reservations[token] = (size, owner)
+        waited = time.perf_counter() - started
+        MEMORY_WAIT.observe(waited)
+        if waited > 0.01:
+            logger.info(f"{name or 'Work'} waited {waited:.2f}s for {size} bytes of memory")
+        try:
+            yield waited
+        finally:
+            with self._condition:
+                del self._reservations[token]
+                # Models the stage doesn't need any more shouldn't keep the process over the cap
+                while self._over_cap() and self._unload_idle():
+                    pass
+                self._condition.notify_all()
+
+    def status(self):
+        """Return the cap, the current RSS, the reserved bytes and the loaded residents."""
+        with self._condition:
+            return {"cap": self.cap, "rss": current_rss(),
+                    "reserved": sum(size for size, _ in self._reservations.values()),
+                    "residents": {name: {"size": resident["size"], "in_use": self._in_use.get(name, 0) > 0}
+                                  for name, resident in self._residents.items()}}
+
+    def _fits(self, size):
+        rss = current_rss()
+        if rss is None:
+            return True
+        reserved = sum(held for held, _ in self._reservations.values())
+        return rss + reserved + size <= self.cap
+
+    def _over_cap(self):
+        rss = current_rss()
+        return self.cap is not None and rss is not None and rss > self.cap
+
+    def _unload_idle(self):
+        """Unload the least recently used resident nobody is using; False if there is none."""
+        idle = [name for name in self._residents if not self._in_use.get(name)]
+        if not idle:
+            return False
+        name = min(idle, key=lambda n: self._residents[n]["last_used"])
+        resident = self._residents.pop(name)
+        # Under the lock, so no use() of it can start while it is going away
+        resident["unload"]()
+        logger.info(f"Unloaded {name} ({resident['size']} bytes) to stay under the RSS cap")
+        RESIDENT_BYTES.set(0, resident=name)
+        RESIDENT_UNLOADS.inc(resident=name)
+        return True
+
+    def _wake(self):
+        """Let waiting stages check whether their job was cancelled."""
+        with self._condition:
+            self._condition.notify_all()
+
+
+# One governor per process, since the cap is on the RSS of the whole process
+GOVERNOR = MemoryGovernor()
+
+
+def configure(cap):
+    """Set the RSS cap of this process in bytes (None: no cap)."""
+    GOVERNOR.cap = cap
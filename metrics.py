@@ -0,0 +1,297 @@
+"""
+Metrics Module for Text-to-Video Pipeline
+
+This module keeps counters, gauges and histograms for generation runs
+(stage durations, provider requests, rendering throughput, encoder time and
+queue depth) and exposes them in the Prometheus text format, either over
+HTTP or as a textfile that a local scraper (e.g. the node_exporter textfile
+collector) can read. Only the standard library is used.
+"""
+
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+FPS_BUCKETS = (1, 2.5, 5, 10, 24, 30, 60, 120, 240, 480)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"❌ Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """A value that only goes up."""
+
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Counts observations into cumulative buckets and tracks their sum."""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_sample(self, key, series):
+        lines = []
+        for bound, count in zip(self.buckets, series["buckets"]):
+            labels = key + (("le", _format_value(float(bound))),)
+            lines.append(f"{self.name}_bucket{_format_labels(labels)} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all metrics of the process and renders them for scraping."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.textfile_path = None
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self.metrics[name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=None):
+        """Write the metrics to a textfile, atomically so a scraper never reads half a file.
+
+        Returns:
+            str: The path written, or None if no textfile is configured
+        """
+        path = path or self.textfile_path
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.error(f"Could not write metrics textfile {path}: {str(e)}")
+            return None
+        return path
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    "text_to_video_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage", "status"])
+JOBS = REGISTRY.counter(
+    "text_to_video_jobs_total", "Generation jobs by final status.", ["status"])
+PROVIDER_REQUESTS = REGISTRY.counter(
+    "text_to_video_provider_requests_total", "Provider requests by outcome.", ["provider", "outcome"])
+PROVIDER_LATENCY = REGISTRY.histogram(
+    "text_to_video_provider_request_duration_seconds", "Latency of provider requests.", ["provider"])
+PROVIDER_RETRIES = REGISTRY.counter(
+    "text_to_video_provider_retries_total", "Provider requests that were retried.", ["provider"])
+FRAMES_RENDERED = REGISTRY.counter(
+    "text_to_video_frames_rendered_total", "Video frames encoded.", ["output"])
+RENDER_FPS = REGISTRY.histogram(
+    "text_to_video_render_fps", "Frames encoded per second of encoder time.", ["output"], buckets=FPS_BUCKETS)
+ENCODER_DURATION = REGISTRY.histogram(
+    "text_to_video_encoder_duration_seconds", "Time spent in moviepy/ffmpeg writes.", ["output"])
+QUEUE_DEPTH = REGISTRY.gauge(
+    "text_to_video_queue_depth", "Items waiting in a work queue.", ["queue"])
+
+
+class ProviderRequest:
+    """Outcome of one provider request inside provider_request()."""
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        """Mark the request as failed without raising."""
+        self.failed = True
+
+
+@contextmanager
+def provider_request(provider):
+    """Time one provider request and count its outcome.
+
+    The request counts as an error if the block raises or calls fail().
+
+    Example:
+        with provider_request("pollinations") as request:
+            response = requests.get(...)
+            if response.status_code != 200:
+                request.fail()
+    """
+    request = ProviderRequest()
+    started = time.perf_counter()
+    try:
+        yield request
+    except BaseException:
+        request.failed = True
+        raise
+    finally:
+        PROVIDER_LATENCY.observe(time.perf_counter() - started, provider=provider)
+        PROVIDER_REQUESTS.inc(provider=provider, outcome="error" if request.failed else "success")
+
+
+def record_retry(provider):
+    """Count a retried provider request."""
+    PROVIDER_RETRIES.inc(provider=provider)
+
+
+def record_encode(output, seconds, frames=None):
+    """Record one encoder run (moviepy write or ffmpeg call) and its frame throughput."""
+    ENCODER_DURATION.observe(seconds, output=output)
+    if frames:
+        FRAMES_RENDERED.inc(frames, output=output)
+        if seconds > 0:
+            RENDER_FPS.observe(frames / seconds, output=output)
+
+
+def set_queue_depth(queue_name, depth):
+    """Report the current number of items waiting in a queue."""
+    QUEUE_DEPTH.set(depth, queue=queue_name)
+
+
+def configure_textfile(path):
+    """Write the metrics to this textfile whenever flush() is called."""
+    REGISTRY.textfile_path = path
+
+
+def flush():
+    """Write the metrics textfile, if one is configured."""
+    return REGISTRY.write_textfile()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s" % (self.address_string(), format % args))
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve GET /metrics on a background thread and return the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,684 @@
+"""
+Pipeline Module for Text-to-Video Pipeline
+
+This module builds the stage graph for a generation job and keeps the
+factory-loaded generators warm, so one GenerationPipeline can run many
+jobs without reloading models or rebuilding provider clients.
+"""
+
+import os
+import time
+import logging
+import threading
+import traceback
+from functools import partial
+
+from Models.Script.script_factory import load_script_model
+from Models.Voiceover.voiceover_factory import load_voiceover_model
+from Models.Image.image_factory import load_image_model
+from Models.Video.video_factory import load_video_model
+from Models.Captions.captions_factory import load_caption_model
+from Models.Script.utils import save_formatted_script
+from Models.Image.utils import format_for_image_prompt, fill_missing_images
+from Models.BGM.bgm_factory import load_bgm_model
+from Models.job_context import JobContext
+from Models.config import VIDEO_FPS, VIDEO_SCALE, LINES_PER_IMAGE, SHARED_QUEUE_DIR
+from config import (SCRIPT_MODEL, SCRIPT_MODEL_TYPE, IMG_MODEL, IMG_MODEL_TYPE, PROMPT_MODEL, PROMPT_MODEL_TYPE,
+                    AUDIO_MODEL, AUDIO_MODEL_VOICE, ANIMATION, VIDEO_MODEL, VIDEO_MODEL_CONFIG, CAPTION_MODEL,
+                    CAPTION_MODEL_TYPE, CAPTION_STYLE, BGM_ENABLED, BGM_PATH, BGM_MODEL, BGM_VOLUME,
+                    JOB_CACHE_ENABLED, JOB_CACHE_MAX_AGE, CHECKPOINT_ARTIFACTS, ARCHIVE_JOB_ARTIFACTS,
+                    MEMORY_DECODE_BYTES, MEMORY_SEGMENT_BYTES, MEMORY_CAPTION_WORD_BYTES)
+from checkpoints import StageCheckpoints
+from job_cache import JobCache
+from artifact_store import ArtifactStore
+import metrics
+import tracing
+from progress_tracker import ProgressTracker, Stage
+from profiler import StageProfiler
+from stage_history import StageHistory, EtaPredictor
+from stage_graph import StageGraph
+from scheduler import NETWORK, CPU, MEMORY
+from memory_governor import GOVERNOR
+from deadline import JobDeadline
+import deadline
+import cancellation
+import job_logging
+from cancellation import CancelToken, JobCancelled
+from segment_pipeline import SegmentPipeline
+from shared_queue import SharedQueue, RemoteStages
+
+logger = logging.getLogger(__name__)
+
+
+def audio_duration(audio_path):
+    """Return the duration of an audio file in seconds, or None if it can't be read."""
+    # Imported here so the ffmpeg reader is only loaded once a voiceover exists
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    try:
+        return round(ffmpeg_parse_infos(audio_path)["duration"], 2)
+    except (IOError, OSError, KeyError):
+        return None
+
+
+class GenerationPipeline:
+    """Runs generation jobs while keeping loaded generators warm between them.
+
+    A pipeline is meant to be used by one worker at a time; run several
+    pipelines to process jobs in parallel, sharing one ResourceScheduler so
+    their stages are admitted by resource class. Stages named in
+    remote_stages are handed to other nodes through the shared queue in
+    queue_dir (see shared_queue.py). With job_cache, a job whose topic and
+    effective config were generated before reuses that video (see job_cache.py).
+    Cached videos, the checkpointed stage outputs of a job that may be
+    resumed and, with archive_artifacts, every finished job's workspace are
+    kept in the artifact store under its disk budget (see artifact_store.py). Stages run once their expected
+    memory fits under the process's RSS cap (see memory_governor.py).
+    """
+
+    LOADERS = {
+        "script": load_script_model,
+        "voiceover": load_voiceover_model,
+        "image": load_image_model,
+        "video": load_video_model,
+        "captions": load_caption_model,
+        # Captions from estimated timestamps, when WhisperX won't fit the deadline
+        "estimated_captions": partial(load_caption_model, "simple_captions"),
+        "bgm": load_bgm_model,
+    }
+
+    def __init__(self, no_captions=False, no_bgm=False, stream=False, stream_queue_size=2, request_delay=1,
+                 profile=False, scheduler=None, remote_stages=(), queue_dir=SHARED_QUEUE_DIR,
+                 job_cache=JOB_CACHE_ENABLED, archive_artifacts=ARCHIVE_JOB_ARTIFACTS):
+        self.no_captions = no_captions
+        self.no_bgm = no_bgm
+        self.stream = stream
+        self.stream_queue_size = stream_queue_size
+        self.request_delay = request_delay
+        self.profile = profile
+        self.scheduler = scheduler
+        self.remote_stages = tuple(remote_stages)
+        self.shared_queue = SharedQueue(queue_dir) if self.remote_stages else None
+        self.artifacts = ArtifactStore()
+        self.archive_artifacts = archive_artifacts
+        self.job_cache = JobCache(self.artifacts) if job_cache else None
+        self.history = StageHistory()
+        self.predictor = EtaPredictor(self.history)
+        self.tracker = None
+        self._generators = {}
+        self._lock = threading.Lock()
+
+    def run(self, topic, job=None, output_name="output_video.mp4", cleanup=True, resume=False, cancel_token=None):
+        """Generate one video.
+
+        Args:
+            topic (str): Topic for the video, taken from the checkpoints when resuming without one
+            job (JobContext): Workspace for the job, created when omitted
+            output_name (str): File name for the published video
+            cleanup (bool): Remove the job workspace afterwards
+            resume (bool): Skip stages whose checkpoint in the workspace is still valid
+            cancel_token (CancelToken): Token that cancels the job when its cancel() is called
+
+        Returns:
+            dict: The job result, with an "error" key if generation failed,
+            "cancelled" set if it was cancelled and "cached" set if an earlier
+            job's video was reused
+        """
+        job = job or JobContext.create()
+        # Everything the job logs or prints, from any of its threads, also goes to its own log
+        with job_logging.bind(job):
+            return self._run(topic, job, output_name, cleanup, resume, cancel_token)
+
+    def _run(self, topic, job, output_name, cleanup, resume, cancel_token):
+        # Stage outputs are only copied to the store when a resume may need them back, since
+        # that writes every intermediate of a memory workspace to disk
+        resumable = resume or not cleanup or job.setting("CHECKPOINT_ARTIFACTS", CHECKPOINT_ARTIFACTS)
+        checkpoints = StageCheckpoints(job.checkpoints_dir, self.artifacts if resumable else None, owner=job.job_id)
+        if resume:
+            # Reuse the topic and per-job settings of the interrupted run unless new ones are given
+            initial = checkpoints.load_initial()
+            topic = topic or initial.get("topic")
+            job.overrides = {**initial.get("overrides", {}), **job.overrides}
+        if not topic:
+            raise ValueError(f"❌ No topic given and no checkpointed topic found for job {job.job_id}")
+        checkpoints.save_initial({"topic": topic, "overrides": job.overrides})
+
+        cancel_token = cancel_token or CancelToken()
+        cache_key = cache_config = None
+        if self.job_cache is not None and not resume:
+            # A resumed job continues its own run instead
+            cache_config = self.cache_config(job)
+            cache_key = self.job_cache.key(topic, cache_config)
+            try:
+                with cancellation.bind(cancel_token):
+                    self.job_cache.acquire(cache_key)
+            except JobCancelled as e:
+                metrics.JOBS.inc(status="cancelled")
+                if cleanup:
+                    job.cleanup()
+                return {"job_id": job.job_id, "topic": topic, "error": str(e), "cancelled": True}
+        try:
+            if cache_key:
+                entry = self.job_cache.lookup(cache_key, job.setting("JOB_CACHE_MAX_AGE", JOB_CACHE_MAX_AGE))
+                video_path = self.job_cache.restore(entry, job, output_name) if entry else None
+                if video_path:
+                    return self.reuse_cached(job, topic, entry, video_path, cleanup)
+            return self._generate(topic, job, output_name, cleanup, resume, cancel_token, checkpoints,
+                                  cache_key, cache_config)
+        finally:
+            if cache_key:
+                # On every path, or each later job with this topic and config would wait for it forever
+                self.job_cache.release(cache_key)
+
+    def _generate(self, topic, job, output_name, cleanup, resume, cancel_token, checkpoints, cache_key,
+                  cache_config):
+        # Profiling is opt-in; without it no sampler thread is started
+        profiler = StageProfiler(job.profiles_dir) if self.profile else None
+        tracker = ProgressTracker(topic, profiler, self.predictor, self.job_features(job))
+        self.tracker = tracker
+        tracker.log_substep(f"Job {job.job_id} workspace: {job.root}")
+        job_deadline = JobDeadline.for_job(job)
+        if job_deadline:
+            tracker.log_substep(f"⏰ Deadline: {job_deadline.seconds:.0f}s")
+
+        with tracing.trace(job.job_id, job.trace_path, topic=topic, resume=resume,
+                           deadline_seconds=job_deadline.seconds if job_deadline else None) as root, \
+                cancellation.bind(cancel_token):
+            try:
+                graph, final_output = self.build_stage_graph(job, tracker, checkpoints, resume, job_deadline)
+                results = graph.run({"topic": topic})
+                video_path = results.get(final_output)
+
+                if video_path:
+                    video_path = job.publish(video_path, output_name)
+                    # A degraded result is retried, not reused
+                    if cache_key and not checkpoints.incomplete:
+                        self.job_cache.store(cache_key, topic, cache_config, {
+                            "job_id": job.job_id, "video_path": video_path,
+                            "script": results.get("formatted_script"), "stage_times": dict(tracker.stage_times)})
+                self.archive(job, tracker)
+
+                # Clear the job workspace after Generation, unless a stage can still be retried with --resume
+                if checkpoints.incomplete:
+                    names = ", ".join(stage.name for stage in checkpoints.incomplete)
+                    tracker.log_substep(f"Keeping workspace {job.root}; retry {names} with --resume {job.job_id}")
+                elif cleanup:
+                    tracker.update_stage(Stage.CLEANUP)
+                    tracker.log_substep("Cleaning up temporary files...")
+                    job.cleanup()
+                else:
+                    tracker.log_substep(f"Skipping cleanup, workspace kept at {job.root}")
+
+                # Complete the process
+                tracker.complete(video_path)
+                if not resume:
+                    self.record_history(job, tracker, checkpoints)
+
+                return {
+                    "job_id": job.job_id,
+                    "topic": topic,
+                    "script": results.get("formatted_script"),
+                    "audio_path": results.get("audio_path"),
+                    "image_paths": results.get("image_paths", []),
+                    "video_path": video_path,
+                    "stage_times": dict(tracker.stage_times),
+                    "resources_path": self.write_resource_report(job, tracker),
+                    "trace_path": job.trace_path,
+                    **self.deadline_report(job_deadline)
+                }
+
+            except JobCancelled as e:
+                # Every stage has stopped by now; the workspace is only worth keeping for a retry
+                tracker.warning(f"{str(e)}, stopped generation")
+                root.set(cancelled=True)
+                metrics.JOBS.inc(status="cancelled")
+                metrics.flush()
+                if cleanup:
+                    job.cleanup()
+                return {"job_id": job.job_id, "topic": topic, "error": str(e), "cancelled": True,
+                        "stage_times": dict(tracker.stage_times),
+                        "resources_path": self.write_resource_report(job, tracker),
+                        "trace_path": job.trace_path,
+                        **self.deadline_report(job_deadline)}
+
+            except Exception as e:
+                logger.error(f"Error in job {job.job_id}: {str(e)}")
+                logger.error(traceback.format_exc())
+                tracker.error("Fatal error in generation process", e)
+                self.archive(job, tracker)
+                root.set(error=str(e))
+                metrics.JOBS.inc(status="failed")
+                metrics.flush()
+                return {"job_id": job.job_id, "topic": topic, "error": str(e),
+                        "stage_times": dict(tracker.stage_times),
+                        "resources_path": self.write_resource_report(job, tracker),
+                        "trace_path": job.trace_path,
+                        **self.deadline_report(job_deadline)}
+
+            finally:
+                # The job's artifacts may be evicted from now on, least recently used first
+                self.artifacts.release(job.job_id)
+                self.artifacts.evict()
+                if profiler is not None:
+                    profiler.stop()
+                    if profiler.paths:
+                        print(f"Stage profiles written to: {job.profiles_dir}")
+
+    def reuse_cached(self, job, topic, entry, video_path, cleanup=True):
+        """Return the result of a job that reuses the video of a cache entry, published at video_path."""
+        age = time.time() - entry["created_at"]
+        logger.info(f"Job {job.job_id} reuses the video of job {entry['job_id']} ({age:.0f}s old)")
+        print(f"♻️ Reusing the video generated for this topic and config by job {entry['job_id']}")
+        print(f"Output saved to: {video_path}")
+        # Keep the service from reporting the previous job's ETA for this one
+        self.tracker = None
+        metrics.JOBS.inc(status="cached")
+        metrics.flush()
+        if cleanup:
+            job.cleanup()
+        return {
+            "job_id": job.job_id,
+            "topic": topic,
+            "script": entry.get("script"),
+            "audio_path": None,
+            "image_paths": [],
+            "video_path": video_path,
+            "stage_times": {},
+            "cached": {"job_id": entry["job_id"], "created_at": entry["created_at"],
+                       "age_seconds": round(age, 1)},
+        }
+
+    def archive(self, job, tracker):
+        """Keep the job's workspace and published video in the artifact store for later inspection."""
+        if not self.archive_artifacts:
+            return
+        try:
+            record_path = self.artifacts.archive(job)
+        except OSError as e:
+            logger.error(f"Could not archive the artifacts of job {job.job_id}: {str(e)}")
+            return
+        tracker.log_substep(f"Artifacts archived, restore with: python artifact_store.py restore {job.job_id}")
+        logger.debug(f"Artifact record written to {record_path}")
+
+    def cache_config(self, job):
+        """Return the effective config of a job: the settings of every stage it runs."""
+        stages = [Stage.SCRIPT, Stage.VOICEOVER, Stage.IMAGE_PREP, Stage.IMAGE_GEN, Stage.VIDEO]
+        if not self.no_captions:
+            stages.append(Stage.CAPTIONS)
+        if BGM_ENABLED and not self.no_bgm:
+            stages += [Stage.BGM_MIX, Stage.BGM]
+        return {stage.name: self.stage_config(stage, job) for stage in stages}
+
+    def job_features(self, job):
+        """Return the settings of a job that affect how long its stages take."""
+        return {
+            "script_model": SCRIPT_MODEL,
+            "img_model": IMG_MODEL,
+            "caption_model": "none" if self.no_captions else job.setting("CAPTION_MODEL", CAPTION_MODEL),
+            "animation": job.setting("ANIMATION", ANIMATION),
+            "stream": self.stream,
+            "bgm": BGM_ENABLED and not self.no_bgm,
+        }
+
+    def estimate(self, job=None, **features):
+        """Pre-run cost estimate of a job from the stage history.
+
+        Args:
+            job (JobContext): Job whose settings apply (only its overrides are read)
+            **features: Known features such as segments, words or audio_seconds
+
+        Returns:
+            dict: Predicted seconds per stage and "total_seconds", or None without history
+        """
+        job = job or JobContext.default()
+        graph, _ = self.build_stage_graph(job, None)
+        dependencies = {stage.name: [dep.name for dep in deps] for stage, deps in graph.stage_dependencies().items()}
+        return self.predictor.estimate([node.stage.name for node in graph.nodes],
+                                       {**self.job_features(job), **features}, dependencies)
+
+    def record_history(self, job, tracker, checkpoints):
+        """Add the stage durations of a finished job to the stage history.
+
+        Stages that fell back to a degraded result are left out, their time isn't representative.
+        """
+        degraded = {stage.name for stage in checkpoints.incomplete}
+        stage_times = {name: seconds for name, seconds in tracker.stage_times.items() if name not in degraded}
+        try:
+            self.history.record(job.job_id, tracker.features, stage_times)
+        except OSError as e:
+            logger.error(f"Could not record stage history for job {job.job_id}: {str(e)}")
+
+    def deadline_report(self, job_deadline):
+        """Return whether a job met its deadline and the fallbacks it took to do so."""
+        if job_deadline is None:
+            return {}
+        overrun = -job_deadline.remaining()
+        if overrun > 0:
+            logger.warning(f"Job finished {overrun:.1f}s past its {job_deadline.seconds:.0f}s deadline")
+        return {"deadline_seconds": job_deadline.seconds, "deadline_met": overrun <= 0,
+                "fallbacks": list(job_deadline.fallbacks)}
+
+    def write_resource_report(self, job, tracker):
+        """Write the job's per-stage resource usage next to its published video."""
+        try:
+            return tracker.write_resource_report(os.path.join(job.output_dir, "resources.json"))
+        except OSError as e:
+            logger.error(f"Could not write resource report for job {job.job_id}: {str(e)}")
+            return None
+
+    def build_stage_graph(self, job, tracker, checkpoints=None, resume=False, job_deadline=None):
+        """Build the stage graph for one generation run.
+
+        Voiceover and image generation only need the script, and the BGM mix only
+        needs the voiceover, so those branches run concurrently. With a deadline,
+        image generation, captions and BGM fall back to degraded results once
+        their budget runs out.
+        """
+        remote = None
+        if self.remote_stages:
+            options = {"no_captions": self.no_captions, "no_bgm": self.no_bgm, "stream": self.stream,
+                       "stream_queue_size": self.stream_queue_size, "request_delay": self.request_delay}
+            remote = RemoteStages(self.shared_queue, job, self.remote_stages, options)
+        graph = StageGraph(tracker, checkpoints=checkpoints, resume=resume, scheduler=self.scheduler,
+                           deadline=job_deadline, remote=remote, governor=GOVERNOR)
+
+        def generate_script(topic):
+            script_generator = self._generator("script", job)
+            tracker.log_substep("Generating script...")
+            with tracing.span("script.generate_script", provider=SCRIPT_MODEL, model=SCRIPT_MODEL_TYPE) as span:
+                script = script_generator.generate_script(topic)
+                span.set(characters=len(script or ""))
+            print(f"\nGenerated Script:\n{script}\n")
+            tracker.set_features(words=len((script or "").split()))
+            return script
+
+        def generate_voiceover(script):
+            voiceover_generator = self._generator("voiceover", job)
+            tracker.log_substep("Synthesizing voiceover...")
+            audio_path = voiceover_generator.generate_voiceover(script) or job.voiceover_path
+            tracker.log_substep(f"Voiceover saved to: {audio_path}")
+            tracker.set_features(audio_seconds=audio_duration(audio_path))
+            return audio_path
+
+        def prepare_image_prompts(script):
+            tracker.log_substep("Formatting script for image generation...")
+            formatted_script = save_formatted_script(script, job.script_path,
+                                                     job.setting("LINES_PER_IMAGE", LINES_PER_IMAGE))
+
+            tracker.log_substep("Creating image prompts...")
+            image_prompts = format_for_image_prompt(formatted_script)
+            tracker.log_substep(f"Created {len(image_prompts)} image prompts")
+            tracker.set_features(segments=len(image_prompts))
+            return formatted_script, image_prompts
+
+        def generate_images(image_prompts):
+            image_generator = self._generator("image", job)
+            image_paths = []
+
+            started = time.monotonic()
+            for i, prompt in enumerate(image_prompts):
+                cancellation.check()
+                # Stop once the budget is spent, or too short for another image at the pace so far
+                left = deadline.remaining()
+                if left is not None and (left <= 0 or (i and left < (time.monotonic() - started) / i)):
+                    tracker.warning(f"Image budget spent, {len(image_prompts) - i} images left")
+                    break
+                tracker.log_substep("Generating image", i+1, len(image_prompts))
+                image_path = job.image_path(i+1)
+                try:
+                    with tracing.span("image.download_image", provider=IMG_MODEL, image=i+1):
+                        image_generator.download_image(prompt, i+1)
+                    image_paths.append(image_path)
+                except Exception as e:
+                    tracker.error(f"Error generating image {i+1}", e)
+                cancellation.sleep(self.request_delay)
+
+            if job_deadline:
+                # Late or failed images are replaced by their neighbours instead of holding up the job
+                filled = fill_missing_images(job, len(image_prompts))
+                for missing, neighbor in filled:
+                    deadline.record_fallback(Stage.IMAGE_GEN.name, f"image {missing} reuses image {neighbor}")
+                if filled:
+                    graph.mark_incomplete(Stage.IMAGE_GEN)
+                    image_paths = [job.image_path(i+1) for i in range(len(image_prompts))
+                                   if os.path.exists(job.image_path(i+1))]
+            if len(image_paths) < len(image_prompts):
+                graph.mark_incomplete(Stage.IMAGE_GEN)
+            return image_paths
+
+        def generate_video(topic, audio_path, image_paths):
+            tracker.log_substep("Assembling video...")
+            video_generator = self._generator("video", job)
+            video_path = video_generator.generate_video(topic)
+            if not video_path:
+                raise RuntimeError("Video generation failed")
+            return video_path
+
+        def stream_segments(formatted_script):
+            image_generator = self._generator("image", job)
+            video_generator = self._generator("video", job)
+            timestamps = video_generator.get_timestamps()
+            script_lines = [line.strip() for line in formatted_script.split("\n") if line.strip()]
+
+            tracker.log_substep(f"Streaming {len(script_lines)} segments (queue size {self.stream_queue_size})")
+            pipeline = SegmentPipeline(image_generator, video_generator, tracker, queue_size=self.stream_queue_size,
+                                       request_delay=self.request_delay)
+            segment_paths, video_duration = pipeline.run(script_lines, timestamps)
+            # A video missing segments or reusing images is retried, not checkpointed or cached
+            if pipeline.fallbacks or pipeline.skipped:
+                graph.mark_incomplete(Stage.IMAGE_GEN)
+            return segment_paths, video_duration
+
+        def assemble_video(audio_path, segment_paths, video_duration):
+            tracker.log_substep("Assembling rendered segments...")
+            video_generator = self._generator("video", job)
+            video_path = video_generator.assemble_segments(segment_paths, video_duration, audio_path)
+            if not video_path:
+                raise RuntimeError("Video generation failed")
+            return video_path
+
+        def add_captions(video_path, audio_path):
+            caption_style = job.setting("CAPTION_STYLE", CAPTION_STYLE)
+            model_name = job.setting("CAPTION_MODEL", CAPTION_MODEL)
+            # The warm "captions" generator runs CAPTION_MODEL; only simple_captions can be picked per job
+            generator_name = "estimated_captions" if model_name == "simple_captions" != CAPTION_MODEL else "captions"
+            if deadline.expired():
+                deadline.record_fallback(Stage.CAPTIONS.name, "skipped captions")
+                tracker.warning("Caption budget spent, video is available without captions")
+                graph.mark_incomplete(Stage.CAPTIONS)
+                return video_path
+            if not deadline.affordable() and model_name != "simple_captions":
+                generator_name, model_name = "estimated_captions", "simple_captions"
+                deadline.record_fallback(Stage.CAPTIONS.name, "captions from estimated timestamps")
+                graph.mark_incomplete(Stage.CAPTIONS)
+            tracker.log_substep(f"Adding captions using model: {model_name}, style: {caption_style}")
+            caption_generator = self._generator(generator_name, job)
+
+            try:
+                # The video's audio track is the voiceover, so it isn't decoded out of the video again
+                captioned_video_path = caption_generator.process_video(video_path, caption_style, audio_path=audio_path)
+                if captioned_video_path:
+                    return captioned_video_path
+                tracker.warning("Captioning failed, but original video is available")
+            except Exception as e:
+                tracker.error("Error during captioning", e)
+            graph.mark_incomplete(Stage.CAPTIONS)
+            return video_path
+
+        def mix_bgm(audio_path):
+            if not deadline.affordable():
+                deadline.record_fallback(Stage.BGM_MIX.name, "skipped background music")
+                graph.mark_incomplete(Stage.BGM_MIX)
+                return None
+            tracker.log_substep(f"Mixing background music using model: {BGM_MODEL}")
+            bgm_generator = self._generator("bgm", job)
+            try:
+                return bgm_generator.mix_audio(
+                    voiceover_path=audio_path,
+                    bgm_path=job.setting("BGM_PATH", BGM_PATH),
+                    bgm_volume=job.setting("BGM_VOLUME", BGM_VOLUME),
+                    voiceover_volume=1.0
+                )
+            except Exception as e:
+                tracker.error("Error during BGM mixing", e)
+                graph.mark_incomplete(Stage.BGM_MIX)
+                return None
+
+        def add_bgm(captioned_video_path, bgm_audio_path):
+            if not bgm_audio_path:
+                tracker.warning("BGM addition failed, but video is available without BGM")
+                graph.mark_incomplete(Stage.BGM)
+                return captioned_video_path
+            if deadline.expired():
+                deadline.record_fallback(Stage.BGM.name, "skipped attaching background music")
+                graph.mark_incomplete(Stage.BGM)
+                return captioned_video_path
+
+            tracker.log_substep("Adding background music to video...")
+            bgm_generator = self._generator("bgm", job)
+            try:
+                bgm_video_path = bgm_generator.attach_audio(captioned_video_path, bgm_audio_path)
+                if bgm_video_path:
+                    return bgm_video_path
+                tracker.warning("BGM addition failed, but video is available without BGM")
+            except Exception as e:
+                tracker.error("Error during BGM addition", e)
+            graph.mark_incomplete(Stage.BGM)
+            return captioned_video_path
+
+        def config(stage):
+            return self.stage_config(stage, job)
+
+        def resources(stage):
+            return self.stage_resources(stage, job)
+
+        def memory(stage):
+            # Sized when the stage is ready, by the segments and words of the script
+            return partial(self.stage_memory, stage, job, tracker.features if tracker else {})
+
+        graph.add_stage(Stage.SCRIPT, generate_script, inputs=["topic"], outputs=["script"],
+                        config=config(Stage.SCRIPT), resources=resources(Stage.SCRIPT))
+        graph.add_stage(Stage.VOICEOVER, generate_voiceover, inputs=["script"], outputs=["audio_path"],
+                        config=config(Stage.VOICEOVER), resources=resources(Stage.VOICEOVER))
+        graph.add_stage(Stage.IMAGE_PREP, prepare_image_prompts, inputs=["script"],
+                        outputs=["formatted_script", "image_prompts"], config=config(Stage.IMAGE_PREP))
+        if self.stream:
+            graph.add_stage(Stage.IMAGE_GEN, stream_segments, inputs=["formatted_script"],
+                            outputs=["segment_paths", "video_duration"], config=config(Stage.IMAGE_GEN),
+                            resources=resources(Stage.IMAGE_GEN), memory=memory(Stage.IMAGE_GEN))
+            graph.add_stage(Stage.VIDEO, assemble_video, inputs=["audio_path", "segment_paths", "video_duration"],
+                            outputs=["video_path"], config=config(Stage.VIDEO), resources=resources(Stage.VIDEO))
+        else:
+            graph.add_stage(Stage.IMAGE_GEN, generate_images, inputs=["image_prompts"], outputs=["image_paths"],
+                            config=config(Stage.IMAGE_GEN), resources=resources(Stage.IMAGE_GEN))
+            graph.add_stage(Stage.VIDEO, generate_video, inputs=["topic", "audio_path", "image_paths"],
+                            outputs=["video_path"], config=config(Stage.VIDEO), resources=resources(Stage.VIDEO),
+                            memory=memory(Stage.VIDEO))
+
+        final_output = "video_path"
+        if not self.no_captions:
+            graph.add_stage(Stage.CAPTIONS, add_captions, inputs=["video_path", "audio_path"],
+                            outputs=["captioned_video_path"], config=config(Stage.CAPTIONS),
+                            resources=resources(Stage.CAPTIONS), memory=memory(Stage.CAPTIONS))
+            final_output = "captioned_video_path"
+        elif tracker:
+            tracker.log_substep("Skipping caption generation (--no-captions flag)")
+
+        if BGM_ENABLED and not self.no_bgm:
+            graph.add_stage(Stage.BGM_MIX, mix_bgm, inputs=["audio_path"], outputs=["bgm_audio_path"],
+                            config=config(Stage.BGM_MIX))
+            graph.add_stage(Stage.BGM, add_bgm, inputs=[final_output, "bgm_audio_path"],
+                            outputs=["bgm_video_path"], config=config(Stage.BGM), memory=memory(Stage.BGM))
+            final_output = "bgm_video_path"
+        elif tracker:
+            tracker.log_substep("Skipping BGM addition (--no-bgm flag or BGM disabled in config)")
+
+        return graph, final_output
+
+    def stage_config(self, stage, job):
+        """Return the settings that affect a stage's result for the given job.
+
+        A change to any of them invalidates the stage's checkpoint.
+        """
+        configs = {
+            Stage.SCRIPT: {"SCRIPT_MODEL": SCRIPT_MODEL, "SCRIPT_MODEL_TYPE": SCRIPT_MODEL_TYPE},
+            Stage.VOICEOVER: {"AUDIO_MODEL": AUDIO_MODEL,
+                              "AUDIO_MODEL_VOICE": job.setting("AUDIO_MODEL_VOICE", AUDIO_MODEL_VOICE)},
+            Stage.IMAGE_PREP: {"LINES_PER_IMAGE": job.setting("LINES_PER_IMAGE", LINES_PER_IMAGE)},
+            Stage.IMAGE_GEN: {"IMG_MODEL": IMG_MODEL, "IMG_MODEL_TYPE": IMG_MODEL_TYPE,
+                              "PROMPT_MODEL": PROMPT_MODEL, "PROMPT_MODEL_TYPE": PROMPT_MODEL_TYPE,
+                              "stream": self.stream},
+            Stage.VIDEO: {"VIDEO_MODEL": VIDEO_MODEL, "VIDEO_MODEL_CONFIG": VIDEO_MODEL_CONFIG,
+                          "ANIMATION": job.setting("ANIMATION", ANIMATION), "stream": self.stream,
+                          "VIDEO_FPS": job.setting("VIDEO_FPS", VIDEO_FPS),
+                          "VIDEO_SCALE": job.setting("VIDEO_SCALE", VIDEO_SCALE),
+                          "VIDEO_PRESET": job.setting("VIDEO_PRESET")},
+            Stage.CAPTIONS: {"CAPTION_MODEL": job.setting("CAPTION_MODEL", CAPTION_MODEL),
+                             "CAPTION_MODEL_TYPE": CAPTION_MODEL_TYPE,
+                             "CAPTION_STYLE": job.setting("CAPTION_STYLE", CAPTION_STYLE)},
+            Stage.BGM_MIX: {"BGM_MODEL": BGM_MODEL, "BGM_PATH": job.setting("BGM_PATH", BGM_PATH),
+                            "BGM_VOLUME": job.setting("BGM_VOLUME", BGM_VOLUME)},
+            Stage.BGM: {"BGM_MODEL": BGM_MODEL},
+        }
+        return configs.get(stage, {})
+
+    def stage_resources(self, stage, job=None):
+        """Return the resource classes a stage needs a scheduler slot of.
+
+        Script, voiceover and image stages wait on remote providers (streaming
+        renders its segments while the images download, but downloads set the
+        pace). Rendering and captioning re-encode the video on every core, and
+        WhisperX also holds a large model in memory. Prompt formatting and the
+        BGM stages are light and always run.
+        """
+        caption_model = job.setting("CAPTION_MODEL", CAPTION_MODEL) if job else CAPTION_MODEL
+        resources = {
+            Stage.SCRIPT: (NETWORK,),
+            Stage.VOICEOVER: (NETWORK,),
+            Stage.IMAGE_GEN: (NETWORK,),
+            Stage.VIDEO: (CPU,),
+            Stage.CAPTIONS: (CPU, MEMORY) if caption_model == "whisperx" else (CPU,),
+        }
+        return resources.get(stage, ())
+
+    def stage_memory(self, stage, job, features):
+        """Return the bytes a stage is expected to add to the RSS while it runs.
+
+        Rendering holds the decoded frame of every image until the video is
+        written (streaming only the frames of its queue, and its final assembly
+        is an ffmpeg copy in another process), captioning holds a clip per word
+        and re-encoding holds decode buffers. Models are reserved when they are
+        loaded, not per stage.
+        """
+        segments = features.get("segments") or 0
+        words = features.get("words") or 0
+        memory = {
+            Stage.VIDEO: MEMORY_DECODE_BYTES + segments * MEMORY_SEGMENT_BYTES,
+            Stage.CAPTIONS: MEMORY_DECODE_BYTES + words * MEMORY_CAPTION_WORD_BYTES,
+            Stage.BGM: MEMORY_DECODE_BYTES,
+        }
+        if self.stream:
+            memory[Stage.IMAGE_GEN] = MEMORY_DECODE_BYTES + (self.stream_queue_size + 1) * MEMORY_SEGMENT_BYTES
+            memory[Stage.VIDEO] = 0
+        return memory.get(stage, 0)
+
+    def warm_up(self, job=None):
+        """Load every generator this pipeline will use before the first job arrives."""
+        job = job or JobContext.default()
+        names = ["script", "voiceover", "image", "video"]
+        if not self.no_captions:
+            names.append("captions")
+        if BGM_ENABLED and not self.no_bgm:
+            names.append("bgm")
+        for name in names:
+            self._generator(name, job)
+
+    def _generator(self, name, job):
+        """Return the warm generator for a stage, loading it on first use."""
+        with self._lock:
+            generator = self._generators.get(name)
+            if generator is None:
+                generator = self.LOADERS[name](job=job)
+                self._generators[name] = generator
+            else:
+                generator.set_job(job)
+            return generator
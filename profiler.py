@@ -0,0 +1,172 @@
+"""
+Stage Profiler Module for Text-to-Video Pipeline
+
+This module is an opt-in sampling profiler (`main.py --profile`). A
+background thread samples the Python stacks of every thread in the process
+at a fixed interval and files them under the stages that are running. When
+a stage finishes, its samples are written as a speedscope file
+(https://www.speedscope.app) with one profile per thread.
+
+A stage's own thread is only attributed to that stage. Helper threads (the
+streaming segment pipeline workers, for example) are attributed to every
+stage running at the time, so overlapping stages see each other's helpers;
+helper samples that are only waiting on a lock or queue are dropped.
+Time spent waiting for ffmpeg shows up as the Python frame that waits for
+the child process. Nothing here runs unless profiling is enabled.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.01
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# A helper thread whose innermost frame is in one of these files, or is an
+# executor worker loop blocked on its work queue, is idle
+IDLE_FILES = ("threading.py", "queue.py")
+IDLE_FUNCTIONS = {("thread.py", "_worker")}
+
+
+def _is_idle(frame):
+    filename = os.path.basename(frame.f_code.co_filename)
+    return filename in IDLE_FILES or (filename, frame.f_code.co_name) in IDLE_FUNCTIONS
+
+
+def _stack(frame):
+    """Returns the stack of a frame as (file, function, first line) tuples, outermost first."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class StageProfiler:
+    """Samples all threads and writes one speedscope file per finished stage."""
+
+    def __init__(self, output_dir, interval=DEFAULT_INTERVAL):
+        """Initialize the profiler.
+
+        Args:
+            output_dir (str): Directory that receives the <STAGE>.speedscope.json files
+            interval (float): Seconds between samples
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.paths = []
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start_stage(self, name):
+        """Start collecting samples for a stage run by the calling thread."""
+        with self._lock:
+            self._stages[name] = {"owner": threading.get_ident(), "started": time.time(), "threads": {}}
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name="stage-profiler", daemon=True)
+                self._thread.start()
+
+    def finish_stage(self, name):
+        """Stop collecting samples for a stage and write its profile.
+
+        Returns:
+            str: Path of the speedscope file, or None if the stage wasn't profiled
+            or ended before the first sample
+        """
+        with self._lock:
+            stage = self._stages.pop(name, None)
+        if stage is None or not stage["threads"]:
+            return None
+        try:
+            path = self._write(name, stage)
+        except OSError as e:
+            logger.error(f"Could not write profile for stage {name}: {str(e)}")
+            return None
+        self.paths.append(path)
+        logger.info(f"Profile for stage {name} written to {path}")
+        return path
+
+    def stop(self):
+        """Stop the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        last = time.perf_counter()
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            frames = sys._current_frames()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            with self._lock:
+                if not self._stages:
+                    continue
+                owners = {stage["owner"]: stage for stage in self._stages.values()}
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    if ident in owners:
+                        stages = [owners[ident]]
+                    elif _is_idle(frame):
+                        continue
+                    else:
+                        stages = list(self._stages.values())
+                    stack = _stack(frame)
+                    for stage in stages:
+                        thread = stage["threads"].setdefault(
+                            ident, {"name": names.get(ident, str(ident)), "samples": [], "weights": []})
+                        thread["samples"].append(stack)
+                        thread["weights"].append(weight)
+
+    def _write(self, name, stage):
+        frame_index = {}
+        frames = []
+        profiles = []
+        # The stage's own thread comes first, so speedscope opens it
+        threads = sorted(stage["threads"].items(), key=lambda item: item[0] != stage["owner"])
+        for ident, thread in threads:
+            samples = []
+            for stack in thread["samples"]:
+                indices = []
+                for filename, function, line in stack:
+                    key = (filename, function, line)
+                    if key not in frame_index:
+                        frame_index[key] = len(frames)
+                        frames.append({"name": function, "file": filename, "line": line})
+                    indices.append(frame_index[key])
+                samples.append(indices)
+            profiles.append({
+                "type": "sampled",
+                "name": thread["name"],
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(thread["weights"]), 6),
+                "samples": samples,
+                "weights": [round(weight, 6) for weight in thread["weights"]],
+            })
+
+        document = {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": f"{name} ({time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stage['started']))})",
+            "exporter": "text-to-video stage profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{name}.speedscope.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f)
+        return path
@@ -5,10 +5,17 @@ This module provides a consistent way to track and display progress
 throughout the generation pipeline.
 """
 
+import os
+import json
 import time
+import threading
 from tqdm import tqdm
 from enum import Enum
 import logging
+from resource_monitor import ResourceMonitor
+from stage_history import remaining_time
+import metrics
+import job_logging
 
 logger = logging.getLogger(__name__)
 
@@ -20,48 +27,162 @@ class Stage(Enum):
     IMAGE_GEN = 4
     VIDEO = 5
     CAPTIONS = 6
-    BGM = 7
-    CLEANUP = 8
-    COMPLETE = 9
+    BGM_MIX = 7
+    BGM = 8
+    CLEANUP = 9
+    COMPLETE = 10
 
 class ProgressTracker:
     """Tracks and displays progress throughout the generation pipeline."""
     
-    def __init__(self, topic):
-        """Initialize a new progress tracker."""
+    def __init__(self, topic, profiler=None, predictor=None, features=None):
+        """Initialize a new progress tracker.
+
+        Args:
+            topic (str): Topic of the job
+            profiler (StageProfiler): Optional profiler that samples each stage
+            predictor (EtaPredictor): Optional predictor for the remaining time
+            features (dict): What is known about the job up front (caption model, animation, ...)
+        """
         self.topic = topic
+        self.profiler = profiler
+        self.predictor = predictor
+        self.features = dict(features or {})
+        self.predictions = {}
+        self.dependencies = None
         self.start_time = time.time()
         self.stage_times = {}
         self.current_stage = Stage.INIT
+        self.active_stages = {}
+        self.finished_stages = []
+        self.planned_stages = None
         self.total_steps = len(Stage) - 1
-        self.progress_bar = tqdm(total=100, desc="Overall Progress", unit="%")
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self.stage_resources = {}
+        self._overlaps = {}
+        self._open_substeps = {}
+        self._substep_resources = {}
+        self._job_resources = None
+        self.resources = ResourceMonitor()
+        self.resources.start()
+        self.resources.begin("job")
+        self.progress_bar = tqdm(total=100, desc="Overall Progress", unit="%", disable=job_logging.quiet())
         self.progress_bar.update(0)
         logger.info(f"Starting video generation for topic: '{topic}'")
         
+    def plan(self, stages, dependencies=None):
+        """Declare the stages that will run, so progress can be reported for overlapping stages.
+
+        Args:
+            stages (list): Stages that will run
+            dependencies (dict): Stage -> stages it waits for, used for the ETA
+        """
+        with self._lock:
+            self.planned_stages = list(stages)
+            self.dependencies = dependencies
+        self._predict()
+    
+    def set_features(self, **features):
+        """Record what became known about the job (segment count, audio duration, ...) and refresh the ETA."""
+        with self._lock:
+            self.features.update(features)
+        self._predict()
+        remaining = self.eta()
+        if remaining is not None:
+            self.log_substep(f"⏳ ETA: {self._format_time(remaining)}")
+    
+    def eta(self):
+        """Return the predicted seconds until the job finishes, or None without stage history."""
+        with self._lock:
+            if not self.predictions or not self.planned_stages:
+                return None
+            now = time.time()
+            stages = [stage.name for stage in self.planned_stages]
+            dependencies = None
+            if self.dependencies is not None:
+                dependencies = {stage.name: [dep.name for dep in deps] for stage, deps in self.dependencies.items()}
+            elapsed = {stage.name: now - started for stage, started in self.active_stages.items()}
+            finished = [stage.name for stage in self.finished_stages]
+            return remaining_time(stages, self.predictions, dependencies, elapsed, finished)
+    
     def update_stage(self, stage):
-        """Update the current generation stage."""
+        """Update the current generation stage (sequential use)."""
         prev_stage = self.current_stage
-        self.current_stage = stage
-        
-        if prev_stage != Stage.INIT:
-            stage_duration = time.time() - self.stage_start_time
-            self.stage_times[prev_stage.name] = stage_duration
-            logger.info(f"Completed stage {prev_stage.name} in {stage_duration:.2f} seconds")
+        if prev_stage in self.active_stages:
+            self.finish_stage(prev_stage)
+        self.start_stage(stage)
+    
+    def start_stage(self, stage):
+        """Mark a stage as running. Several stages may be running at once."""
+        with self._lock:
+            self.current_stage = stage
+            self._local.stage = stage
+            if stage in (Stage.INIT, Stage.COMPLETE):
+                return
+            self.active_stages[stage] = time.time()
+            concurrent = [s.name for s in self.active_stages if s != stage]
+            self._overlaps[stage] = {s for s in self.active_stages if s != stage}
+            for other in self._overlaps[stage]:
+                self._overlaps.setdefault(other, set()).add(stage)
+            self.resources.begin(("stage", stage))
+            if self.profiler is not None:
+                self.profiler.start_stage(stage.name)
+            if self.planned_stages is None:
+                self._set_progress((stage.value / self.total_steps) * 100)
         
-        self.stage_start_time = time.time()
+        logger.info(f"Starting stage: {stage.name}")
+        if concurrent:
+            job_logging.console(f"\n{self._get_stage_emoji(stage)} Stage: {stage.name} (running alongside {', '.join(concurrent)})")
+        else:
+            job_logging.console(f"\n{self._get_stage_emoji(stage)} Stage: {stage.name}")
+    
+    def finish_stage(self, stage, failed=False):
+        """Mark a running stage as finished and record its duration."""
+        with self._lock:
+            stage_start_time = self.active_stages.pop(stage, None)
+            if stage_start_time is None:
+                return
+            stage_duration = time.time() - stage_start_time
+            self.stage_times[stage.name] = stage_duration
+            self._close_substep(stage)
+            self.stage_resources[stage.name] = {
+                **(self.resources.end(("stage", stage)) or {}),
+                "failed": failed,
+                "overlapped_with": sorted(s.name for s in self._overlaps.pop(stage, set())),
+                "substeps": self._substep_resources.pop(stage, []),
+            }
+            self.finished_stages.append(stage)
+        remaining = self.eta()
+        with self._lock:
+            if remaining is not None:
+                # Progress by predicted time rather than by stage count
+                spent = time.time() - self.start_time
+                self._set_progress(spent / (spent + remaining) * 100)
+                self.progress_bar.set_postfix_str(f"ETA {self._format_time(remaining)}")
+            elif self.planned_stages:
+                done = len([s for s in self.finished_stages if s in self.planned_stages])
+                self._set_progress((done / len(self.planned_stages)) * 100)
+        metrics.STAGE_DURATION.observe(stage_duration, stage=stage.name, status="failed" if failed else "ok")
+        metrics.flush()
+        if self.profiler is not None:
+            self.profiler.finish_stage(stage.name)
         
-        if stage != Stage.INIT:
-            progress_percent = (stage.value / self.total_steps) * 100
-            self.progress_bar.update(progress_percent - self.progress_bar.n)
-            logger.info(f"Starting stage: {stage.name}")
-            print(f"\n{self._get_stage_emoji(stage)} Stage: {stage.name}")
+        if failed:
+            logger.info(f"Stage {stage.name} failed after {stage_duration:.2f} seconds")
+        else:
+            logger.info(f"Completed stage {stage.name} in {stage_duration:.2f} seconds")
     
     def complete(self, output_path=None):
         """Mark the generation as complete."""
-        self.update_stage(Stage.COMPLETE)
+        for stage in list(self.active_stages):
+            self.finish_stage(stage)
+        self.start_stage(Stage.COMPLETE)
         total_time = time.time() - self.start_time
         self.progress_bar.update(100 - self.progress_bar.n)
         self.progress_bar.close()
+        metrics.JOBS.inc(status="done")
+        metrics.flush()
         
         print("\n✅ Generation Complete!")
         print(f"Total time: {self._format_time(total_time)}")
@@ -78,25 +199,91 @@ class ProgressTracker:
             logger.info(f"Output saved to: {output_path}")
     
     def log_substep(self, message, current=None, total=None):
-        """Log a substep within the current stage."""
-        if current is not None and total is not None:
-            logger.info(f"Progress: {current}/{total} - {message}")
-            print(f"  [{current}/{total}] {message}")
+        """Log a substep within the current stage.
+
+        The substep's resource usage is measured until the next substep of
+        the same stage or the end of the stage.
+        """
+        stage = getattr(self._local, "stage", None)
+        self._open_substep(stage, message, current)
+        if stage is not None and len(self.active_stages) > 1:
+            message = f"[{stage.name}] {message}"
+        
+        if current is not None:
+            # One line per image or segment
+            job_logging.chatter(f"  [{current}/{total}] {message}" if total else f"  [{current}] {message}")
         else:
             logger.info(message)
-            print(f"  {message}")
+            job_logging.console(f"  {message}")
     
     def error(self, message, exception=None):
         """Log an error in the current stage."""
         logger.error(message)
         if exception:
             logger.error(f"Exception: {str(exception)}")
-        print(f"\n❌ Error: {message}")
+        job_logging.console(f"\n❌ Error: {message}")
     
     def warning(self, message):
         """Log a warning in the current stage."""
         logger.warning(message)
-        print(f"\n⚠️ Warning: {message}")
+        job_logging.console(f"\n⚠️ Warning: {message}")
+    
+    def resource_report(self):
+        """Return the per-stage and whole-job resource usage.
+
+        Stops the background RSS sampler, so call it once the job has ended.
+        """
+        if self._job_resources is None:
+            self._job_resources = self.resources.end("job")
+            self.resources.stop()
+        return {
+            "topic": self.topic,
+            "job": self._job_resources,
+            "stages": dict(self.stage_resources),
+        }
+    
+    def write_resource_report(self, report_path):
+        """Write the resource report as JSON and return its path."""
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(self.resource_report(), f, indent=4)
+        logger.info(f"Resource report written to {report_path}")
+        return report_path
+    
+    def _predict(self):
+        """Predict the planned stages' durations from the features known so far."""
+        if self.predictor is None or not self.planned_stages:
+            return
+        try:
+            predictions = self.predictor.predict([stage.name for stage in self.planned_stages], dict(self.features))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not predict stage durations: {str(e)}")
+            return
+        with self._lock:
+            self.predictions = predictions
+    
+    def _open_substep(self, stage, message, current=None):
+        """Start measuring a substep, closing the previous substep of the same stage."""
+        with self._lock:
+            if stage not in self.active_stages:
+                return
+            self._close_substep(stage)
+            self._open_substeps[stage] = {"message": message, "current": current}
+            self.resources.begin(("substep", stage))
+    
+    def _close_substep(self, stage):
+        """Record the usage of the stage's open substep, if any."""
+        with self._lock:
+            substep = self._open_substeps.pop(stage, None)
+            if substep is None:
+                return
+            usage = self.resources.end(("substep", stage)) or {}
+            self._substep_resources.setdefault(stage, []).append({**substep, **usage})
+    
+    def _set_progress(self, progress_percent):
+        """Move the progress bar forward to the given percentage."""
+        if progress_percent > self.progress_bar.n:
+            self.progress_bar.update(progress_percent - self.progress_bar.n)
     
     def _format_time(self, seconds):
         """Format time in seconds to a human-readable string."""
@@ -122,6 +309,7 @@ class ProgressTracker:
             Stage.IMAGE_GEN: "🎨",
             Stage.VIDEO: "🎬",
             Stage.CAPTIONS: "💬",
+            Stage.BGM_MIX: "🎚️",
             Stage.BGM: "🎵",
             Stage.CLEANUP: "🧹",
             Stage.COMPLETE: "✅",
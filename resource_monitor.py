@@ -0,0 +1,175 @@
+"""
+Resource Monitor Module for Text-to-Video Pipeline
+
+This module measures what a span of work (a stage or a substep) costs the
+process: CPU user/sys time, CPU of finished child processes such as ffmpeg,
+peak RSS growth, disk bytes read and written and network bytes.
+
+Counters are process-wide, so spans that run at the same time share them;
+the progress tracker records which stages overlapped. Values a platform
+can't provide are reported as None: `resource` is POSIX-only, and
+/proc/self/io and /proc/self/net/dev are Linux-only. Network bytes come from
+the interface counters of the process's network namespace and include
+traffic of other processes in it.
+"""
+
+import os
+import time
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read_rss():
+    """Returns the current resident set size in bytes, or None."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def current_rss():
+    """Returns the resident set size of this process in bytes, or None where it can't be read."""
+    return _read_rss()
+
+
+def _read_io():
+    """Returns (read_bytes, write_bytes) that hit the storage layer, or (None, None)."""
+    try:
+        counters = {}
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                name, value = line.split(":")
+                counters[name] = int(value)
+        return counters.get("read_bytes"), counters.get("write_bytes")
+    except (OSError, ValueError):
+        return None, None
+
+
+def _read_network():
+    """Returns (received_bytes, sent_bytes) over all non-loopback interfaces, or (None, None)."""
+    try:
+        received = sent = 0
+        with open("/proc/self/net/dev", "r") as f:
+            for line in f.readlines()[2:]:
+                interface, data = line.split(":", 1)
+                if interface.strip() == "lo":
+                    continue
+                fields = data.split()
+                received += int(fields[0])
+                sent += int(fields[8])
+        return received, sent
+    except (OSError, ValueError, IndexError):
+        return None, None
+
+
+def sample():
+    """Returns the current resource counters of this process."""
+    snapshot = {
+        "wall": time.time(),
+        "cpu_user": None,
+        "cpu_sys": None,
+        "child_cpu_user": None,
+        "child_cpu_sys": None,
+        "rss": _read_rss(),
+    }
+    if resource is not None:
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        snapshot.update(cpu_user=own.ru_utime, cpu_sys=own.ru_stime,
+                        child_cpu_user=children.ru_utime, child_cpu_sys=children.ru_stime)
+    snapshot["read_bytes"], snapshot["write_bytes"] = _read_io()
+    snapshot["net_rx_bytes"], snapshot["net_tx_bytes"] = _read_network()
+    return snapshot
+
+
+def _difference(start, end, name, digits=None):
+    if start.get(name) is None or end.get(name) is None:
+        return None
+    value = end[name] - start[name]
+    return round(value, digits) if digits is not None else value
+
+
+def delta(start, end, peak_rss=None):
+    """Returns the resources used between two samples.
+
+    Args:
+        start (dict): Sample taken when the span began
+        end (dict): Sample taken when the span ended
+        peak_rss (int): Highest RSS seen during the span, if it was watched
+
+    Returns:
+        dict: Seconds, bytes and RSS growth for the span
+    """
+    peak_rss_delta = None
+    if start["rss"] is not None:
+        peak_rss_delta = max(value for value in (peak_rss, start["rss"], end["rss"]) if value is not None) - start["rss"]
+
+    return {
+        "wall_seconds": _difference(start, end, "wall", 3),
+        "cpu_user_seconds": _difference(start, end, "cpu_user", 3),
+        "cpu_sys_seconds": _difference(start, end, "cpu_sys", 3),
+        "child_cpu_user_seconds": _difference(start, end, "child_cpu_user", 3),
+        "child_cpu_sys_seconds": _difference(start, end, "child_cpu_sys", 3),
+        "rss_start_bytes": start["rss"],
+        "peak_rss_delta_bytes": peak_rss_delta,
+        "read_bytes": _difference(start, end, "read_bytes"),
+        "write_bytes": _difference(start, end, "write_bytes"),
+        "net_rx_bytes": _difference(start, end, "net_rx_bytes"),
+        "net_tx_bytes": _difference(start, end, "net_tx_bytes"),
+    }
+
+
+class ResourceMonitor:
+    """Tracks open spans and watches RSS in the background to find each span's peak."""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self._spans = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the background RSS sampler (no-op where RSS can't be read)."""
+        if self._thread is None and _read_rss() is not None:
+            self._thread = threading.Thread(target=self._watch, name="resource-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background RSS sampler."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def begin(self, key):
+        """Open a span."""
+        start = sample()
+        with self._lock:
+            self._spans[key] = {"start": start, "peak_rss": start["rss"]}
+
+    def end(self, key):
+        """Close a span and return its resource usage, or None if it wasn't open."""
+        end = sample()
+        with self._lock:
+            span = self._spans.pop(key, None)
+        if span is None:
+            return None
+        return delta(span["start"], end, span["peak_rss"])
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            rss = _read_rss()
+            if rss is None:
+                continue
+            with self._lock:
+                for span in self._spans.values():
+                    if span["peak_rss"] is None or rss > span["peak_rss"]:
+                        span["peak_rss"] = rss
@@ -0,0 +1,116 @@
+"""
+Resource Scheduler Module for Text-to-Video Pipeline
+
+This module admits the stages of concurrent jobs by the resource they
+consume. Script, prompt, image and TTS stages mostly wait on the network,
+rendering and the caption re-encode use every core, and WhisperX needs a
+lot of CPU and memory. Each stage is tagged with its resource classes and
+only runs once every class has a free slot, so one job's image downloads
+overlap with another job's render instead of two renders fighting over the
+cores while the network sits idle.
+
+Slots of a class are handed out first come, first served. A stage that
+needs several classes takes them in a fixed order, so two stages can never
+hold one class each while waiting for the other's. A stage of a cancelled
+job stops waiting at once.
+"""
+
+import time
+import threading
+import logging
+from contextlib import contextmanager
+
+from config import RESOURCE_LIMITS
+import metrics
+import cancellation
+
+logger = logging.getLogger(__name__)
+
+NETWORK = "network"
+CPU = "cpu"
+MEMORY = "memory"
+
+SCHEDULER_WAIT = metrics.REGISTRY.histogram(
+    "text_to_video_scheduler_wait_seconds", "Time stages waited for a resource slot.", ["resource"])
+SCHEDULER_RUNNING = metrics.REGISTRY.gauge(
+    "text_to_video_scheduler_running", "Stages holding a resource slot.", ["resource"])
+
+
+class ResourceScheduler:
+    """Limits how many stages of each resource class run at once across jobs."""
+
+    def __init__(self, limits=None):
+        """Initialize the scheduler.
+
+        Args:
+            limits (dict): Resource class -> number of stages admitted at once;
+                classes that aren't listed are unlimited
+        """
+        self.limits = dict(RESOURCE_LIMITS if limits is None else limits)
+        self.running = {name: 0 for name in self.limits}
+        self._waiting = {name: [] for name in self.limits}
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def admit(self, resources, name=None):
+        """Hold a slot of every given resource class for the with-block.
+
+        Args:
+            resources (iterable): Resource classes the work needs
+            name (str): What is waiting, for the log
+
+        Yields:
+            float: Seconds spent waiting for the slots
+        """
+        classes = sorted(set(resources) & set(self.limits))
+        started = time.perf_counter()
+        held = []
+        try:
+            with cancellation.on_cancel(self._wake):
+                for resource in classes:
+                    self._acquire(resource, name)
+                    held.append(resource)
+            waited = time.perf_counter() - started
+            if classes and waited > 0.01:
+                logger.info(f"{name or 'Work'} waited {waited:.2f}s for {', '.join(classes)}")
+            yield waited
+        finally:
+            for resource in reversed(held):
+                self._release(resource)
+
+    def status(self):
+        """Return the running and waiting count of every resource class."""
+        with self._condition:
+            return {name: {"limit": limit, "running": self.running[name], "waiting": len(self._waiting[name])}
+                    for name, limit in self.limits.items()}
+
+    def _acquire(self, resource, name):
+        ticket = object()
+        started = time.perf_counter()
+        with self._condition:
+            queue = self._waiting[resource]
+            queue.append(ticket)
+            metrics.set_queue_depth(f"resource_{resource}", len(queue))
+            try:
+                # Only the head of the line may take a free slot, so slots go out in arrival order
+                while queue[0] is not ticket or self.running[resource] >= self.limits[resource]:
+                    cancellation.check()
+                    self._condition.wait()
+            finally:
+                queue.remove(ticket)
+                metrics.set_queue_depth(f"resource_{resource}", len(queue))
+                self._condition.notify_all()
+            self.running[resource] += 1
+            SCHEDULER_RUNNING.set(self.running[resource], resource=resource)
+        SCHEDULER_WAIT.observe(time.perf_counter() - started, resource=resource)
+
+    def _wake(self):
+        """Let waiting stages check whether their job was cancelled."""
+        with self._condition:
+            self._condition.notify_all()
+
+    def _release(self, resource):
+        with self._condition:
+            self.running[resource] -= 1
+            SCHEDULER_RUNNING.set(self.running[resource], resource=resource)
+            self._condition.notify_all()
@@ -0,0 +1,186 @@
+"""
+Segment Pipeline Module for Text-to-Video Pipeline
+
+This module streams each formatted script line through
+prompt -> image -> normalized frame -> rendered segment as a unit.
+The steps are connected by bounded queues, so early segments render while
+later images are still downloading, and only a few decoded frames are held
+in memory at once.
+"""
+
+import os
+import queue
+import threading
+import logging
+import contextvars
+
+from Models.Image.utils import format_for_image_prompt
+from config import IMG_MODEL
+import metrics
+import tracing
+import deadline
+import cancellation
+import job_logging
+from cancellation import JobCancelled
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class SegmentPipeline:
+    """Streams script lines into rendered video segments."""
+
+    def __init__(self, image_generator, video_generator, tracker=None, queue_size=2, request_delay=1):
+        """Initialize the pipeline.
+
+        Args:
+            image_generator: A factory-loaded ImageGenerator
+            video_generator: A factory-loaded VideoGenerator
+            tracker (ProgressTracker): Optional tracker for substep logging
+            queue_size (int): Maximum items waiting between two steps
+            request_delay (float): Pause between image requests, to be kind to the API
+        """
+        self.image_generator = image_generator
+        self.video_generator = video_generator
+        self.tracker = tracker
+        self.queue_size = queue_size
+        self.request_delay = request_delay
+        self.errors = []
+        self.fallbacks = 0
+        # Segments left out of the video because their image failed and had no neighbour to reuse
+        self.skipped = 0
+        self.segment_count = 0
+
+    def run(self, script_lines, timestamps):
+        """Render one segment per script line.
+
+        Args:
+            script_lines (list): Formatted script lines, one per segment
+            timestamps (list): Segment timings with "start" and "end" keys
+
+        Returns:
+            tuple: (segment_paths, total_duration) for the rendered segments in order
+        """
+        segments = list(zip(range(1, len(script_lines) + 1), script_lines, timestamps))
+        self.segment_count = len(segments)
+        images = queue.Queue(maxsize=self.queue_size)
+        frames = queue.Queue(maxsize=self.queue_size)
+        rendered = []
+
+        # Each step runs in a copy of the caller's context, so its spans belong to the current stage
+        workers = [
+            threading.Thread(target=contextvars.copy_context().run,
+                             args=(self._guard, self._fetch_images, segments, images),
+                             name="segment-images", daemon=True),
+            threading.Thread(target=contextvars.copy_context().run,
+                             args=(self._guard, self._normalize_frames, images, frames),
+                             name="segment-frames", daemon=True),
+            threading.Thread(target=contextvars.copy_context().run,
+                             args=(self._guard, self._render_segments, frames, rendered),
+                             name="segment-render", daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+        rendered.sort()
+        segment_paths = [path for _, path, _ in rendered]
+        total_duration = sum(duration for _, _, duration in rendered)
+        return segment_paths, total_duration
+
+    def _guard(self, step, source, sink):
+        """Run a step, recording any error and always passing the end marker on."""
+        try:
+            step(source, sink)
+        except (Exception, JobCancelled) as e:
+            if not isinstance(e, JobCancelled):
+                logger.error(f"Segment pipeline step {step.__name__} failed: {str(e)}")
+            self.errors.append(e)
+            if isinstance(source, queue.Queue):
+                self._drain(source)
+        finally:
+            if isinstance(sink, queue.Queue):
+                sink.put(_DONE)
+
+    def _fetch_images(self, segments, images):
+        previous = None
+        for i, line, segment in segments:
+            if self.errors:
+                return
+            cancellation.check()
+            prompts = format_for_image_prompt(line)
+            if not prompts:
+                continue
+
+            # Once the deadline budget is spent, the remaining segments reuse the last image
+            if not deadline.expired():
+                self._log("Generating image", i, len(segments))
+                try:
+                    with tracing.span("image.download_image", provider=IMG_MODEL, image=i):
+                        self.image_generator.download_image(prompts[0], i)
+                except Exception as e:
+                    self._error(f"Error generating image {i}", e)
+                cancellation.sleep(self.request_delay)
+
+            image_path = self.image_generator.job.image_path(i)
+            if os.path.exists(image_path):
+                previous = (i, image_path)
+            elif previous and deadline.remaining() is not None:
+                deadline.record_fallback("IMAGE_GEN", f"image {i} reuses image {previous[0]}")
+                self.fallbacks += 1
+                image_path = previous[1]
+            if os.path.exists(image_path):
+                images.put((i, image_path, segment["end"] - segment["start"]))
+                metrics.set_queue_depth("segment_images", images.qsize())
+            else:
+                self.skipped += 1
+                print(f"⚠️ Warning: Image {image_path} not found, skipping...")
+
+    def _normalize_frames(self, images, frames):
+        size = None
+        while True:
+            item = images.get()
+            metrics.set_queue_depth("segment_images", images.qsize())
+            if item is _DONE:
+                return
+            cancellation.check()
+            i, image_path, duration = item
+            frame = self.video_generator.normalize_frame(image_path, size)
+            if size is None:
+                size = (frame.shape[1], frame.shape[0])
+            frames.put((i, frame, duration))
+            metrics.set_queue_depth("segment_frames", frames.qsize())
+
+    def _render_segments(self, frames, rendered):
+        while True:
+            item = frames.get()
+            metrics.set_queue_depth("segment_frames", frames.qsize())
+            if item is _DONE:
+                return
+            cancellation.check()
+            i, frame, duration = item
+            self._log("Rendering segment", i, self.segment_count)
+            segment_path = self.video_generator.render_segment(frame, duration, i)
+            rendered.append((i, segment_path, duration))
+
+    def _drain(self, source):
+        """Consume an upstream queue until its end marker so producers never block."""
+        while source.get() is not _DONE:
+            pass
+
+    def _log(self, message, current=None, total=None):
+        if self.tracker:
+            self.tracker.log_substep(message, current, total)
+        else:
+            job_logging.chatter(f"  [{current}/{total}] {message}" if current is not None else f"  {message}")
+
+    def _error(self, message, exception=None):
+        if self.tracker:
+            self.tracker.error(message, exception)
+        else:
+            print(f"❌ Error: {message}")
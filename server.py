@@ -0,0 +1,398 @@
+"""
+Generation Service for Text-to-Video Pipeline
+
+A long-running process that keeps warm GenerationPipelines (caption model,
+fonts and provider clients stay loaded) and accepts jobs over a localhost
+HTTP API, so clients such as app.py don't pay the cold start of a fresh
+`python main.py` for every video.
+
+Endpoints:
+    POST /jobs          {"topic": ..., "voice": ..., "output": ..., "deadline": ..., "fresh": ...} -> {"job_id": ...}
+    GET  /jobs          List all jobs
+    GET  /jobs/<job_id> Job status, estimated time left and artifact paths
+    DELETE /jobs/<job_id> Cancel a queued or running job
+    GET  /health        Service status and predicted backlog
+    GET  /metrics       Prometheus metrics
+"""
+
+import sys
+import os
+import json
+import queue
+import threading
+import time
+import logging
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.dont_write_bytecode = True
+
+from Models.config import JOBS_DIR
+from Models.job_context import JobContext, new_job_id
+from Models import workspace_storage
+import memory_governor
+import job_logging
+from pipeline import GenerationPipeline
+from fork_server import ForkServer
+from scheduler import ResourceScheduler
+from degradation import DegradationPolicy
+from cancellation import CancelToken
+from batch import write_job_manifest
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class GenerationService:
+    """Queues submitted jobs and runs them on a pool of warm pipelines."""
+
+    def __init__(self, workers=1, pipeline_options=None, cleanup=True, fork=False, degrade=True,
+                 pipeline_class=GenerationPipeline):
+        self.workers = workers
+        self.pipeline_options = pipeline_options or {}
+        # Another GenerationPipeline subclass, such as the stubbed one of the load test
+        self.pipeline_class = pipeline_class
+        self.cleanup = cleanup
+        self.fork = fork
+        self.fork_server = None
+        # Shared by the workers' pipelines, so their stages are admitted by resource class
+        self.scheduler = ResourceScheduler()
+        # Cheapens jobs taken off a backed-up queue; with degrade=False every job runs at full quality
+        self.degradation = DegradationPolicy() if degrade else None
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = {}
+        self._cancel_tokens = {}
+        # Only used for pre-run estimates; it never loads a generator
+        self.planner = pipeline_class(**self.pipeline_options)
+
+    def start(self, warm_up=True):
+        """Start the worker threads, loading each worker's generators up front.
+
+        In fork mode the generators are loaded once, in the fork server, and
+        every worker runs its jobs in processes forked from it.
+        """
+        if self.fork:
+            print("🔥 Warming up fork server...")
+            self.fork_server = ForkServer(self.pipeline_options, self.pipeline_class).start()
+        for number in range(self.workers):
+            if self.fork_server is not None:
+                pipeline = self.fork_server
+            else:
+                pipeline = self.pipeline_class(scheduler=self.scheduler, **self.pipeline_options)
+            if warm_up and self.fork_server is None:
+                print(f"🔥 Warming up worker {number + 1}/{self.workers}...")
+                pipeline.warm_up()
+            thread = threading.Thread(target=self._work, args=(pipeline,),
+                                      name=f"service-worker-{number + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, topic, voice=None, output=None, overrides=None, deadline=None, fresh=False):
+        """Queue a job and return its record.
+
+        Args:
+            topic (str): Topic for the video
+            voice (str): Optional voice overriding AUDIO_MODEL_VOICE
+            output (str): Optional file name for the published video
+            overrides (dict): Further per-job config overrides
+            deadline (float): Optional time budget in seconds, overriding JOB_DEADLINE
+            fresh (bool): Generate a new video even if this topic and config were generated before
+
+        Returns:
+            dict: The job record
+        """
+        if not isinstance(topic, str) or not topic.strip():
+            raise ValueError("❌ A topic is required")
+        for name, value in (("voice", voice), ("output", output)):
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"❌ {name} must be a string")
+        if overrides is not None and not isinstance(overrides, dict):
+            raise ValueError("❌ overrides must be an object of config names and values")
+
+        overrides = dict(overrides or {})
+        if voice:
+            overrides["AUDIO_MODEL_VOICE"] = voice
+        if deadline:
+            try:
+                overrides["JOB_DEADLINE"] = float(deadline)
+            except (TypeError, ValueError):
+                raise ValueError("❌ deadline must be a number of seconds")
+        if fresh:
+            overrides["JOB_CACHE_MAX_AGE"] = 0
+
+        job_id = new_job_id()
+        estimate = self.planner.estimate(JobContext(os.path.join(JOBS_DIR, job_id), job_id, overrides))
+        record = {
+            "job_id": job_id,
+            "topic": topic,
+            "output": output or "output_video.mp4",
+            "overrides": overrides,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "video_path": None,
+            "manifest_path": None,
+            "error": None,
+            "estimated_seconds": estimate["total_seconds"] if estimate else None,
+            "eta_seconds": None,
+            "degradation": None,
+            "cached": None,
+        }
+        with self._lock:
+            self.jobs[job_id] = record
+        self.queue.put(job_id)
+        metrics.set_queue_depth("service", self.queue.qsize())
+        logger.info(f"Queued job {job_id} for topic '{topic}'")
+        return dict(record)
+
+    def cancel(self, job_id):
+        """Cancel a job: a queued job won't run, a running one stops within about a second.
+
+        Returns:
+            dict: The job record, or None if the job is unknown
+        """
+        with self._lock:
+            record = self.jobs.get(job_id)
+            if record is None:
+                return None
+            if record["status"] == "queued":
+                record.update(status="cancelled", finished_at=time.time())
+            token = self._cancel_tokens.get(job_id)
+        if token is not None:
+            token.cancel(f"Job {job_id} cancelled")
+        logger.info(f"Cancelled job {job_id}")
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """Return a copy of a job record, or None if the job is unknown."""
+        with self._lock:
+            record = self.jobs.get(job_id)
+            return self._with_eta(record) if record else None
+
+    def list(self):
+        """Return copies of all job records, newest first."""
+        with self._lock:
+            records = [self._with_eta(record) for record in self.jobs.values()]
+        return sorted(records, key=lambda r: r["submitted_at"], reverse=True)
+
+    def status(self):
+        """Return a summary of the service state.
+
+        backlog_seconds is the predicted work left in queued and running jobs,
+        summed over all of them (divide by workers for the wall time).
+        """
+        with self._lock:
+            counts = {}
+            backlog = 0.0
+            for record in self.jobs.values():
+                counts[record["status"]] = counts.get(record["status"], 0) + 1
+                if record["status"] == "queued":
+                    backlog += record["estimated_seconds"] or 0.0
+                elif record["status"] == "running":
+                    backlog += self._with_eta(record)["eta_seconds"] or 0.0
+        return {"workers": self.workers, "queue_depth": self.queue.qsize(), "jobs": counts,
+                "backlog_seconds": round(backlog, 1), "resources": self.scheduler.status(),
+                "memory": memory_governor.GOVERNOR.status()}
+
+    def _with_eta(self, record):
+        """Copy a record, adding the live ETA of a running job."""
+        record = dict(record)
+        pipeline = self._running.get(record["job_id"])
+        if pipeline is not None and pipeline.tracker is not None:
+            eta = pipeline.tracker.eta()
+            record["eta_seconds"] = round(eta, 1) if eta is not None else None
+        return record
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self.jobs[job_id].update(fields)
+
+    def _work(self, pipeline):
+        while True:
+            job_id = self.queue.get()
+            metrics.set_queue_depth("service", self.queue.qsize())
+            cancel_token = CancelToken()
+            with self._lock:
+                record = dict(self.jobs[job_id])
+                if record["status"] == "cancelled":
+                    self.queue.task_done()
+                    continue
+                self.jobs[job_id].update(status="running", started_at=time.time())
+                self._running[job_id] = pipeline
+                self._cancel_tokens[job_id] = cancel_token
+
+            try:
+                # Inside the try, so a job whose workspace can't be created fails instead of the worker
+                job = JobContext.create(job_id=job_id, overrides=record["overrides"])
+                degradation = None
+                if self.degradation is not None:
+                    degradation = self.degradation.apply(job, self.queue.qsize(),
+                                                         time.time() - record["submitted_at"], self.workers)
+                    self._update(job_id, degradation=degradation)
+                result = pipeline.run(record["topic"], job, output_name=record["output"], cleanup=self.cleanup,
+                                      cancel_token=cancel_token)
+                result["degradation"] = degradation
+                manifest_path = write_job_manifest(job, result)
+                if result.get("cancelled"):
+                    self._update(job_id, status="cancelled", manifest_path=manifest_path)
+                elif result.get("error"):
+                    self._update(job_id, status="failed", error=result["error"], manifest_path=manifest_path)
+                else:
+                    self._update(job_id, status="done", video_path=result.get("video_path"),
+                                 manifest_path=manifest_path, cached=result.get("cached"))
+            except Exception as e:
+                logger.error(f"Job {job_id} crashed: {str(e)}")
+                self._update(job_id, status="failed", error=str(e))
+            finally:
+                with self._lock:
+                    self._running.pop(job_id, None)
+                    self._cancel_tokens.pop(job_id, None)
+                self._update(job_id, finished_at=time.time(), eta_seconds=None)
+                self.queue.task_done()
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Maps the HTTP API onto a GenerationService."""
+
+    service = None
+
+    def do_GET(self):
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if parts == ["health"]:
+            return self._send(200, self.service.status())
+        if parts == ["metrics"]:
+            return self._send_text(200, metrics.REGISTRY.render(), metrics.CONTENT_TYPE)
+        if parts == ["jobs"]:
+            return self._send(200, {"jobs": self.service.list()})
+        if len(parts) == 2 and parts[0] == "jobs":
+            record = self.service.get(parts[1])
+            if record is None:
+                return self._send(404, {"error": f"Unknown job {parts[1]}"})
+            return self._send(200, record)
+        return self._send(404, {"error": "Not found"})
+
+    def do_DELETE(self):
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._send(404, {"error": "Not found"})
+        record = self.service.cancel(parts[1])
+        if record is None:
+            return self._send(404, {"error": f"Unknown job {parts[1]}"})
+        return self._send(200, record)
+
+    def do_POST(self):
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if parts != ["jobs"]:
+            return self._send(404, {"error": "Not found"})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("❌ The body must be a JSON object")
+            record = self.service.submit(
+                payload.get("topic"),
+                voice=payload.get("voice"),
+                output=payload.get("output"),
+                overrides=payload.get("overrides"),
+                deadline=payload.get("deadline"),
+                fresh=bool(payload.get("fresh"))
+            )
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._send(400, {"error": str(e)})
+        return self._send(202, record)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s" % (self.address_string(), format % args))
+
+    def _send(self, status, payload):
+        self._send_text(status, json.dumps(payload), "application/json")
+
+    def _send_text(self, status, text, content_type):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Create (but don't start) the HTTP server for a service."""
+    handler = type("BoundServiceRequestHandler", (ServiceRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Text-to-Video generation service",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST, help="Address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=1, help="Number of warm pipeline workers")
+    parser.add_argument("--no-captions", action="store_true", help="Skip caption generation")
+    parser.add_argument("--no-bgm", action="store_true", help="Skip background music addition")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming per-segment renderer")
+    parser.add_argument("--no-warm-up", action="store_true", help="Load generators on first use instead of at startup")
+    parser.add_argument("--fork", action="store_true",
+                        help="Load generators once in a fork server and run every job in a forked process")
+    parser.add_argument("--no-degrade", action="store_true",
+                        help="Run every job at full quality, even when the queue backs up")
+    parser.add_argument("--workspace", choices=workspace_storage.BACKENDS,
+                        help="Keep job workspaces on disk or in memory (tmpfs), overriding WORKSPACE_STORAGE")
+    parser.add_argument("--memory-cap", type=int, metavar="MB",
+                        help="RSS cap of each worker process in MB, overriding MEMORY_RSS_CAP")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Generate every job, even a topic and config generated before")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Leave out per-image, per-chunk and per-word progress and the progress bars")
+    parser.add_argument("--skip-cleanup", action="store_true", help="Keep job workspaces after each job")
+    parser.add_argument("--metrics-file", type=str, help="Also write Prometheus metrics to this textfile")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    job_logging.setup(quiet=args.quiet or None)
+
+    if args.metrics_file:
+        metrics.configure_textfile(args.metrics_file)
+    if args.workspace:
+        workspace_storage.configure(args.workspace)
+    if args.memory_cap:
+        memory_governor.configure(args.memory_cap * 1024 ** 2)
+
+    service = GenerationService(
+        workers=args.workers,
+        pipeline_options={"no_captions": args.no_captions, "no_bgm": args.no_bgm, "stream": args.stream,
+                          "job_cache": not args.no_cache},
+        cleanup=not args.skip_cleanup,
+        fork=args.fork,
+        degrade=not args.no_degrade
+    )
+    service.start(warm_up=not args.no_warm_up)
+
+    server = create_server(service, args.host, args.port)
+    print(f"🚀 Generation service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down generation service")
+    finally:
+        server.server_close()
+        if service.fork_server is not None:
+            service.fork_server.stop()
+
+
+if __name__ == "__main__":
+    main()
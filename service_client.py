@@ -0,0 +1,76 @@
+"""
+Client for the Text-to-Video generation service (server.py).
+
+Only uses the standard library, so front ends such as app.py can submit jobs
+without importing the pipeline or any of its models.
+"""
+
+import json
+import time
+import urllib.error
+import urllib.request
+
+SERVICE_URL = "http://127.0.0.1:8765"
+
+
+def _request(method, path, payload=None, base_url=SERVICE_URL, timeout=10):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(
+        f"{base_url}{path}",
+        data=data,
+        method=method,
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def is_available(base_url=SERVICE_URL):
+    """Returns True if a generation service answers at base_url."""
+    try:
+        _request("GET", "/health", base_url=base_url, timeout=1)
+        return True
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+
+
+def submit_job(topic, voice=None, output=None, fresh=False, base_url=SERVICE_URL, overrides=None):
+    """Submits a job and returns its record (including "job_id").
+
+    With fresh, a new video is generated even if the service has one for this topic and config.
+    overrides, if given, are further per-job config overrides (e.g. {"SCRIPT_SENTENCES": 5}).
+    """
+    payload = {"topic": topic, "voice": voice, "output": output, "fresh": fresh}
+    if overrides:
+        payload["overrides"] = overrides
+    return _request("POST", "/jobs", payload, base_url=base_url)
+
+
+def get_job(job_id, base_url=SERVICE_URL):
+    """Returns the current record of a job."""
+    return _request("GET", f"/jobs/{job_id}", base_url=base_url)
+
+
+def cancel_job(job_id, base_url=SERVICE_URL):
+    """Cancels a queued or running job and returns its record."""
+    return _request("DELETE", f"/jobs/{job_id}", base_url=base_url)
+
+
+def wait_for_job(job_id, poll_interval=2, timeout=None, base_url=SERVICE_URL, on_update=None):
+    """Polls a job until it is done, failed or cancelled and returns its final record.
+
+    on_update, if given, is called with every polled record (e.g. to show its eta_seconds).
+
+    Raises:
+        TimeoutError: If the job hasn't finished after timeout seconds
+    """
+    started = time.time()
+    while True:
+        record = get_job(job_id, base_url=base_url)
+        if on_update is not None:
+            on_update(record)
+        if record["status"] in ("done", "failed", "cancelled"):
+            return record
+        if timeout is not None and time.time() - started > timeout:
+            raise TimeoutError(f"Job {job_id} did not finish within {timeout}s")
+        time.sleep(poll_interval)
@@ -0,0 +1,547 @@
+"""
+Shared Queue Module for Text-to-Video Pipeline
+
+This module spreads jobs and single stages over several nodes without a
+message broker. The queue is a directory on a filesystem every node mounts
+(NFS, SMB, ...; a local directory stands in for it when testing):
+
+    pending/<task>.json          submitted, not claimed yet
+    leased/<task>@<lease>.json   claimed by a node, kept alive by its heartbeat
+    done/<task>.json             finished, with the result
+    failed/<task>.json           failed, with the error
+    artifacts/<task>/            files exchanged with the task
+
+A node claims a task by renaming it from pending/ to leased/. A rename
+within one filesystem is atomic, so exactly one node wins. The owner touches
+its lease file every HEARTBEAT_SECONDS; a lease older than LEASE_SECONDS
+(the node died or lost the share) is renamed back to pending/ by whichever
+node sweeps first, and the old owner, whose lease file is then gone, cancels
+its work. Finishing is a rename too, so a node that lost its lease can't
+publish a result.
+
+A task is either a whole job, or a single stage of a job that runs on
+another node (RemoteStages). For a stage, the submitting node uploads its
+job workspace, the claiming node runs the stage function from the same
+stage graph on a copy of it and publishes the workspace back, and the
+submitting node continues with the stage's outputs. A stage nobody claims
+within REMOTE_CLAIM_TIMEOUT runs locally after all.
+
+Usage:
+    python shared_queue.py work --serve job VIDEO CAPTIONS
+    python shared_queue.py submit --topic "..." --wait
+    python shared_queue.py status
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import uuid
+import socket
+import shutil
+import logging
+import argparse
+import threading
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.dont_write_bytecode = True
+
+from Models.config import SHARED_QUEUE_DIR, JOBS_DIR
+from Models.job_context import JobContext, new_job_id
+from config import LEASE_SECONDS, HEARTBEAT_SECONDS, REMOTE_CLAIM_TIMEOUT
+from progress_tracker import ProgressTracker
+from cancellation import CancelToken
+import cancellation
+import job_logging
+import metrics
+
+logger = logging.getLogger(__name__)
+
+JOB = "job"
+STAGE = "stage"
+
+POLL_INTERVAL = 1.0
+
+# Left out of uploaded workspaces; checkpoints and scratch files only matter to the node that wrote them
+WORKSPACE_IGNORE = shutil.ignore_patterns("Checkpoints", "Tmp")
+
+
+def default_node_id():
+    """Host name and process id, unique among the nodes sharing a queue."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _write_json(path, payload):
+    """Write a JSON file atomically, so other nodes never read it half-written."""
+    temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=4)
+    os.replace(temp_path, path)
+
+
+def _read_json(path):
+    """Read a JSON file, or None if it has been moved away (or is being replaced)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _snapshot(directory):
+    """Size and modification time of every file under a directory, keyed by relative path."""
+    files = {}
+    for folder, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(folder, name)
+            stat = os.stat(path)
+            files[os.path.relpath(path, directory)] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def _rebase(value, old_root, new_root):
+    """Move paths under old_root (also inside lists) to the same place under new_root."""
+    if isinstance(value, (list, tuple)):
+        return [_rebase(item, old_root, new_root) for item in value]
+    if isinstance(value, str):
+        path, root = os.path.normpath(value), os.path.normpath(old_root)
+        if path == root or path.startswith(root + os.sep):
+            return os.path.join(new_root, os.path.relpath(path, root))
+    return value
+
+
+class Lease:
+    """A node's claim on one task."""
+
+    def __init__(self, queue, task, path):
+        self.queue = queue
+        self.task = task
+        self.path = path
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def task_id(self):
+        return self.task["task_id"]
+
+    def keep_alive(self, cancel_token):
+        """Heartbeat in the background until the lease ends.
+
+        The token is cancelled when the lease is lost or the task is cancelled
+        through the queue.
+        """
+        def beat():
+            last_beat = time.monotonic()
+            while not self._stop.wait(POLL_INTERVAL):
+                if os.path.exists(self.queue.cancel_marker(self.task_id)):
+                    cancel_token.cancel(f"Task {self.task_id} cancelled")
+                    return
+                if time.monotonic() - last_beat < HEARTBEAT_SECONDS:
+                    continue
+                try:
+                    os.utime(self.path)
+                except FileNotFoundError:
+                    cancel_token.cancel(f"Lease on task {self.task_id} expired")
+                    return
+                last_beat = time.monotonic()
+
+        self._thread = threading.Thread(target=beat, name=f"lease-{self.task_id}", daemon=True)
+        self._thread.start()
+
+    def complete(self, result):
+        """Publish the task's result; False if the lease was lost and the result dropped."""
+        return self._finish(self.queue.done_dir, {**self.task, "result": result})
+
+    def fail(self, error):
+        """Publish the task's failure; False if the lease was lost."""
+        return self._finish(self.queue.failed_dir, {**self.task, "error": error})
+
+    def _finish(self, directory, payload):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        path = os.path.join(directory, f"{self.task_id}.json")
+        try:
+            # Whoever renames the lease file owns the task; a node that lost its lease loses this race
+            os.rename(self.path, path)
+        except FileNotFoundError:
+            logger.warning(f"Lease on task {self.task_id} was lost, dropping its result")
+            return False
+        _write_json(path, {**payload, "finished_at": time.time(), "finished_by": self.queue.node_id})
+        return True
+
+
+class SharedQueue:
+    """Work queue and artifact exchange in a directory shared by several nodes."""
+
+    def __init__(self, root=SHARED_QUEUE_DIR, node_id=None, lease_seconds=LEASE_SECONDS):
+        self.root = root
+        self.node_id = node_id or default_node_id()
+        self.lease_seconds = lease_seconds
+        self.pending_dir = os.path.join(root, "pending")
+        self.leased_dir = os.path.join(root, "leased")
+        self.done_dir = os.path.join(root, "done")
+        self.failed_dir = os.path.join(root, "failed")
+        self.artifacts_dir = os.path.join(root, "artifacts")
+        for directory in (self.pending_dir, self.leased_dir, self.done_dir, self.failed_dir, self.artifacts_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def artifacts(self, task_id):
+        """Directory of the files exchanged with a task."""
+        return os.path.join(self.artifacts_dir, task_id)
+
+    def cancel_marker(self, task_id):
+        return os.path.join(self.artifacts(task_id), "cancel")
+
+    def submit(self, kind, payload, task_id=None):
+        """Queue a task.
+
+        Args:
+            kind (str): JOB or STAGE
+            payload (dict): What the claiming node needs to run the task
+            task_id (str): Unique id, a new job id when omitted
+
+        Returns:
+            str: The task id
+        """
+        task_id = task_id or new_job_id()
+        task = {**payload, "task_id": task_id, "kind": kind, "submitted_at": time.time(),
+                "submitted_by": self.node_id}
+        _write_json(os.path.join(self.pending_dir, f"{task_id}.json"), task)
+        logger.info(f"Queued {kind} task {task_id}")
+        return task_id
+
+    def submit_job(self, topic, overrides=None, output="output_video.mp4"):
+        """Queue a whole generation job for any node serving jobs."""
+        return self.submit(JOB, {"topic": topic, "overrides": dict(overrides or {}), "output": output})
+
+    def claim(self, serves=(JOB,)):
+        """Claim the oldest pending task this node serves.
+
+        Args:
+            serves (iterable): JOB and/or the names of the stages this node runs
+
+        Returns:
+            Lease: The claimed task, or None if there is nothing to do
+        """
+        serves = set(serves)
+        for name in sorted(os.listdir(self.pending_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.pending_dir, name)
+            task = _read_json(path)
+            if task is None or (task.get("stage") or task["kind"]) not in serves:
+                continue
+            lease_path = os.path.join(self.leased_dir, f"{task['task_id']}@{uuid.uuid4().hex[:12]}.json")
+            try:
+                # Start the lease clock now, not at submit time
+                os.utime(path)
+                os.rename(path, lease_path)
+            except FileNotFoundError:
+                continue  # Another node was faster
+            logger.info(f"Node {self.node_id} claimed {task['kind']} task {task['task_id']}")
+            return Lease(self, task, lease_path)
+        return None
+
+    def withdraw(self, task_id):
+        """Take back a task nobody has claimed yet; False if a node already claimed it."""
+        try:
+            os.remove(os.path.join(self.pending_dir, f"{task_id}.json"))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def cancel(self, task_id):
+        """Cancel a task: withdraw it if pending, else ask the node running it to stop."""
+        if self.withdraw(task_id):
+            return True
+        os.makedirs(self.artifacts(task_id), exist_ok=True)
+        open(self.cancel_marker(task_id), "w").close()
+        return False
+
+    def requeue_expired(self):
+        """Put tasks whose owner stopped heartbeating back in pending/.
+
+        Returns:
+            list: Ids of the requeued tasks
+        """
+        requeued = []
+        now = time.time()
+        for name in os.listdir(self.leased_dir):
+            path = os.path.join(self.leased_dir, name)
+            try:
+                if now - os.path.getmtime(path) < self.lease_seconds:
+                    continue
+                task_id = name.split("@")[0]
+                os.rename(path, os.path.join(self.pending_dir, f"{task_id}.json"))
+            except FileNotFoundError:
+                continue  # Finished, or requeued by another node
+            logger.warning(f"Lease on task {task_id} expired, requeued it")
+            requeued.append(task_id)
+        return requeued
+
+    def result(self, task_id):
+        """Return a finished task with its "result" or "error", or None while it isn't finished."""
+        for directory, key in ((self.done_dir, "result"), (self.failed_dir, "error")):
+            task = _read_json(os.path.join(directory, f"{task_id}.json"))
+            # A just-renamed task holds its result only once the owner has rewritten it
+            if task is not None and key in task:
+                return task
+        return None
+
+    def discard(self, task_id):
+        """Remove a finished task's record and artifacts once its submitter has taken the result."""
+        for directory in (self.done_dir, self.failed_dir):
+            try:
+                os.remove(os.path.join(directory, f"{task_id}.json"))
+            except FileNotFoundError:
+                pass
+        shutil.rmtree(self.artifacts(task_id), ignore_errors=True)
+
+    def wait(self, task_id, timeout=None, poll_interval=POLL_INTERVAL):
+        """Wait for a task to finish and return it (see result()).
+
+        Raises:
+            TimeoutError: If the task hasn't finished after timeout seconds
+        """
+        started = time.monotonic()
+        while True:
+            task = self.result(task_id)
+            if task is not None:
+                return task
+            if timeout is not None and time.monotonic() - started > timeout:
+                raise TimeoutError(f"Task {task_id} did not finish within {timeout}s")
+            cancellation.sleep(poll_interval)
+
+    def status(self):
+        """Count the tasks in every state."""
+        return {state: len([name for name in os.listdir(directory) if name.endswith(".json")])
+                for state, directory in (("pending", self.pending_dir), ("leased", self.leased_dir),
+                                         ("done", self.done_dir), ("failed", self.failed_dir))}
+
+
+class RemoteStages:
+    """Runs chosen stages of a job on other nodes through a SharedQueue.
+
+    Passed to StageGraph as `remote`; the graph calls run() in place of the
+    stage function for every stage handles() accepts.
+    """
+
+    def __init__(self, queue, job, stages, pipeline_options=None, claim_timeout=REMOTE_CLAIM_TIMEOUT):
+        self.queue = queue
+        self.job = job
+        self.stages = set(stages)
+        self.pipeline_options = dict(pipeline_options or {})
+        self.claim_timeout = claim_timeout
+
+    def handles(self, stage):
+        return stage.name in self.stages
+
+    def run(self, node, results):
+        """Run a stage on another node and return its outputs.
+
+        The job workspace is uploaded before and the files the stage added or
+        changed are downloaded after, so files it writes besides its outputs
+        (timestamps, for example) come back too, without overwriting files that
+        stages running here changed meanwhile.
+        """
+        task_id = f"{self.job.job_id}-{node.stage.name}-{uuid.uuid4().hex[:8]}"
+        workspace = os.path.join(self.queue.artifacts(task_id), "workspace")
+        shutil.copytree(self.job.root, workspace, ignore=WORKSPACE_IGNORE, dirs_exist_ok=True)
+        uploaded = _snapshot(workspace)
+        self.queue.submit(STAGE, {
+            "stage": node.stage.name,
+            "job_id": self.job.job_id,
+            "job_root": self.job.root,
+            "overrides": self.job.overrides,
+            "pipeline_options": self.pipeline_options,
+            "inputs": {name: results[name] for name in node.inputs},
+        }, task_id=task_id)
+
+        task = self._wait(task_id)
+        if task is None:
+            logger.info(f"No node claimed stage {node.stage.name} within {self.claim_timeout}s, running it here")
+            self.queue.discard(task_id)
+            return node.run(results)
+        if "error" in task:
+            self.queue.discard(task_id)
+            raise RuntimeError(f"Stage {node.stage.name} failed on node {task['finished_by']}: {task['error']}")
+
+        for path, signature in _snapshot(workspace).items():
+            if uploaded.get(path) != signature:
+                target = os.path.join(self.job.root, path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(os.path.join(workspace, path), target)
+        self.queue.discard(task_id)
+        logger.info(f"Stage {node.stage.name} ran on node {task['finished_by']}")
+        return {name: _rebase(value, workspace, self.job.root) for name, value in task["result"].items()}
+
+    def _wait(self, task_id):
+        """Wait for the task; None if it was withdrawn because no node claimed it in time."""
+        started = time.monotonic()
+        try:
+            while True:
+                task = self.queue.result(task_id)
+                if task is not None:
+                    return task
+                if time.monotonic() - started > self.claim_timeout and self.queue.withdraw(task_id):
+                    return None
+                cancellation.sleep(POLL_INTERVAL)
+        except cancellation.JobCancelled:
+            self.queue.cancel(task_id)
+            raise
+
+
+class QueueWorker:
+    """A node's loop: claim tasks from a SharedQueue and run them on a warm pipeline."""
+
+    def __init__(self, queue, pipeline, serves=(JOB,), cleanup=True):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.serves = tuple(serves)
+        self.cleanup = cleanup
+
+    def run_forever(self, poll_interval=POLL_INTERVAL):
+        print(f"🛰️ Node {self.queue.node_id} serving {', '.join(self.serves)} from {self.queue.root}")
+        while True:
+            if not self.run_once():
+                time.sleep(poll_interval)
+
+    def run_once(self):
+        """Claim and run one task; False if there was nothing to claim."""
+        self.queue.requeue_expired()
+        lease = self.queue.claim(self.serves)
+        if lease is None:
+            return False
+
+        cancel_token = CancelToken()
+        lease.keep_alive(cancel_token)
+        try:
+            if lease.task["kind"] == JOB:
+                result = self.run_job(lease.task, cancel_token)
+            else:
+                result = self.run_stage(lease.task, cancel_token)
+        except cancellation.JobCancelled as e:
+            logger.info(f"Task {lease.task_id} stopped: {str(e)}")
+            lease.fail(str(e))
+            return True
+        except Exception as e:
+            logger.error(f"Task {lease.task_id} failed: {str(e)}")
+            lease.fail(str(e))
+            return True
+
+        if isinstance(result, dict) and result.get("error"):
+            lease.fail(result["error"])
+        else:
+            lease.complete(result)
+        return True
+
+    def run_job(self, task, cancel_token):
+        """Run a whole job and publish its output directory to the task's artifacts."""
+        # Imported here, batch imports the pipeline, which imports this module
+        from batch import write_job_manifest
+
+        job = JobContext.create(job_id=task["task_id"], overrides=task["overrides"])
+        result = self.pipeline.run(task["topic"], job, output_name=task["output"], cleanup=self.cleanup,
+                                   cancel_token=cancel_token)
+        result["node"] = self.queue.node_id
+        write_job_manifest(job, result)
+
+        output = os.path.join(self.queue.artifacts(task["task_id"]), "output")
+        if os.path.isdir(job.output_dir):
+            shutil.copytree(job.output_dir, output, dirs_exist_ok=True)
+        return {key: _rebase(value, job.output_dir, output) for key, value in result.items()}
+
+    def run_stage(self, task, cancel_token):
+        """Run one stage of another node's job on a copy of its workspace."""
+        workspace = os.path.join(self.queue.artifacts(task["task_id"]), "workspace")
+        root = os.path.join(JOBS_DIR, task["task_id"])
+        shutil.copytree(workspace, root, dirs_exist_ok=True)
+        job = JobContext(root, task["job_id"], task["overrides"])
+        job.ensure_folders()
+
+        # A shallow copy shares the warm generators but builds the graph the submitting node built
+        pipeline = copy.copy(self.pipeline)
+        for name, value in task["pipeline_options"].items():
+            setattr(pipeline, name, value)
+        pipeline.remote_stages = ()
+        tracker = ProgressTracker(f"{task['stage']} of job {task['job_id']}")
+        graph, _ = pipeline.build_stage_graph(job, tracker)
+        node = next((node for node in graph.nodes if node.stage.name == task["stage"]), None)
+        if node is None:
+            raise ValueError(f"❌ Stage {task['stage']} is not part of this job's graph")
+
+        inputs = {name: _rebase(value, task["job_root"], root) for name, value in task["inputs"].items()}
+        try:
+            with cancellation.bind(cancel_token):
+                outputs = node.run(inputs)
+            shutil.copytree(root, workspace, ignore=WORKSPACE_IGNORE, dirs_exist_ok=True)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        return {name: _rebase(value, root, workspace) for name, value in outputs.items()}
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Shared-directory job queue for several generation nodes",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--dir", type=str, default=SHARED_QUEUE_DIR, help="Queue directory shared by the nodes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    work = commands.add_parser("work", help="Claim and run tasks")
+    work.add_argument("--serve", nargs="+", default=[JOB],
+                      help="What this node runs: 'job' and/or stage names such as VIDEO and CAPTIONS")
+    work.add_argument("--node-id", type=str, help="Name of this node (host and pid by default)")
+    work.add_argument("--no-captions", action="store_true", help="Skip caption generation in jobs")
+    work.add_argument("--no-bgm", action="store_true", help="Skip background music in jobs")
+    work.add_argument("--stream", action="store_true", help="Use the streaming per-segment renderer in jobs")
+    work.add_argument("--remote-stages", nargs="+", default=[],
+                      help="Stages of this node's jobs to hand to other nodes")
+    work.add_argument("--skip-cleanup", action="store_true", help="Keep job workspaces after each job")
+    work.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics at http://127.0.0.1:<port>/metrics")
+
+    submit = commands.add_parser("submit", help="Queue a job")
+    submit.add_argument("--topic", type=str, required=True, help="Topic for the video")
+    submit.add_argument("--voice", type=str, help="Voice overriding AUDIO_MODEL_VOICE")
+    submit.add_argument("--output", type=str, default="output_video.mp4", help="File name for the video")
+    submit.add_argument("--wait", action="store_true", help="Wait for the job and print its result")
+
+    commands.add_parser("status", help="Count the tasks in every state")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    job_logging.setup(log_file=None)
+
+    if args.command == "status":
+        print(json.dumps(SharedQueue(args.dir).status(), indent=2))
+        return
+
+    if args.command == "submit":
+        queue = SharedQueue(args.dir)
+        overrides = {"AUDIO_MODEL_VOICE": args.voice} if args.voice else {}
+        task_id = queue.submit_job(args.topic, overrides, args.output)
+        print(f"📨 Queued job {task_id}")
+        if args.wait:
+            print(json.dumps(queue.wait(task_id), indent=2))
+        return
+
+    from pipeline import GenerationPipeline
+
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    queue = SharedQueue(args.dir, node_id=args.node_id)
+    pipeline = GenerationPipeline(no_captions=args.no_captions, no_bgm=args.no_bgm, stream=args.stream,
+                                  remote_stages=args.remote_stages, queue_dir=args.dir)
+    try:
+        QueueWorker(queue, pipeline, args.serve, cleanup=not args.skip_cleanup).run_forever()
+    except KeyboardInterrupt:
+        print(f"\n👋 Node {queue.node_id} stopped; its leases expire after {queue.lease_seconds}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Stage Graph Module for Text-to-Video Pipeline
+
+This module runs the generation stages as a dependency graph. Each stage
+declares the results it needs and the results it produces, and stages whose
+inputs are ready run at the same time on a thread pool. With a
+ResourceScheduler shared between jobs, a ready stage also waits for a slot
+of its resource classes (see scheduler.py), with a MemoryGovernor it then
+waits until its expected memory fits under the RSS cap (see
+memory_governor.py), and with a JobDeadline each
+stage runs under its share of the job's time budget (see deadline.py). Once
+the job is cancelled no further stage starts (see cancellation.py). Stages
+the `remote` runner handles run on another node (see shared_queue.py).
+"""
+
+import logging
+import contextvars
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import tracing
+import cancellation
+from cancellation import JobCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class StageNode:
+    """A single stage in the graph with its declared inputs and outputs."""
+
+    def __init__(self, stage, func, inputs=(), outputs=(), config=None, resources=(), memory=0):
+        self.stage = stage
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.config = dict(config or {})
+        self.resources = tuple(resources)
+        self.memory = memory
+
+    def expected_memory(self):
+        """Bytes the stage is expected to add to the RSS while it runs."""
+        return self.memory() if callable(self.memory) else self.memory
+
+    def run(self, results):
+        """Call the stage function with its inputs in declared order and map its return value to output names."""
+        value = self.func(*[results[name] for name in self.inputs])
+
+        if len(self.outputs) == 0:
+            return {}
+        if len(self.outputs) == 1:
+            return {self.outputs[0]: value}
+        return dict(zip(self.outputs, value))
+
+
+class StageGraph:
+    """Runs pipeline stages concurrently as soon as their inputs are available."""
+
+    def __init__(self, tracker=None, max_workers=None, checkpoints=None, resume=False, scheduler=None,
+                 deadline=None, remote=None, governor=None):
+        self.tracker = tracker
+        self.max_workers = max_workers
+        self.checkpoints = checkpoints
+        self.resume = resume
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.remote = remote
+        self.governor = governor
+        self.nodes = []
+
+    def add_stage(self, stage, func, inputs=(), outputs=(), config=None, resources=(), memory=0):
+        """Register a stage.
+
+        Args:
+            stage (Stage): The stage reported to the progress tracker
+            func (callable): Called with the declared inputs as positional arguments
+            inputs (iterable): Names of results this stage needs
+            outputs (iterable): Names of results this stage produces
+            config (dict): Settings that affect the stage's result, part of its checkpoint key
+            resources (iterable): Resource classes the stage needs a scheduler slot of
+            memory (int or callable): Bytes the stage is expected to add to the RSS, or a function
+                returning them, called once the stage's inputs are ready
+
+        Returns:
+            StageNode: The registered node
+        """
+        for output in outputs:
+            if self._producer(output) is not None:
+                raise ValueError(f"❌ Output '{output}' is produced by more than one stage")
+
+        node = StageNode(stage, func, inputs, outputs, config, resources, memory)
+        self.nodes.append(node)
+        return node
+
+    def dependencies(self, node):
+        """Return the nodes that produce the inputs of the given node."""
+        deps = []
+        for name in node.inputs:
+            producer = self._producer(name)
+            if producer is not None and producer not in deps:
+                deps.append(producer)
+        return deps
+
+    def stage_dependencies(self):
+        """Return each stage with the stages it waits for."""
+        return {node.stage: [dep.stage for dep in self.dependencies(node)] for node in self.nodes}
+
+    def mark_incomplete(self, stage):
+        """Keep a stage that fell back to a degraded result from being checkpointed."""
+        if self.checkpoints:
+            self.checkpoints.mark_incomplete(stage)
+
+    def run(self, initial=None):
+        """Run every stage and return the collected results.
+
+        Raises the first stage exception once the stages already running have
+        finished. Stages that depend on a failed stage are never started.
+        With checkpoints, every finished stage is recorded; when resuming, a
+        stage with a valid checkpoint is skipped and its recorded outputs are used.
+        """
+        results = dict(initial or {})
+        self._validate(results)
+
+        pending = list(self.nodes)
+        running = {}
+        failure = None
+
+        if self.tracker:
+            self.tracker.plan([node.stage for node in self.nodes], self.stage_dependencies())
+        if self.deadline:
+            self.deadline.plan({stage.name: [dep.name for dep in deps]
+                                for stage, deps in self.stage_dependencies().items()})
+
+        workers = self.max_workers or max(1, len(self.nodes))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage") as executor:
+            while pending or running:
+                if failure is None:
+                    for node in [n for n in pending if self._is_ready(n, results)]:
+                        pending.remove(node)
+                        # Run in a copy of the caller's context, so the stage's spans join the job's trace
+                        context = contextvars.copy_context()
+                        running[executor.submit(context.run, self._run_node, node, results)] = node
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    try:
+                        results.update(future.result())
+                    except JobCancelled as e:
+                        logger.info(f"Stage {node.stage.name} cancelled")
+                        if failure is None:
+                            failure = e
+                    except Exception as e:
+                        logger.error(f"Stage {node.stage.name} failed: {str(e)}")
+                        if failure is None:
+                            failure = e
+
+        if failure is not None:
+            raise failure
+
+        if pending:
+            names = ", ".join(node.stage.name for node in pending)
+            raise RuntimeError(f"❌ Stages could not be scheduled (dependency cycle?): {names}")
+
+        return results
+
+    def _run_node(self, node, results):
+        with tracing.span(f"stage.{node.stage.name}", resources=list(node.resources)) as span:
+            key = self.checkpoints.key(node, results) if self.checkpoints else None
+            outputs = self.checkpoints.restore(node, key) if self.resume and key else None
+            span.set(reused_checkpoint=outputs is not None)
+
+            remote = self.remote is not None and self.remote.handles(node.stage)
+            span.set(remote=remote)
+
+            # Restoring a checkpoint or handing the stage to another node needs no slot; running it here waits for one
+            if outputs is None and not remote and self.scheduler is not None and node.resources:
+                admission = self.scheduler.admit(node.resources, f"Stage {node.stage.name}")
+            else:
+                admission = nullcontext(0.0)
+            with admission as waited, self._memory(node, outputs is not None or remote) as memory_waited:
+                span.set(scheduler_wait_seconds=round(waited, 3), memory_wait_seconds=round(memory_waited, 3))
+                if self.tracker:
+                    self.tracker.start_stage(node.stage)
+                try:
+                    cancellation.check()
+                    if outputs is not None:
+                        logger.info(f"Reusing checkpoint for stage {node.stage.name}")
+                        if self.tracker:
+                            self.tracker.log_substep(f"♻️ Reusing checkpoint for {node.stage.name}")
+                    else:
+                        with self._budget(node) as budget:
+                            if budget is not None:
+                                span.set(budget_seconds=round(budget.seconds, 2))
+                            outputs = self.remote.run(node, results) if remote else node.run(results)
+                        if key:
+                            self.checkpoints.record(node, key, outputs)
+                except (Exception, JobCancelled):
+                    if self.tracker:
+                        self.tracker.finish_stage(node.stage, failed=True)
+                    raise
+                if self.tracker:
+                    self.tracker.finish_stage(node.stage)
+            return outputs
+
+    def _memory(self, node, elsewhere):
+        """Context holding the stage's expected memory under the RSS cap.
+
+        Taken after the scheduler slot, so memory is only reserved by stages that are running.
+        """
+        if elsewhere or self.governor is None:
+            return nullcontext(0.0)
+        return self.governor.reserve(node.expected_memory(), f"Stage {node.stage.name}")
+
+    def _budget(self, node):
+        """Context of the stage's share of the job deadline (none without a deadline)."""
+        if self.deadline is None:
+            return nullcontext(None)
+        predictions = self.tracker.predictions if self.tracker else None
+        return self.deadline.stage(node.stage.name, predictions)
+
+    def _is_ready(self, node, results):
+        return all(name in results for name in node.inputs)
+
+    def _producer(self, name):
+        for node in self.nodes:
+            if name in node.outputs:
+                return node
+        return None
+
+    def _validate(self, initial):
+        """Check that every input is either given up front or produced by a stage."""
+        for node in self.nodes:
+            for name in node.inputs:
+                if name not in initial and self._producer(name) is None:
+                    raise ValueError(f"❌ Stage {node.stage.name} needs '{name}' but no stage produces it")
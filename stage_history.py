@@ -0,0 +1,216 @@
+"""
+Stage History Module for Text-to-Video Pipeline
+
+This module keeps the stage durations of finished jobs together with the
+features that drive them (segment count, script words, audio duration,
+caption model, animation, ...) in a local JSONL store, and predicts stage
+durations from it: a pre-run cost estimate before a job starts and a live
+ETA while it runs.
+
+Each stage is predicted by a straight-line fit on the feature it scales
+with (image generation on the segment count, rendering and captions on the
+audio duration, script generation on nothing), using past jobs with the
+same caption model, animation and mode when there are enough of them.
+Features that aren't known yet (the segment count before the script
+exists) are taken at their historical median.
+"""
+
+import os
+import json
+import time
+import threading
+import logging
+from statistics import median
+
+from Models.config import STAGE_HISTORY_FILE
+
+logger = logging.getLogger(__name__)
+
+# Features each stage's duration grows with, in order of preference
+STAGE_SCALES = {
+    "SCRIPT": (),
+    "VOICEOVER": ("words",),
+    "IMAGE_PREP": ("segments", "words"),
+    "IMAGE_GEN": ("segments", "words"),
+    "VIDEO": ("audio_seconds", "segments", "words"),
+    "CAPTIONS": ("audio_seconds", "words"),
+    "BGM_MIX": ("audio_seconds", "words"),
+    "BGM": ("audio_seconds", "words"),
+    "CLEANUP": ("segments",),
+}
+
+# Settings that change how long a stage takes; past jobs that match them are preferred
+GROUP_FEATURES = ("caption_model", "animation", "stream", "img_model")
+
+MIN_SAMPLES = 3
+MAX_RECORDS = 500
+
+
+class StageHistory:
+    """Append-only store of finished jobs' stage durations and features."""
+
+    def __init__(self, path=STAGE_HISTORY_FILE, max_records=MAX_RECORDS):
+        self.path = path
+        self.max_records = max_records
+        self._lock = threading.Lock()
+        self._records = None
+        self._mtime = None
+
+    def record(self, job_id, features, stage_times):
+        """Add a finished job to the history."""
+        entry = {
+            "job_id": job_id,
+            "finished_at": time.time(),
+            "features": features,
+            "stages": {name: round(seconds, 3) for name, seconds in stage_times.items()},
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._records = None
+
+    def records(self):
+        """Return the most recent records, re-reading the file when another process has added to it."""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return []
+            if self._records is None or mtime != self._mtime:
+                records = []
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            records.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            continue  # A line cut short by a crash
+                self._records = records[-self.max_records:]
+                self._mtime = mtime
+            return list(self._records)
+
+
+def _fit(points):
+    """Least-squares line through (x, y) points, returned as (intercept, slope)."""
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if spread == 0:
+        return mean_y, 0.0
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+    return mean_y - slope * mean_x, slope
+
+
+class EtaPredictor:
+    """Predicts stage durations and the remaining time of a job from the stage history."""
+
+    def __init__(self, history=None):
+        self.history = history or StageHistory()
+
+    def predict_stage(self, stage, features):
+        """Predict how long a stage will take.
+
+        Args:
+            stage (str): Stage name, e.g. "IMAGE_GEN"
+            features (dict): What is known about the job so far
+
+        Returns:
+            float: Predicted seconds, or None if the stage has no history
+        """
+        records = [r for r in self.history.records() if stage in r.get("stages", {})]
+        if not records:
+            return None
+
+        # Prefer jobs with the same settings, relaxing the match until there are enough samples
+        for count in range(len(GROUP_FEATURES), -1, -1):
+            keys = GROUP_FEATURES[:count]
+            similar = [r for r in records
+                       if all(r["features"].get(key) == features.get(key) for key in keys if key in features)]
+            if len(similar) >= MIN_SAMPLES or count == 0:
+                records = similar or records
+                break
+
+        fits = {}
+        for scale in STAGE_SCALES.get(stage, ()):
+            points = [(r["features"][scale], r["stages"][stage])
+                      for r in records if r["features"].get(scale) is not None]
+            if len(points) >= 2:
+                fits[scale] = points
+        if not fits:
+            return median(r["stages"][stage] for r in records)
+
+        # Use the most preferred feature that is already known, else the most preferred one at its median
+        scale = next((scale for scale in fits if features.get(scale) is not None), next(iter(fits)))
+        points = fits[scale]
+        value = features.get(scale)
+        if value is None:
+            value = median(x for x, _ in points)
+        intercept, slope = _fit(points)
+        return max(0.0, intercept + slope * value)
+
+    def predict(self, stages, features):
+        """Predict every stage; stages without history are left out."""
+        predictions = {}
+        for stage in stages:
+            seconds = self.predict_stage(stage, features)
+            if seconds is not None:
+                predictions[stage] = seconds
+        return predictions
+
+    def estimate(self, stages, features, dependencies=None):
+        """Pre-run cost estimate of a job.
+
+        Args:
+            stages (list): Stage names that will run
+            features (dict): What is known about the job before it starts
+            dependencies (dict): Stage name -> names of the stages it waits for
+
+        Returns:
+            dict: Predicted seconds per stage and the expected total, or None without history
+        """
+        predictions = self.predict(stages, features)
+        if not predictions:
+            return None
+        return {
+            "stages": {stage: round(seconds, 1) for stage, seconds in predictions.items()},
+            "total_seconds": round(remaining_time(stages, predictions, dependencies), 1),
+            "samples": len(self.history.records()),
+        }
+
+
+def remaining_time(stages, predictions, dependencies=None, elapsed=None, finished=()):
+    """Length of the longest remaining chain of stages.
+
+    Stages run as soon as the stages they depend on are done, so the job
+    ends when its slowest chain does. Without dependencies the stages are
+    taken to run one after another.
+
+    Args:
+        stages (list): Stage names in the order they were planned
+        predictions (dict): Predicted seconds per stage (missing stages count as 0)
+        dependencies (dict): Stage name -> names of the stages it waits for
+        elapsed (dict): Seconds already spent in running stages
+        finished (iterable): Names of finished stages
+
+    Returns:
+        float: Seconds until the last stage is expected to finish
+    """
+    elapsed = elapsed or {}
+    finished = set(finished)
+    if dependencies is None:
+        dependencies = {stage: [stages[i - 1]] if i else [] for i, stage in enumerate(stages)}
+
+    ends = {}
+
+    def end(stage):
+        if stage not in ends:
+            start = max((end(dep) for dep in dependencies.get(stage, ()) if dep in stages), default=0.0)
+            if stage in finished:
+                left = 0.0
+            else:
+                left = max(predictions.get(stage, 0.0) - elapsed.get(stage, 0.0), 0.0)
+            ends[stage] = start + left
+        return ends[stage]
+
+    return max((end(stage) for stage in stages), default=0.0)
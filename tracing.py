@@ -0,0 +1,198 @@
+"""
+Tracing Module for Text-to-Video Pipeline
+
+This module records spans (a name, a job ID, a parent span, start and end
+timestamps and attributes) for the stages, provider calls and render steps
+of a job, and exports them as JSONL so a waterfall can be rebuilt per video.
+
+The active job and span are kept in context variables. New threads don't
+inherit them on their own, so code that hands work to a thread runs it with
+contextvars.copy_context().run. Outside a trace, span() does nothing.
+
+Usage:
+    python tracing.py Data/Output/<job id>/trace.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+
+_tracer = contextvars.ContextVar("tracer", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    """A timed operation within a job."""
+
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.end = None
+        self.error = None
+        self.thread = threading.current_thread().name
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def finish(self, error=None):
+        duration = time.perf_counter() - self._started
+        self.end = self.start + duration
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "end": round(self.end, 6),
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "thread": self.thread,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned by span() outside a trace, so callers can always call set()."""
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Appends finished spans of one job to a JSONL file."""
+
+    def __init__(self, trace_id, path):
+        self.trace_id = trace_id
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+@contextmanager
+def trace(trace_id, path, name="job", **attributes):
+    """Trace a job: spans opened inside the block are exported to path.
+
+    Args:
+        trace_id (str): The job ID
+        path (str): JSONL file that receives the spans
+        name (str): Name of the root span
+        **attributes: Attributes of the root span
+    """
+    tracer = Tracer(trace_id, path)
+    token = _tracer.set(tracer)
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        _tracer.reset(token)
+        tracer.close()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time the with-block as a child of the current span.
+
+    Yields the Span, so attributes known only later can be added with set().
+    An exception leaving the block marks the span as failed and is re-raised.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    current = Span(name, tracer.trace_id, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.finish(e)
+        raise
+    else:
+        current.finish()
+    finally:
+        _current_span.reset(token)
+        tracer.export(current)
+
+
+def load_spans(path):
+    """Read the spans of a trace file, in start order."""
+    with open(path, "r", encoding="utf-8") as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    return sorted(spans, key=lambda s: s["start"])
+
+
+def print_waterfall(path, width=40):
+    """Print the spans of a trace file as an indented text waterfall."""
+    spans = load_spans(path)
+    if not spans:
+        print(f"No spans in {path}")
+        return
+
+    by_id = {s["span_id"]: s for s in spans}
+    children = {}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in by_id else None
+        children.setdefault(parent, []).append(s)
+    origin = min(s["start"] for s in spans)
+    total = max(s["end"] for s in spans) - origin or 1
+
+    def show(s, depth):
+        offset = int((s["start"] - origin) / total * width)
+        length = max(1, int((s["end"] - s["start"]) / total * width))
+        bar = " " * offset + "█" * min(length, width - offset)
+        label = "  " * depth + s["name"]
+        status = " ❌" if s["status"] == "error" else ""
+        print(f"{label:<44} {bar:<{width}} {s['duration_ms'] / 1000:8.3f}s{status}")
+        # Spans are already in start order, so children are too
+        for child in children.get(s["span_id"], []):
+            show(child, depth + 1)
+
+    for root in children.get(None, []):
+        show(root, 0)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Print the waterfall of a job trace")
+    parser.add_argument("trace_file", help="trace.jsonl written by a job")
+    parser.add_argument("--width", type=int, default=40, help="Width of the timeline in characters")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if not os.path.exists(args.trace_file):
+        print(f"❌ Trace file not found: {args.trace_file}")
+        sys.exit(1)
+    print_waterfall(args.trace_file, args.width)